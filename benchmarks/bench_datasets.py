@@ -0,0 +1,125 @@
+"""
+Load time and memory of CSV against the Parquet and Arrow dataset files.
+
+    python benchmarks/bench_datasets.py --rows 10000000 --output datasets_bench.json
+
+Writes a synthetic table shaped like processed_fomo_dataset_*.csv, converts
+it with dataset_store.convert_csv, then loads it in a fresh process per
+reader so peak RSS is not shared between runs. "projected" readers load
+the three resume training columns, as split_datasets.py does.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dataset_store import convert_csv, read_dataset
+
+PROJECTION = ["resume_uploaded", "batch_resume_uploaded_pct", "should_nudge_resume"]
+READERS = ["csv", "csv_projected", "parquet", "parquet_projected", "arrow", "arrow_projected"]
+
+
+def write_synthetic_csv(path, rows, seed, chunk_size=1_000_000):
+    rng = np.random.default_rng(seed)
+    header = True
+    with open(path, "w", newline="") as f:
+        for start in range(0, rows, chunk_size):
+            n = min(chunk_size, rows - start)
+            resume_uploaded = rng.integers(0, 2, n)
+            pct = rng.uniform(0, 100, n)
+            fomo = rng.uniform(0, 1, n)
+            pd.DataFrame({
+                "resume_uploaded": resume_uploaded,
+                "karma": rng.uniform(0, 500, n),
+                "batch_resume_uploaded_pct": pct,
+                "event_fomo_score": fomo,
+                "should_nudge_resume": ((resume_uploaded == 0) & (pct > 70)).astype(np.int64),
+                "should_nudge_event": (fomo > 0.6).astype(np.int64),
+            }).to_csv(f, index=False, header=header)
+            header = False
+
+
+def peak_rss_mb():
+    # VmHWM belongs to this process image; ru_maxrss would carry over the
+    # parent's peak across fork and exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def read_once(reader, csv_path):
+    """Run one reader in this process and return its timing and peak RSS."""
+    fmt, _, projected = reader.partition("_")
+    columns = PROJECTION if projected else None
+    started = time.perf_counter()
+    if fmt == "csv":
+        # Straight pd.read_csv: read_dataset would pick up the converted copies
+        frame = pd.read_csv(csv_path, usecols=columns)
+    else:
+        frame = read_dataset(os.path.splitext(csv_path)[0] + f".{fmt}", columns)
+    elapsed = time.perf_counter() - started
+    return {
+        "load_s": round(elapsed, 3),
+        "rows": len(frame),
+        "columns": len(frame.columns),
+        "frame_mb": round(frame.memory_usage(deep=True).sum() / 2**20, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CSV, Parquet and Arrow dataset loads")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Rows in the synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic dataset")
+    parser.add_argument("--output", default="datasets_bench.json", help="Where to write the JSON results")
+    parser.add_argument("--read", nargs=2, metavar=("READER", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.read:
+        print(json.dumps(read_once(*args.read)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "processed_fomo_dataset.csv")
+        write_synthetic_csv(csv_path, args.rows, args.seed)
+        sizes = {"csv": os.path.getsize(csv_path)}
+        conversions = {}
+        for fmt in ("parquet", "arrow"):
+            started = time.perf_counter()
+            output_path, _ = convert_csv(csv_path, fmt)
+            conversions[fmt] = round(time.perf_counter() - started, 2)
+            sizes[fmt] = os.path.getsize(output_path)
+
+        results = {}
+        for reader in READERS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--read", reader, csv_path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[reader] = json.loads(output)
+
+    report = {
+        "rows": args.rows,
+        "file_mb": {fmt: round(size / 2**20, 1) for fmt, size in sizes.items()},
+        "convert_s": conversions,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
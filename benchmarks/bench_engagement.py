@@ -0,0 +1,360 @@
+"""
+Latency and throughput benchmarks for the engagement service.
+
+    python benchmarks/bench_engagement.py --output bench.json
+    python benchmarks/bench_engagement.py --output new.json --compare bench.json
+
+Covers the FOMO scorer and both model predict calls in isolation,
+/analyze-engagement in-process and over a local uvicorn, and bulk scoring
+through /analyze-engagement/batch (pydantic) against the orjson JSONL path. When the joblib
+models are missing, stand-in forests are fitted from train_dataset/*.csv so
+the numbers still exercise real trees.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# main.py and config.json use paths relative to the repository root
+os.chdir(ROOT)
+
+import simulate_data
+from dataset_store import read_dataset
+from event_fomo_score import build_event_fomo_columns, calculate_event_fomo_score, calculate_event_fomo_scores
+from nudge_engine import load_models
+
+
+def summarize(latencies, elapsed):
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "count": int(len(latencies)),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "mean_ms": round(float(latencies.mean()), 4),
+        "per_second": round(len(latencies) / elapsed, 1),
+    }
+
+
+def peak_rss_mb(pid=None):
+    if pid is None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def time_calls(function, args_list):
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        t = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def fit_standin_models():
+    train_root = ROOT / "model" / "ml_model" / "train_dataset"
+    resume = read_dataset(str(train_root / "resume_dataset.csv"))
+    event = read_dataset(str(train_root / "event_dataset.csv"))
+    X_resume = pd.DataFrame({
+        "resume_uploaded": resume["resume_uploaded"],
+        "batch_resume_uploaded_pct": resume["batch_resume_uploaded_pct"] / 100,
+    })
+    resume_model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_resume, resume["should_nudge_resume"])
+    event_model = RandomForestClassifier(n_estimators=100, random_state=42).fit(
+        event[["karma", "event_fomo_score"]], event["should_nudge_event"])
+    return resume_model, event_model
+
+
+def prepare_config(workdir):
+    """
+    Return (config_path, used_standin_models) of a benchmark copy of config.json.
+
+    The response cache is disabled in the copy: the benchmarks send the same
+    users more than once, and cached responses would time the cache instead
+    of scoring. Stand-in models are written if the real ones are missing.
+    """
+    with open("config.json") as f:
+        config = json.load(f)
+    config["response_cache"] = dict(config["response_cache"], enabled=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        resume_model, event_model = load_models(config)
+    standin = resume_model is None or event_model is None
+    if standin:
+        resume_model, event_model = fit_standin_models()
+        config["models"] = dict(
+            config["models"],
+            resume_path=str(Path(workdir) / "resume.joblib"),
+            event_path=str(Path(workdir) / "event.joblib"),
+        )
+        joblib.dump(resume_model, config["models"]["resume_path"])
+        joblib.dump(event_model, config["models"]["event_path"])
+    config_path = Path(workdir) / "config.json"
+    config_path.write_text(json.dumps(config))
+    return str(config_path), standin
+
+
+def cache_lookups(metrics_text):
+    """Response cache lookups per result ({"hit": n, "miss": n, ...}) from a /metrics page."""
+    lookups = {}
+    for line in metrics_text.splitlines():
+        if line.startswith("engagement_response_cache_total{"):
+            labels, value = line.rsplit(" ", 1)
+            lookups[labels.split('result="', 1)[1].split('"', 1)[0]] = int(float(value))
+    return lookups
+
+
+def bench_fomo(users):
+    peer_snapshots = [user["peer_snapshot"] for user in users]
+    scalar = time_calls(calculate_event_fomo_score, [(user, user["peer_snapshot"]) for user in users])
+
+    columns = build_event_fomo_columns(users, peer_snapshots)
+    started = time.perf_counter()
+    calculate_event_fomo_scores(*columns)
+    elapsed = time.perf_counter() - started
+    return {
+        "scalar": scalar,
+        "vectorized": {"count": len(users), "total_ms": round(elapsed * 1000, 3), "per_second": round(len(users) / elapsed, 1)},
+    }
+
+
+def bench_predict(resume_model, event_model, users, repeat):
+    resume_rows = [
+        (pd.DataFrame([[int(u["profile"]["resume_uploaded"]), u["peer_snapshot"]["batch_resume_uploaded_pct"] / 100]],
+                      columns=["resume_uploaded", "batch_resume_uploaded_pct"]),)
+        for u in users[:repeat]
+    ]
+    event_rows = [
+        (pd.DataFrame([[u["profile"]["karma"], 0.5]], columns=["karma", "event_fomo_score"]),)
+        for u in users[:repeat]
+    ]
+    return {
+        "resume_predict": time_calls(resume_model.predict, resume_rows),
+        "event_predict": time_calls(event_model.predict, event_rows),
+    }
+
+
+async def drive(client, users, concurrency, path="/analyze-engagement"):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(user):
+        nonlocal errors
+        async with semaphore:
+            t = time.perf_counter()
+            response = await client.post(path, json=user)
+            latencies.append(time.perf_counter() - t)
+            errors += response.status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user) for user in users))
+    result = summarize(latencies, time.perf_counter() - started)
+    result["errors"] = errors
+    return result
+
+
+def bench_in_process(config_path, users, concurrency):
+    os.environ["ENGAGEMENT_CONFIG"] = config_path
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+
+    async def run_pass(client, pass_concurrency):
+        before = cache_lookups(main.metrics.render())
+        result = await drive(client, users, pass_concurrency)
+        after = cache_lookups(main.metrics.render())
+        for result_name, key in (("hit", "cache_hits"), ("miss", "cache_misses")):
+            result[key] = after.get(result_name, 0) - before.get(result_name, 0)
+        return result
+
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://bench") as client:
+            sequential = await run_pass(client, 1)
+            concurrent = await run_pass(client, concurrency)
+        return {"sequential": sequential, f"concurrency_{concurrency}": concurrent}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(run())
+
+
+def bench_bulk(config_path, users, chunk_size):
+    """Score users in chunks through the pydantic batch endpoint and the JSONL fast path."""
+    os.environ["ENGAGEMENT_CONFIG"] = config_path
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+
+    chunks = [users[i:i + chunk_size] for i in range(0, len(users), chunk_size)]
+    json_bodies = [json.dumps({"users": chunk}) for chunk in chunks]
+    jsonl_bodies = ["".join(json.dumps(user) + "\n" for user in chunk) for chunk in chunks]
+
+    async def run(path, bodies, content_type):
+        async with httpx.AsyncClient(app=main.app, base_url="http://bench") as client:
+            latencies = []
+            started = time.perf_counter()
+            for body in bodies:
+                t = time.perf_counter()
+                response = await client.post(path, content=body, headers={"content-type": content_type})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t)
+            elapsed = time.perf_counter() - started
+        result = summarize(latencies, elapsed)
+        result["users_per_second"] = round(len(users) / elapsed, 1)
+        return result
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "chunk_size": chunk_size,
+            "batch_json": asyncio.run(run("/analyze-engagement/batch", json_bodies, "application/json")),
+            "jsonl": asyncio.run(run("/analyze-engagement/jsonl", jsonl_bodies, "application/x-ndjson")),
+        }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve_uvicorn(config_path, workers):
+    """Run main:app on a free local port with workers processes; yields (base_url, server process)."""
+    port = free_port()
+    env = dict(os.environ, ENGAGEMENT_CONFIG=config_path)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("uvicorn did not become healthy within 60s")
+            time.sleep(0.1)
+        yield base_url, server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def server_peak_rss_mb(server):
+    worker_pids = subprocess.run(["pgrep", "-P", str(server.pid)], capture_output=True, text=True).stdout.split()
+    return {str(pid): peak_rss_mb(pid) for pid in [server.pid, *map(int, worker_pids)]}
+
+
+def bench_uvicorn(config_path, users, concurrency, workers):
+    with serve_uvicorn(config_path, workers) as (base_url, server):
+        async def run():
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                return await drive(client, users, concurrency)
+
+        result = asyncio.run(run())
+        # With several workers this is the count of whichever worker answers the scrape
+        lookups = cache_lookups(httpx.get(f"{base_url}/metrics").text)
+        result["cache_hits"], result["cache_misses"] = lookups.get("hit", 0), lookups.get("miss", 0)
+        result["peak_rss_mb"] = server_peak_rss_mb(server)
+        result["workers"] = workers
+        return result
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def compare(current, previous, prefix=""):
+    """Print p50/p99 and throughput of matching benchmarks side by side."""
+    for key, value in current.items():
+        if not isinstance(value, dict) or not isinstance(previous.get(key), dict):
+            continue
+        name = f"{prefix}{key}"
+        if "p50_ms" in value or "per_second" in value:
+            old = previous[key]
+            cells = []
+            for metric in ("p50_ms", "p99_ms", "per_second", "users_per_second"):
+                if metric in value and metric in old and old[metric]:
+                    cells.append(f"{metric} {old[metric]} -> {value[metric]} ({value[metric] / old[metric]:.2f}x)")
+            print(f"{name}: " + ", ".join(cells))
+        compare(value, previous[key], prefix=f"{name}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engagement service")
+    parser.add_argument("--users", type=int, default=2000, help="Simulated users per benchmark")
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests for concurrent runs")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Users per bulk request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated users")
+    parser.add_argument("--skip-uvicorn", action="store_true", help="Only run in-process benchmarks")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    users = list(simulate_data.iter_users(args.users))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config_path, standin = prepare_config(workdir)
+        with open(config_path) as f:
+            config = json.load(f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            resume_model, event_model = load_models(config)
+
+        results = {
+            "fomo_score": bench_fomo(users),
+            "models": bench_predict(resume_model, event_model, users, min(len(users), 500)),
+            "in_process": bench_in_process(config_path, users, args.concurrency),
+            "bulk": bench_bulk(config_path, users, args.chunk_size),
+        }
+        if not args.skip_uvicorn:
+            results["uvicorn"] = bench_uvicorn(config_path, users, args.concurrency, args.workers)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "users": args.users,
+        "standin_models": standin,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report["results"], json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Open-loop HTTP load generator for sizing uvicorn workers.
+
+    python benchmarks/loadgen.py --ramp 50:10,100:10,200:10,400:10 --workers 1 2 4
+    python benchmarks/loadgen.py --input payloads.jsonl --qps 300 --duration 30 --url http://127.0.0.1:8000
+
+Requests are sent on a fixed schedule (or Poisson arrivals) whatever the
+server's response time, so a slow server builds a queue instead of
+quietly slowing the generator down. Latency is measured from each
+request's scheduled send time, including any wait for a free slot under
+--concurrency, and the send lag is reported separately. For each stage
+the tool reports achieved throughput, error rate and a latency histogram.
+The saturation point is the first stage that misses its target rate,
+breaks --slo-ms at p99 or exceeds --max-error-rate.
+
+The server started for --workers runs with the response cache disabled,
+since the payloads repeat and each worker has its own cache. Each stage
+also reports the cache hit rate read from /metrics, which shows whether
+a --url server answers from its cache.
+
+Payloads are simulate_data users posted to --path, or the lines of
+--input. A line is either a request body for --path or an envelope
+{"method": ..., "path": ..., "body": ...}.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import tempfile
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+# bench_engagement puts the repository root on sys.path and makes it the working directory
+from bench_engagement import cache_lookups, git_commit, prepare_config, serve_uvicorn, server_peak_rss_mb
+
+import simulate_data  # noqa: E402
+
+# Upper edges of the latency histogram buckets, in milliseconds
+HISTOGRAM_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def parse_ramp(ramp):
+    """Parse "QPS:SECONDS,QPS:SECONDS,..." into [(qps, seconds)]."""
+    stages = []
+    for stage in ramp.split(","):
+        qps, seconds = stage.split(":")
+        stages.append((float(qps), float(seconds)))
+    return stages
+
+
+def load_payloads(input_path, path, users, seed):
+    """Return [(method, path, body bytes)], encoded once so the generator only sends bytes."""
+    if input_path is None:
+        random.seed(seed)
+        return [("POST", path, json.dumps(user).encode()) for user in simulate_data.iter_users(users)]
+    payloads = []
+    with open(input_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            document = json.loads(line)
+            if isinstance(document, dict) and "path" in document:
+                body = document.get("body")
+                payloads.append((document.get("method", "POST"), document["path"],
+                                 None if body is None else json.dumps(body).encode()))
+            else:
+                payloads.append(("POST", path, json.dumps(document).encode()))
+    if not payloads:
+        raise SystemExit(f"❌ {input_path} has no payloads")
+    return payloads
+
+
+def _percentile_ms(values, q):
+    # A stage too short to send anything has no latencies
+    return round(float(np.percentile(values, q)), 2) if len(values) else None
+
+
+def summarize_stage(qps, seconds, samples, elapsed, max_in_flight):
+    latencies = np.array([sample[0] for sample in samples]) * 1000
+    lags = np.array([sample[1] for sample in samples]) * 1000
+    statuses = [sample[2] for sample in samples]
+    errors = sum(not (isinstance(status, int) and 200 <= status < 300) for status in statuses)
+    # Bucket i counts latencies in (HISTOGRAM_MS[i - 1], HISTOGRAM_MS[i]], matching the "<=" labels
+    counts = np.bincount(np.searchsorted(HISTOGRAM_MS, latencies, side="left"), minlength=len(HISTOGRAM_MS) + 1)
+    return {
+        "target_qps": qps,
+        "seconds": seconds,
+        "sent": len(samples),
+        "achieved_qps": round(len(samples) / elapsed, 1) if elapsed > 0 else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "statuses": {str(status): statuses.count(status) for status in sorted(set(statuses), key=str)},
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p90_ms": _percentile_ms(latencies, 90),
+        "p99_ms": _percentile_ms(latencies, 99),
+        "max_ms": round(float(latencies.max()), 2) if len(latencies) else None,
+        "send_lag_p99_ms": _percentile_ms(lags, 99),
+        "max_in_flight": max_in_flight,
+        "histogram_ms": {f"<={edge}": int(count) for edge, count in zip([*HISTOGRAM_MS, "inf"], counts)},
+    }
+
+
+async def run_stage(client, payloads, qps, seconds, concurrency, poisson, rng):
+    """
+    Send int(qps * seconds) requests on an open-loop schedule and wait for all of them.
+
+    Returns:
+        dict: summarize_stage() of the stage
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    in_flight = max_in_flight = 0
+
+    async def one(scheduled, method, path, body):
+        nonlocal in_flight, max_in_flight
+        async with semaphore:
+            sent = loop.time()
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                response = await client.request(method, path, content=body,
+                                                 headers={"content-type": "application/json"})
+                status = response.status_code
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.TransportError:
+                status = "transport_error"
+            finally:
+                in_flight -= 1
+        samples.append((loop.time() - scheduled, sent - scheduled, status))
+
+    count = int(qps * seconds)
+    gaps = rng.exponential(1 / qps, count) if poisson else np.full(count, 1 / qps)
+    started = loop.time()
+    scheduled = started
+    tasks = []
+    for gap, (method, path, body) in zip(gaps, payloads):
+        scheduled += gap
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(scheduled, method, path, body)))
+    await asyncio.gather(*tasks)
+    return summarize_stage(qps, seconds, samples, loop.time() - started, max_in_flight)
+
+
+def saturation(stages, slo_ms, max_error_rate):
+    """First stage that misses its rate, its p99 SLO or the error budget, and the last healthy rate before it."""
+    healthy_qps = None
+    for stage in stages:
+        if not stage["sent"]:
+            # Too short to send a request, so it says nothing either way
+            continue
+        reasons = []
+        if stage["achieved_qps"] < 0.95 * stage["target_qps"]:
+            reasons.append("throughput")
+        if stage["p99_ms"] is not None and stage["p99_ms"] > slo_ms:
+            reasons.append("p99")
+        if stage["error_rate"] > max_error_rate:
+            reasons.append("errors")
+        if reasons:
+            return {"saturated_at_qps": stage["target_qps"], "reasons": reasons, "last_healthy_qps": healthy_qps}
+        healthy_qps = stage["target_qps"]
+    return {"saturated_at_qps": None, "reasons": [], "last_healthy_qps": healthy_qps}
+
+
+async def scrape_cache_lookups(client):
+    """Response cache lookups from the server's /metrics, or None if it has no such page."""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    return cache_lookups(response.text) if response.status_code == 200 else None
+
+
+def cache_hit_rate(before, after):
+    """
+    Hit rate of the lookups between two /metrics scrapes.
+
+    With several workers each scrape reads whichever worker answers, so the
+    rate is an estimate; None when either scrape failed or nothing was looked up.
+    """
+    if before is None or after is None:
+        return None
+    hits = after.get("hit", 0) - before.get("hit", 0)
+    misses = after.get("miss", 0) - before.get("miss", 0)
+    return round(hits / (hits + misses), 4) if hits + misses > 0 else None
+
+
+async def run_ramp(base_url, payloads, stages, concurrency, poisson, seed, timeout):
+    rng = np.random.default_rng(seed)
+    payload_cycle = itertools.cycle(payloads)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        for qps, seconds in stages:
+            before = await scrape_cache_lookups(client)
+            result = await run_stage(client, payload_cycle, qps, seconds, concurrency, poisson, rng)
+            result["cache_hit_rate"] = cache_hit_rate(before, await scrape_cache_lookups(client))
+            results.append(result)
+            hit_rate = "n/a" if result["cache_hit_rate"] is None else f"{result['cache_hit_rate']:.2%}"
+            print(f"  {qps:>8.1f} qps target -> {result['achieved_qps']:>8.1f} achieved, "
+                  f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, errors {result['error_rate']:.2%}, "
+                  f"cache hits {hit_rate}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay payloads against the service at a target request rate")
+    parser.add_argument("--input", help="JSONL payloads; simulate_data users when omitted")
+    parser.add_argument("--path", default="/analyze-engagement", help="Endpoint for payloads without an envelope")
+    parser.add_argument("--users", type=int, default=2000, help="Simulated users to cycle through")
+    parser.add_argument("--qps", type=float, default=100, help="Target requests per second of a single stage")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of a single stage")
+    parser.add_argument("--ramp", help="Stages as QPS:SECONDS,QPS:SECONDS,...; overrides --qps/--duration")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed gap")
+    parser.add_argument("--concurrency", type=int, default=256, help="Most requests in flight at once")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--slo-ms", type=float, default=100, help="p99 latency a healthy stage stays under")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate a healthy stage stays under")
+    parser.add_argument("--url", help="Existing server to target instead of starting uvicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1],
+                        help="uvicorn worker counts to run the ramp against, one server each")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for simulated users and Poisson arrivals")
+    parser.add_argument("--output", default="loadgen_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    stages = parse_ramp(args.ramp) if args.ramp else [(args.qps, args.duration)]
+    payloads = load_payloads(args.input, args.path, args.users, args.seed)
+
+    def ramp(base_url):
+        return asyncio.run(run_ramp(base_url, payloads, stages, args.concurrency, args.poisson, args.seed,
+                                    args.timeout))
+
+    runs = []
+    if args.url:
+        print(f"Target {args.url}")
+        results = ramp(args.url)
+        runs.append({"url": args.url, "stages": results,
+                     "saturation": saturation(results, args.slo_ms, args.max_error_rate)})
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            config_path, standin = prepare_config(workdir)
+            for workers in args.workers:
+                print(f"uvicorn with {workers} worker(s)")
+                with serve_uvicorn(config_path, workers) as (base_url, server):
+                    results = ramp(base_url)
+                    runs.append({"workers": workers, "standin_models": standin, "stages": results,
+                                 "saturation": saturation(results, args.slo_ms, args.max_error_rate),
+                                 "peak_rss_mb": server_peak_rss_mb(server)})
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "cpus": os.cpu_count(),
+        "payloads": len(payloads),
+        "concurrency": args.concurrency,
+        "arrivals": "poisson" if args.poisson else "fixed",
+        "slo_ms": args.slo_ms,
+        "runs": runs,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for run in runs:
+        point = run["saturation"]
+        name = f"{run['workers']} worker(s)" if "workers" in run else run["url"]
+        if point["saturated_at_qps"] is None:
+            print(f"✅ {name}: healthy up to {point['last_healthy_qps']} qps")
+        else:
+            print(f"✅ {name}: saturated at {point['saturated_at_qps']} qps ({', '.join(point['reasons'])}), "
+                  f"last healthy {point['last_healthy_qps']} qps")
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+import orjson
+
+from fast_path import LineError, decode_record
+from nudge_engine import compile_rules, compute_event_fomo_scores
+from date_index import DayIndex, read_lines, refresh_range
+from offline_nudges import init_worker, score_records
+from process_profiles import map_chunks
+from schemas import PeerSnapshot
+from snapshot_registry import PeerSnapshotRegistry, compute_batch_aggregates, merge_counted_snapshot
+from state_store import UserStateStore
+
+BUCKET_FORMAT = "%Y-%m-%dT%H%M"
+# User ids drain() handed off, one file per campaign day, so a forced rerun
+# does not send them again; bucket directory names never start with "."
+DELIVERED_DIR = ".delivered"
+
+
+class DeliveryWindow(NamedTuple):
+    """Local hours nudges may be sent in, cut into buckets of bounded size."""
+    start_hour: int
+    end_hour: int
+    bucket_minutes: int
+    max_per_bucket: int
+
+    @classmethod
+    def from_config(cls, campaigns):
+        """
+        Read the window from the "campaigns" config section.
+
+        Raises:
+            ValueError: If the window is empty, does not fit in one day or
+                has buckets that hold nothing; buckets() would never end
+        """
+        window = cls(
+            start_hour=campaigns["send_window"]["start_hour"],
+            end_hour=campaigns["send_window"]["end_hour"],
+            bucket_minutes=campaigns["bucket_minutes"],
+            max_per_bucket=campaigns["max_per_bucket"],
+        )
+        if not 0 <= window.start_hour < window.end_hour <= 24:
+            raise ValueError("send_window needs 0 <= start_hour < end_hour <= 24")
+        if window.bucket_minutes <= 0:
+            raise ValueError("bucket_minutes must be positive")
+        if window.max_per_bucket < 1:
+            raise ValueError("max_per_bucket must be at least 1")
+        return window
+
+    def buckets(self, start):
+        """
+        Yield bucket start times from the bucket holding start onwards.
+
+        Buckets outside the send window are skipped, so a start after hours
+        begins at the next day's window and full days spill into the next.
+        """
+        day = start.date()
+        while True:
+            opening = datetime.combine(day, datetime.min.time()) + timedelta(hours=self.start_hour)
+            closing = datetime.combine(day, datetime.min.time()) + timedelta(hours=self.end_hour)
+            bucket = opening
+            if start > opening:
+                elapsed = (start - opening) // timedelta(minutes=self.bucket_minutes)
+                bucket = opening + elapsed * timedelta(minutes=self.bucket_minutes)
+            while bucket < closing:
+                yield bucket
+                bucket += timedelta(minutes=self.bucket_minutes)
+            day += timedelta(days=1)
+            start = datetime.min
+
+
+def load_peer_snapshots(path):
+    """Read {batch_id: PeerSnapshot} JSON into registry-style (version, peer_snapshot, aggregates) entries."""
+    if path is None:
+        return {}
+    with open(path) as f:
+        snapshots = json.load(f)
+    entries = {}
+    for batch_id, fields in snapshots.items():
+        peer_snapshot = PeerSnapshot.parse_obj(fields)
+        entries[batch_id] = (f"file:{batch_id}", peer_snapshot, compute_batch_aggregates(peer_snapshot))
+    return entries
+
+
+class BatchResolver:
+    """
+    Per-run batch_id lookup, merging state store counters with registered snapshots like the API does.
+
+    A batch in the snapshot file uses that snapshot; other batches use the
+    one registered in the store through PUT /peer-snapshots, if any.
+    """
+
+    def __init__(self, store, registered, registry):
+        self.store = store
+        self.registered = registered
+        self.registry = registry
+        self._entries = {}
+
+    def __call__(self, batch_id):
+        if batch_id not in self._entries:
+            registered = self.registered.get(batch_id)
+            if registered is None:
+                registered = self.registry.get(self.store, batch_id)
+            self._entries[batch_id] = merge_counted_snapshot(self.store.batch_snapshot(batch_id), registered)
+        return self._entries[batch_id]
+
+
+def file_candidates(input_path, first_day, last_day, chunk_size):
+    """Yield (documents, lines read, unparseable lines) per chunk of the lines whose last event is in range."""
+    index = DayIndex.open(input_path)
+    # Lines without a readable date are never in range, but still count as errors
+    yield [], 0, index.unreadable
+    for lines in read_lines(input_path, index.offsets_between(first_day, last_day), chunk_size):
+        documents, errors = [], 0
+        for line in lines:
+            try:
+                documents.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                errors += 1
+        yield documents, len(lines), errors
+
+
+def store_candidates(store, first_day, last_day, chunk_size):
+    for documents in store.users_by_last_event(first_day, last_day, chunk_size):
+        yield documents, len(documents), 0
+
+
+class Outbox:
+    """
+    Time-bucketed outbox files, <outbox_dir>/<bucket start>/<run day>.jsonl.
+
+    Each file is written once, through a temporary file and a rename, so a
+    reader never sees a partial bucket. Starting a run removes the files an
+    earlier run for the same day left, so a rerun replaces its messages
+    instead of queueing them twice, and the delivered logs of earlier days,
+    which no rerun reads again.
+    """
+
+    def __init__(self, outbox_dir, run_day):
+        self.outbox_dir = outbox_dir
+        self.run_day = run_day
+        self.filename = f"{run_day.isoformat()}.jsonl"
+
+    def delivered(self):
+        """User ids whose message for the run day drain() already delivered."""
+        try:
+            with open(delivered_log(self.outbox_dir, self.run_day.isoformat())) as f:
+                return {line.rstrip("\n") for line in f}
+        except FileNotFoundError:
+            return set()
+
+    def clear(self):
+        if not os.path.isdir(self.outbox_dir):
+            return
+        delivered_dir = os.path.join(self.outbox_dir, DELIVERED_DIR)
+        if os.path.isdir(delivered_dir):
+            for name in os.listdir(delivered_dir):
+                if name < self.run_day.isoformat():
+                    os.remove(os.path.join(delivered_dir, name))
+        for bucket in os.listdir(self.outbox_dir):
+            if bucket.startswith("."):
+                continue
+            path = os.path.join(self.outbox_dir, bucket, self.filename)
+            if os.path.exists(path):
+                os.remove(path)
+                if not os.listdir(os.path.dirname(path)):
+                    os.rmdir(os.path.dirname(path))
+
+    def write(self, bucket, lines):
+        bucket_dir = os.path.join(self.outbox_dir, bucket.strftime(BUCKET_FORMAT))
+        os.makedirs(bucket_dir, exist_ok=True)
+        path = os.path.join(bucket_dir, self.filename)
+        with open(path + ".tmp", "wb") as f:
+            f.writelines(lines)
+        os.replace(path + ".tmp", path)
+
+
+def delivered_log(outbox_dir, campaign):
+    return os.path.join(outbox_dir, DELIVERED_DIR, f"{campaign}.txt")
+
+
+def due_files(outbox_dir, now):
+    """Outbox files whose bucket has started by now, oldest bucket first."""
+    if not os.path.isdir(outbox_dir):
+        return []
+    due = []
+    for bucket in sorted(os.listdir(outbox_dir)):
+        if bucket.startswith("."):
+            continue
+        if datetime.strptime(bucket, BUCKET_FORMAT) > now:
+            break
+        bucket_dir = os.path.join(outbox_dir, bucket)
+        due.extend(os.path.join(bucket_dir, name) for name in sorted(os.listdir(bucket_dir)) if name.endswith(".jsonl"))
+    return due
+
+
+def drain(outbox_dir, now, deliver):
+    """
+    Hand every due message to deliver, one outbox file at a time.
+
+    A file is removed only after deliver returns, so a failed delivery is
+    retried by the next drain. Delivered user ids are logged per campaign
+    day, so a forced rerun of the day does not queue them again.
+
+    Returns:
+        int: Number of messages delivered
+    """
+    delivered = 0
+    for path in due_files(outbox_dir, now):
+        with open(path, "rb") as f:
+            messages = [orjson.loads(line) for line in f]
+        deliver(messages)
+        delivered += len(messages)
+        log_path = delivered_log(outbox_dir, os.path.basename(path)[:-len(".jsonl")])
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, "a") as f:
+            f.writelines(f"{message['user_id']}\n" for message in messages)
+        os.remove(path)
+        bucket_dir = os.path.dirname(path)
+        if not os.listdir(bucket_dir):
+            os.rmdir(bucket_dir)
+    return delivered
+
+
+def score_changes(job):
+    """
+    Keep the users who have a nudge type on run_day they did not have on previous_day.
+
+    Only the quiz rule and the rounded FOMO score read the date, so users
+    whose quiz eligibility and FOMO score are the same on both days are
+    dropped before any model is called; the rest are scored on both days.
+
+    Args:
+        job (tuple): (records, previous_day, run_day, quiz_idle_days)
+
+    Returns:
+        list: run_day response dicts of the users to notify
+    """
+    records, previous_day, run_day, quiz_idle_days = job
+    fomo_before = compute_event_fomo_scores(records, previous_day)
+    fomo_after = compute_event_fomo_scores(records, run_day)
+    moved = [
+        record for record, before, after in zip(records, fomo_before, fomo_after)
+        if before != after or (
+            (previous_day - record.last_event_attended).days < quiz_idle_days
+            <= (run_day - record.last_event_attended).days
+        )
+    ]
+    changed = []
+    for old, new in zip(score_records((moved, previous_day)), score_records((moved, run_day))):
+        old_types = {nudge["type"] for nudge in old["nudges"]}
+        if any(nudge["type"] not in old_types for nudge in new["nudges"]):
+            changed.append(new)
+    return changed
+
+
+def read_last_run(state_path):
+    try:
+        with open(state_path) as f:
+            return date.fromisoformat(json.load(f)["last_run_day"])
+    except FileNotFoundError:
+        return None
+
+
+def write_last_run(state_path, run_day):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    with open(state_path + ".tmp", "w") as f:
+        json.dump({"last_run_day": run_day.isoformat()}, f)
+    os.replace(state_path + ".tmp", state_path)
+
+
+def run_campaign(config_path="config.json", input_path=None, peer_snapshots_path=None, now=None, workers=None,
+                 force=False):
+    """
+    Queue nudges for every user who gained a nudge since the last run.
+
+    Only the quiz rule and the FOMO time term depend on the date, so only
+    users in date_index.refresh_range are read: from the state store through
+    its last_event_attended index, or from input_path (JSONL users) through
+    its DayIndex. They are decoded once and compared on the last run day
+    and today in chunks on a process pool (score_changes). Users with a new nudge type are
+    spread over the send window's buckets, at most max_per_bucket per
+    bucket, starting from now. The last run day is recorded only once every
+    bucket is written, so an interrupted run is simply run again. Users
+    whose message for today was already drained are not queued again.
+
+    Args:
+        config_path (str): Config with rules, models, state_store and campaigns
+        input_path (str, optional): JSONL users instead of the state store
+        peer_snapshots_path (str, optional): JSON {batch_id: PeerSnapshot} for batch_id-only users
+        now (datetime, optional): Run time, defaults to the local time
+        workers (int, optional): Scoring processes, defaults to campaigns.workers
+        force (bool): Recompute today's campaign even if it already ran;
+            messages drain() already delivered are not sent again
+
+    Returns:
+        dict: Run report
+    """
+    with open(config_path) as f:
+        config = json.load(f)
+    campaigns = config["campaigns"]
+    rules = compile_rules(config)
+    window = DeliveryWindow.from_config(campaigns)
+    now = now or datetime.now()
+    run_day = now.date()
+    workers = campaigns["workers"] if workers is None else workers
+    chunk_size = campaigns["chunk_size"]
+
+    previous_day = read_last_run(campaigns["state_path"])
+    if previous_day is None or (force and previous_day >= run_day):
+        previous_day = run_day - timedelta(days=1)
+    days = refresh_range(previous_day, run_day, rules.quiz_idle_days)
+    report = {"run_day": run_day.isoformat(), "scanned": 0, "candidates": 0, "queued": 0, "errors": 0, "buckets": 0,
+              "already_delivered": 0}
+    if days is None:
+        return report
+    report["previous_day"] = previous_day.isoformat()
+    report["last_event_from"], report["last_event_to"] = days[0].isoformat(), days[1].isoformat()
+
+    started = time.perf_counter()
+    outbox = Outbox(campaigns["outbox_dir"], run_day)
+    delivered = outbox.delivered()
+    # Also resolves batch_id-only users of an input file; without a database it knows no batches
+    store = UserStateStore(config["state_store"]["path"])
+    try:
+        resolve = BatchResolver(store, load_peer_snapshots(peer_snapshots_path),
+                                PeerSnapshotRegistry(config["peer_snapshots"]["cache_size"]))
+        if input_path is None:
+            candidates = store_candidates(store, *days, chunk_size)
+        else:
+            candidates = file_candidates(input_path, *days, chunk_size)
+
+        def jobs():
+            for documents, read, errors in candidates:
+                report["scanned"] += read
+                report["errors"] += errors
+                records = []
+                for document in documents:
+                    try:
+                        records.append(decode_record(document, resolve))
+                    except LineError:
+                        report["errors"] += 1
+                report["candidates"] += len(records)
+                if records:
+                    yield records, previous_day, run_day, rules.quiz_idle_days
+
+        outbox.clear()
+        buckets = window.buckets(now)
+        bucket, pending = None, []
+        for results in map_chunks(score_changes, jobs(), workers, initializer=init_worker, initargs=(config_path,)):
+            for result in results:
+                if result["user_id"] in delivered:
+                    report["already_delivered"] += 1
+                    continue
+                if bucket is None:
+                    bucket = next(buckets)
+                    report.setdefault("first_bucket", bucket.isoformat())
+                result["deliver_after"] = bucket.isoformat()
+                result["campaign"] = run_day.isoformat()
+                pending.append(orjson.dumps(result) + b"\n")
+                if len(pending) == window.max_per_bucket:
+                    outbox.write(bucket, pending)
+                    report["queued"] += len(pending)
+                    report["buckets"] += 1
+                    report["last_bucket"] = bucket.isoformat()
+                    bucket, pending = None, []
+        if pending:
+            outbox.write(bucket, pending)
+            report["queued"] += len(pending)
+            report["buckets"] += 1
+            report["last_bucket"] = bucket.isoformat()
+    finally:
+        store.close()
+
+    write_last_run(campaigns["state_path"], run_day)
+    elapsed = time.perf_counter() - started
+    report["elapsed_s"] = round(elapsed, 2)
+    report["scanned_per_s"] = round(report["scanned"] / elapsed) if elapsed else None
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queue the daily nudge campaign into time-bucketed outbox files")
+    parser.add_argument("--config", default="config.json", help="Config with rules, models, state_store and campaigns")
+    parser.add_argument("--input", default=None, help="JSONL users to select from instead of the state store")
+    parser.add_argument("--peer-snapshots", default=None,
+                        help="JSON {batch_id: PeerSnapshot} for users that only carry a batch_id")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: campaigns.workers)")
+    parser.add_argument("--force", action="store_true",
+                        help="Recompute today's campaign even if it already ran; delivered messages are not resent")
+    parser.add_argument("--drain", action="store_true",
+                        help="Instead of scheduling, print every due message as JSONL and remove it from the outbox")
+    args = parser.parse_args(argv)
+
+    if args.drain:
+        with open(args.config) as f:
+            outbox_dir = json.load(f)["campaigns"]["outbox_dir"]
+
+        def deliver(messages):
+            sys.stdout.writelines(json.dumps(message) + "\n" for message in messages)
+        delivered = drain(outbox_dir, datetime.now(), deliver)
+        print(f"✅ Delivered {delivered} due messages", file=sys.stderr)
+        return
+
+    report = run_campaign(args.config, args.input, args.peer_snapshots, workers=args.workers, force=args.force)
+    print(json.dumps(report, indent=2))
+    if "last_event_from" not in report:
+        print(f"✅ Campaign for {report['run_day']} already ran; use --force to recompute it")
+    else:
+        print(f"✅ Queued {report['queued']} users' nudges into {report['buckets']} buckets")
+
+
+if __name__ == "__main__":
+    main()
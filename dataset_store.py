@@ -0,0 +1,162 @@
+import argparse
+import glob
+import importlib.util
+import os
+
+import pandas as pd
+
+# Converted copies sit next to the CSV they were made from
+SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow"}
+
+DEFAULT_DATASETS = [
+    "datasets/*.csv",
+    "model/ml_model/*.csv",
+    "model/ml_model/*/*.csv",
+]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Columnar datasets require pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _open_writer(path, fmt, schema):
+    pa = _pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(path, schema)
+
+
+def columnar_path(csv_path, fmt):
+    return os.path.splitext(csv_path)[0] + SUFFIXES[fmt]
+
+
+def resolve_dataset(path):
+    """
+    Pick the file to read for a dataset path.
+
+    For a .csv path, a converted .arrow or .parquet sibling is used instead
+    when it is at least as new as the CSV and pyarrow is installed, so
+    callers keep naming the CSV and get the columnar copy once it exists.
+    """
+    if not path.endswith(".csv") or importlib.util.find_spec("pyarrow") is None:
+        return path
+    csv_mtime = os.stat(path).st_mtime_ns
+    for fmt in ("arrow", "parquet"):
+        candidate = columnar_path(path, fmt)
+        if os.path.exists(candidate) and os.stat(candidate).st_mtime_ns >= csv_mtime:
+            return candidate
+    return path
+
+
+def read_table(path, columns=None):
+    """
+    Read a .parquet or .arrow file as a pyarrow Table.
+
+    Both are memory-mapped. Parquet decodes only the projected column
+    chunks; an Arrow IPC file is used in place, so columns outside the
+    projection are never paged in.
+
+    Args:
+        path (str): .parquet or .arrow file
+        columns (list, optional): Columns to keep, in this order
+
+    Returns:
+        pyarrow.Table: The projected table
+    """
+    pa = _pyarrow()
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, columns=columns, memory_map=True)
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table if columns is None else table.select(columns)
+
+
+def read_dataset(path, columns=None):
+    """
+    Load a dataset as a DataFrame from CSV, Parquet or Arrow.
+
+    The frame is the one pd.read_csv would return for the CSV, restricted
+    to columns in the order given.
+
+    Args:
+        path (str): Dataset path, usually the .csv name; see resolve_dataset
+        columns (list, optional): Columns to load, all by default
+
+    Returns:
+        pd.DataFrame: The dataset
+    """
+    path = resolve_dataset(path)
+    if path.endswith(".csv"):
+        frame = pd.read_csv(path, usecols=columns)
+        # usecols keeps file order, not the order asked for
+        return frame if columns is None else frame[columns]
+    return read_table(path, columns).to_pandas()
+
+
+def convert_csv(csv_path, fmt="parquet", chunk_size=1_000_000, output_path=None):
+    """
+    Write a typed columnar copy of a CSV.
+
+    The CSV is parsed by pandas in chunks, so values and dtypes match
+    pd.read_csv and memory stays bounded by chunk_size rows. Every chunk is
+    cast to the first chunk's schema; a column whose type changes further
+    down the file (ints gaining a NaN, say) needs a larger chunk_size.
+
+    Args:
+        csv_path (str): CSV file to convert
+        fmt (str): "parquet" (compressed) or "arrow" (uncompressed IPC, best for memory-mapping)
+        chunk_size (int): Rows parsed per chunk
+        output_path (str, optional): Defaults to the CSV path with the format's suffix
+
+    Returns:
+        tuple: (output_path, rows written)
+    """
+    pa = _pyarrow()
+    if output_path is None:
+        output_path = columnar_path(csv_path, fmt)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    writer = None
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = _open_writer(tmp_path, fmt, schema)
+            writer.write_table(table.cast(schema))
+            rows += len(chunk)
+        if writer is None:
+            # Header-only CSV: still write a file with the columns
+            table = pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False)
+            writer = _open_writer(tmp_path, fmt, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, output_path)
+    return output_path, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV datasets to typed Parquet or Arrow files")
+    parser.add_argument("paths", nargs="*", help="CSV files, the repository datasets by default")
+    parser.add_argument("--format", choices=sorted(SUFFIXES), default="parquet", help="Columnar format to write")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="CSV rows parsed per chunk")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(path for pattern in DEFAULT_DATASETS for path in glob.glob(pattern))
+    for path in paths:
+        output_path, rows = convert_csv(path, args.format, args.chunk_size)
+        print(f"✅ '{path}' converted to '{output_path}' ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+from datetime import date, timedelta
+
+import numpy as np
+
+from event_fomo_score import MAX_DAYS_SINCE_EVENT
+
+_KEY = b'"last_event_attended"'
+
+
+def refresh_range(previous_day, run_day, quiz_idle_days, max_days=MAX_DAYS_SINCE_EVENT):
+    """
+    last_event_attended dates of users whose date-dependent nudges may differ between two days.
+
+    Only the quiz rule (days_since_event >= quiz_idle_days) and the FOMO time
+    term (min(days_since_event / max_days, 1)) read the date. A user whose
+    last event was on day d flips quiz eligibility when d + quiz_idle_days
+    falls after previous_day, and has a moving time term while
+    previous_day - d < max_days. Everyone older is past both and is skipped.
+    With quiz_idle_days <= max_days the range holds exactly those users.
+
+    Args:
+        previous_day (date): Day the nudges were last computed for
+        run_day (date): Day to compute them for
+        quiz_idle_days (int): Quiz rule threshold
+        max_days (int): Days after which the FOMO time term is capped
+
+    Returns:
+        tuple: (first_day, last_day), inclusive, or None if run_day is not after previous_day
+    """
+    if previous_day >= run_day:
+        return None
+    first_day = min(previous_day - timedelta(days=max_days - 1), previous_day + timedelta(days=1 - quiz_idle_days))
+    return first_day, run_day
+
+
+def _line_day(line):
+    # Reads the date straight from the bytes instead of parsing the whole line
+    start = line.find(_KEY)
+    if start < 0:
+        return None
+    end = start + len(_KEY)
+    quote = line.find(b'"', end)
+    if quote < 0 or line[end:quote].strip(b" :\t") or line[quote + 11:quote + 12] != b'"':
+        return None
+    try:
+        return date.fromisoformat(line[quote + 1:quote + 11].decode()).toordinal()
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+class DayIndex:
+    """
+    Byte offsets of a JSONL users file, sorted by last_event_attended.
+
+    Lets a daily run read only the users in a date range instead of the
+    whole file. It is stored next to the file in <path>.dayindex/ and rebuilt
+    when the file's size or mtime changes. Lines without a readable date are
+    counted as unreadable and not indexed; decode_record would reject them.
+    """
+
+    def __init__(self, days, offsets, unreadable):
+        self.days = days
+        self.offsets = offsets
+        self.unreadable = unreadable
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    def build(cls, input_path):
+        days, offsets, unreadable = [], [], 0
+        offset = 0
+        with open(input_path, "rb") as f:
+            for line in f:
+                day = _line_day(line)
+                if day is not None:
+                    days.append(day)
+                    offsets.append(offset)
+                elif line.strip():
+                    unreadable += 1
+                offset += len(line)
+        days = np.array(days, dtype=np.int32)
+        order = np.argsort(days, kind="stable")
+        return cls(days[order], np.array(offsets, dtype=np.int64)[order], unreadable)
+
+    @staticmethod
+    def _source(input_path):
+        stat = os.stat(input_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def save(self, path, source):
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "days.npy"), self.days)
+        np.save(os.path.join(tmp_path, "offsets.npy"), self.offsets)
+        with open(os.path.join(tmp_path, "source.json"), "w") as f:
+            json.dump(dict(source, unreadable=self.unreadable), f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def open(cls, input_path):
+        """
+        Load the index of input_path, building and saving it first if it is missing or stale.
+
+        Returns:
+            DayIndex: Index of the file as it is now
+        """
+        path = input_path + ".dayindex"
+        source = cls._source(input_path)
+        try:
+            with open(os.path.join(path, "source.json")) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = None
+        if saved is not None and {key: saved[key] for key in source} == source:
+            return cls(
+                np.load(os.path.join(path, "days.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, "offsets.npy"), mmap_mode="r"),
+                saved["unreadable"],
+            )
+        index = cls.build(input_path)
+        index.save(path, source)
+        return index
+
+    def offsets_between(self, first_day, last_day):
+        """Offsets of the lines whose last event is in [first_day, last_day], in file order."""
+        lo = np.searchsorted(self.days, first_day.toordinal(), side="left")
+        hi = np.searchsorted(self.days, last_day.toordinal(), side="right")
+        return np.sort(self.offsets[lo:hi])
+
+
+def read_lines(input_path, offsets, chunk_size):
+    """Yield chunks of the lines starting at offsets."""
+    with open(input_path, "rb") as f:
+        chunk = []
+        for offset in offsets:
+            f.seek(offset)
+            chunk.append(f.readline())
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
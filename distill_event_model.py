@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from finite_domain import feature_domain
+from model_compiler import compile_forest
+
+FEATURES = ["karma", "event_fomo_score"]
+
+
+class DistilledEventModel:
+    """
+    The event forest reduced to a (karma interval x FOMO value) decision table.
+
+    A forest is piecewise constant in karma: only which side of each split
+    threshold a value falls on matters. sklearn compares float32 inputs, so
+    the thresholds are snapped to the float32 values below them and every
+    karma in one interval between two cuts takes the same path through
+    every tree. The FOMO axis is the served grid (two decimals), so the
+    table reproduces the forest exactly for every served input; off-grid
+    FOMO values are snapped to the nearest grid value.
+    """
+
+    accepts_arrays = True
+
+    def __init__(self, karma_cuts, fomo_values, table, classes):
+        self.karma_cuts = karma_cuts
+        self.fomo_values = fomo_values
+        self.table = table
+        self.classes_ = classes
+        self.feature_names_in_ = FEATURES
+        self.n_features_in_ = len(FEATURES)
+
+    @classmethod
+    def distill(cls, model, fomo_values):
+        """
+        Build the table for a fitted event forest.
+
+        Args:
+            model: RandomForestClassifier or CompiledForest over FEATURES
+            fomo_values (numpy.ndarray): Sorted event_fomo_score values served
+
+        Returns:
+            DistilledEventModel: Table agreeing with model on every karma and fomo_values
+        """
+        forest = compile_forest(model)
+        names = list(forest.feature_names_in_) if forest.feature_names_in_ is not None else FEATURES
+        karma_index = names.index("karma")
+
+        is_split = forest.children_left != np.arange(len(forest.children_left))
+        thresholds = np.unique(forest.threshold[is_split & (forest.feature == karma_index)])
+        # Largest float32 at or below each threshold: a float32 karma goes left iff it is <= that value
+        cuts = thresholds.astype(np.float32)
+        above = cuts.astype(np.float64) > thresholds
+        cuts[above] = np.nextafter(cuts[above], np.float32(-np.inf))
+        cuts = np.unique(cuts)
+
+        # One karma per interval: each cut itself, plus one value above the last cut
+        representatives = np.append(cuts, np.nextafter(cuts[-1], np.float32(np.inf)) if len(cuts) else np.float32(0))
+        grid = np.empty((len(representatives) * len(fomo_values), 2))
+        grid[:, karma_index] = np.repeat(representatives.astype(np.float64), len(fomo_values))
+        grid[:, 1 - karma_index] = np.tile(fomo_values, len(representatives))
+        classes = forest.classes_
+        labels = np.searchsorted(classes, forest.predict(grid)).reshape(len(representatives), len(fomo_values))
+
+        # Drop cuts between neighbouring intervals that decide identically
+        keep = np.any(labels[1:] != labels[:-1], axis=1)
+        table = np.concatenate([labels[:1], labels[1:][keep]]).astype(np.uint8)
+        return cls(cuts[keep].astype(np.float64), np.asarray(fomo_values, dtype=np.float64), table, np.asarray(classes))
+
+    def _columns(self, X):
+        if hasattr(X, "columns"):
+            X = X[FEATURES]
+        X = np.asarray(X, dtype=np.float64)
+        return X[:, 0], X[:, 1]
+
+    def predict(self, X):
+        karma, fomo = self._columns(X)
+        rows = np.searchsorted(self.karma_cuts, karma.astype(np.float32).astype(np.float64), side="left")
+        # Nearest served FOMO value
+        columns = np.clip(np.searchsorted(self.fomo_values, fomo), 1, len(self.fomo_values) - 1)
+        columns -= fomo - self.fomo_values[columns - 1] <= self.fomo_values[columns] - fomo
+        return self.classes_.take(self.table[rows, columns])
+
+    @property
+    def nbytes(self):
+        return self.karma_cuts.nbytes + self.fomo_values.nbytes + self.table.nbytes + self.classes_.nbytes
+
+    def save(self, path):
+        """Write the table as .npy arrays, memory-mappable by load()."""
+        os.makedirs(path, exist_ok=True)
+        for name in ("karma_cuts", "fomo_values", "table"):
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        np.save(os.path.join(path, "classes.npy"), self.classes_)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ("karma_cuts", "fomo_values", "table", "classes")}
+        return cls(**arrays)
+
+
+def agreement(full, fast, X):
+    """Share of rows of X on which both models predict the same class."""
+    return float(np.mean(np.asarray(full.predict(X)) == np.asarray(fast.predict(X))))
+
+
+def latency_us(model, X, batch_size, repeat=200):
+    """Median microseconds per predict call on batch_size rows of X."""
+    batch = X[:batch_size]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        model.predict(batch)
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1e6, 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distill the event forest into a compact decision table")
+    parser.add_argument("--config", default="config.json", help="Config with the model paths and feature domains")
+    parser.add_argument("--test", default="model/ml_model/test_dataset/test_event_dataset.csv",
+                        help="Labelled event test set to report agreement on")
+    args = parser.parse_args(argv)
+
+    import joblib
+    import pandas as pd
+
+    with open(args.config) as f:
+        config = json.load(f)
+    models = config["models"]
+    fomo_values = feature_domain(config["inference"]["feature_domains"]["event"]["event_fomo_score"])
+
+    full = joblib.load(models["event_path"])
+    started = time.perf_counter()
+    fast = DistilledEventModel.distill(full, fomo_values)
+    build_s = time.perf_counter() - started
+    fast.save(models["event_distilled_path"])
+
+    test = pd.read_csv(args.test)
+    X_test = test[FEATURES]
+    served = X_test.assign(event_fomo_score=X_test["event_fomo_score"].round(2))
+    report = {
+        "karma_intervals": len(fast.karma_cuts) + 1,
+        "table_shape": list(fast.table.shape),
+        "distilled_bytes": int(fast.nbytes),
+        "joblib_bytes": os.path.getsize(models["event_path"]),
+        "build_s": round(build_s, 2),
+        "agreement_test_set": round(agreement(full, fast, X_test), 4),
+        "agreement_test_set_served": round(agreement(full, fast, served), 4),
+        "accuracy_full": round(float(np.mean(full.predict(X_test) == test["should_nudge_event"])), 4),
+        "accuracy_fast": round(float(np.mean(fast.predict(X_test) == test["should_nudge_event"])), 4),
+        "predict_us": {
+            f"{name}_batch_{size}": latency_us(model, frame, size)
+            for name, model, frame in (
+                ("full", full, served),
+                ("compiled", compile_forest(full), served.to_numpy()),
+                ("fast", fast, served.to_numpy()),
+            )
+            for size in (1, 64)
+        },
+    }
+    print(json.dumps(report, indent=2))
+    print(f"✅ {models['event_path']} distilled to {models['event_distilled_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,233 @@
-from datetime import datetime
+from datetime import date, datetime
 import math
 
-def calculate_event_fomo_score(user_data, peer_snapshot):
+import numpy as np
+
+# Constants
+BUDDY_WEIGHT = 0.4
+BATCH_WEIGHT = 0.3
+TIME_WEIGHT = 0.3
+MAX_DAYS_SINCE_EVENT = 90  # Maximum days to consider for time decay
+
+def batch_attendance_score(batch_event_attendance):
     """
-    Calculate the event FOMO (Fear of Missing Out) score for a user.
+    Calculate the batch attendance factor of the FOMO score.
+    
+    This only depends on the peer snapshot, so it can be computed once per
+    snapshot and shared by every user of the batch.
     
     Args:
-        user_data (dict): User's profile and activity data
-        peer_snapshot (dict): Peer snapshot data containing batch and buddy information
+        batch_event_attendance (dict): Event name -> batch attendance count
         
     Returns:
-        float: Event FOMO score between 0 and 1
+        float: Batch attendance factor between 0 and 1
     """
-    # Constants
-    BUDDY_WEIGHT = 0.4
-    BATCH_WEIGHT = 0.3
-    TIME_WEIGHT = 0.3
-    MAX_DAYS_SINCE_EVENT = 90  # Maximum days to consider for time decay
-    
-    # 1. Calculate buddy factor (0 to 1)
-    buddy_score = 0
-    if user_data['profile']['buddy_count'] > 0:
-        buddies_attending = len(peer_snapshot['buddies_attending_events'])
-        buddy_score = min(buddies_attending / user_data['profile']['buddy_count'], 1.0)
-    
-    # 2. Calculate batch attendance factor (0 to 1)
     batch_scores = []
-    for event, attendance in peer_snapshot['batch_event_attendance'].items():
+    for event, attendance in batch_event_attendance.items():
         # Normalize attendance score (0-1) based on batch_attendance_trigger
         normalized_score = min(attendance / 10, 1.0)  # 10 is batch_attendance_trigger
         batch_scores.append(normalized_score)
     
-    batch_score = sum(batch_scores) / len(batch_scores) if batch_scores else 0
+    return sum(batch_scores) / len(batch_scores) if batch_scores else 0
+
+def event_fomo_score_from_parts(buddy_count, buddies_attending, batch_score, days_since_event):
+    """
+    Combine precomputed FOMO inputs into the final score.
     
-    # 3. Calculate time decay factor (0 to 1)
-    last_event_date = datetime.strptime(user_data['activity']['last_event_attended'], '%Y-%m-%d')
-    days_since_event = (datetime.now() - last_event_date).days
+    Args:
+        buddy_count (int): Profile buddy_count
+        buddies_attending (int): len(buddies_attending_events)
+        batch_score (float): Result of batch_attendance_score
+        days_since_event (int): Days since the user's last event
+        
+    Returns:
+        float: Event FOMO score between 0 and 1
+    """
+    # 1. Calculate buddy factor (0 to 1)
+    buddy_score = 0
+    if buddy_count > 0:
+        buddy_score = min(buddies_attending / buddy_count, 1.0)
+    
+    # 2. Calculate time decay factor (0 to 1)
     time_score = min(days_since_event / MAX_DAYS_SINCE_EVENT, 1.0)
     
-    # 4. Calculate final weighted score
+    # 3. Calculate final weighted score
     fomo_score = (
         BUDDY_WEIGHT * buddy_score +
         BATCH_WEIGHT * batch_score +
         TIME_WEIGHT * time_score
     )
     
-    # 5. Apply sigmoid function to get a smooth 0-1 score
+    # 4. Apply sigmoid function to get a smooth 0-1 score
     fomo_score = 1 / (1 + math.exp(-5 * (fomo_score - 0.5)))
     
     return round(fomo_score, 2)
 
+def calculate_event_fomo_score(user_data, peer_snapshot):
+    """
+    Calculate the event FOMO (Fear of Missing Out) score for a user.
+    
+    Args:
+        user_data (dict): User's profile and activity data
+        peer_snapshot (dict): Peer snapshot data containing batch and buddy information
+        
+    Returns:
+        float: Event FOMO score between 0 and 1
+    """
+    last_event_date = datetime.strptime(user_data['activity']['last_event_attended'], '%Y-%m-%d')
+    days_since_event = (datetime.now() - last_event_date).days
+    
+    return event_fomo_score_from_parts(
+        user_data['profile']['buddy_count'],
+        len(peer_snapshot['buddies_attending_events']),
+        batch_attendance_score(peer_snapshot['batch_event_attendance']),
+        days_since_event,
+    )
+
+def batch_attendance_scores(batch_event_attendance):
+    """
+    Vectorized batch_attendance_score.
+    
+    Args:
+        batch_event_attendance (array-like): Users x events attendance matrix, one
+            row per user in the order of its batch_event_attendance dict, padded
+            with NaN where a snapshot has fewer events
+        
+    Returns:
+        numpy.ndarray: Batch attendance factors between 0 and 1
+    """
+    attendance = np.asarray(batch_event_attendance, dtype=np.float64)
+    n = attendance.shape[0]
+    
+    # Sum event columns left to right so the float additions happen in the
+    # same order as sum() in the scalar version
+    batch_total = np.zeros(n)
+    event_count = np.zeros(n)
+    for column in attendance.T:
+        present = ~np.isnan(column)
+        batch_total += np.where(present, np.minimum(column / 10, 1.0), 0.0)
+        event_count += present
+    batch_score = np.zeros(n)
+    np.divide(batch_total, event_count, out=batch_score, where=event_count > 0)
+    return batch_score
+
+def days_since_events(last_event_attended, today=None):
+    """
+    Vectorized day difference between today and each last event date.
+    
+    Args:
+        last_event_attended (array-like): Last event dates as datetime64 values,
+            date objects or 'YYYY-MM-DD' strings
+        today (date, optional): Reference date, defaults to the local date used
+            by datetime.now() in the scalar version
+        
+    Returns:
+        numpy.ndarray: Whole days since each event
+    """
+    if today is None:
+        today = date.today()
+    last_event_days = np.asarray(last_event_attended, dtype='datetime64[D]')
+    return (np.datetime64(today, 'D') - last_event_days).astype(np.int64)
+
+def event_fomo_scores_from_parts(buddy_counts, buddies_attending, batch_scores, days_since_event):
+    """
+    Vectorized event_fomo_score_from_parts.
+    
+    Args:
+        buddy_counts (array-like): Profile buddy_count per user
+        buddies_attending (array-like): len(buddies_attending_events) per user
+        batch_scores (array-like): Batch attendance factor per user
+        days_since_event (array-like): Days since each user's last event
+        
+    Returns:
+        numpy.ndarray: Event FOMO scores between 0 and 1
+    """
+    buddy_counts = np.asarray(buddy_counts, dtype=np.int64)
+    buddies_attending = np.asarray(buddies_attending, dtype=np.int64)
+    batch_scores = np.asarray(batch_scores, dtype=np.float64)
+    days_since_event = np.asarray(days_since_event, dtype=np.int64)
+    
+    # 1. Calculate buddy factor (0 to 1)
+    buddy_score = np.zeros(len(buddy_counts))
+    np.divide(buddies_attending, buddy_counts, out=buddy_score, where=buddy_counts > 0)
+    np.minimum(buddy_score, 1.0, out=buddy_score)
+    
+    # 2. Calculate time decay factor (0 to 1)
+    time_score = np.minimum(days_since_event / MAX_DAYS_SINCE_EVENT, 1.0)
+    
+    # 3. Calculate final weighted score
+    fomo_score = (
+        BUDDY_WEIGHT * buddy_score +
+        BATCH_WEIGHT * batch_scores +
+        TIME_WEIGHT * time_score
+    )
+    
+    # 4. Apply sigmoid function and round to two decimals
+    sigmoid = 1 / (1 + np.exp(-5 * (fomo_score - 0.5)))
+    rounded = np.round(sigmoid, 2)
+    
+    # np.exp may differ from math.exp in the last bit and np.round scales by
+    # 100 before rounding, so values sitting on a rounding tie are redone with
+    # the scalar arithmetic to stay identical to round(..., 2)
+    scaled = sigmoid * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(1 / (1 + math.exp(-5 * (float(fomo_score[i]) - 0.5))), 2)
+    
+    return rounded
+
+def calculate_event_fomo_scores(buddy_counts, buddies_attending, batch_event_attendance, last_event_attended, today=None):
+    """
+    Vectorized calculate_event_fomo_score over columnar inputs.
+    
+    The result is identical to calling calculate_event_fomo_score row by row,
+    including the final round(..., 2).
+    
+    Args:
+        buddy_counts (array-like): Profile buddy_count per user
+        buddies_attending (array-like): len(buddies_attending_events) per user
+        batch_event_attendance (array-like): Users x events attendance matrix, see
+            batch_attendance_scores
+        last_event_attended (array-like): Last event dates, see days_since_events
+        today (date, optional): Reference date, defaults to today's local date
+        
+    Returns:
+        numpy.ndarray: Event FOMO scores between 0 and 1
+    """
+    return event_fomo_scores_from_parts(
+        buddy_counts,
+        buddies_attending,
+        batch_attendance_scores(batch_event_attendance),
+        days_since_events(last_event_attended, today),
+    )
+
+def build_event_fomo_columns(user_data_list, peer_snapshot_list):
+    """
+    Convert per-user dicts into the columnar inputs of calculate_event_fomo_scores.
+    
+    Args:
+        user_data_list (list): User profile and activity dicts
+        peer_snapshot_list (list): Matching peer snapshot dicts
+        
+    Returns:
+        tuple: (buddy_counts, buddies_attending, batch_event_attendance, last_event_attended)
+    """
+    n = len(user_data_list)
+    width = max((len(p['batch_event_attendance']) for p in peer_snapshot_list), default=0)
+    buddy_counts = np.empty(n, dtype=np.int64)
+    buddies_attending = np.empty(n, dtype=np.int64)
+    attendance = np.full((n, width), np.nan)
+    last_event_attended = np.empty(n, dtype='datetime64[D]')
+    
+    for i, (user_data, peer_snapshot) in enumerate(zip(user_data_list, peer_snapshot_list)):
+        buddy_counts[i] = user_data['profile']['buddy_count']
+        buddies_attending[i] = len(peer_snapshot['buddies_attending_events'])
+        values = list(peer_snapshot['batch_event_attendance'].values())
+        attendance[i, :len(values)] = values
+        last_event_attended[i] = user_data['activity']['last_event_attended']
+    
+    return buddy_counts, buddies_attending, attendance, last_event_attended
+
 def get_event_fomo_insights(user_data, peer_snapshot):
     """
     Generate insights about the user's event FOMO score.
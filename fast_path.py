@@ -0,0 +1,129 @@
+from datetime import date
+
+import orjson
+
+from event_fomo_score import batch_attendance_score
+from nudge_engine import FeatureRecord
+from snapshot_registry import BatchAggregates
+
+# Only the fields scoring reads are checked; everything else in a line is
+# ignored. Unlike pydantic, strings are never coerced to numbers and dates
+# must be YYYY-MM-DD. Like pydantic, floats in int fields are truncated, so
+# both paths score (and cache) the same input the same way.
+_NUMBER = (int, float)
+
+
+class LineError(ValueError):
+    pass
+
+
+def _field(document, name, types, where):
+    try:
+        value = document[name]
+    except (KeyError, TypeError):
+        raise LineError(f"{where}{name} is required")
+    if not isinstance(value, types) or (types is not bool and isinstance(value, bool)):
+        raise LineError(f"{where}{name} has the wrong type")
+    return value
+
+
+def _int_field(document, name, where):
+    return int(_field(document, name, _NUMBER, where))
+
+
+def _last_event_attended(activity):
+    value = _field(activity, "last_event_attended", str, "activity.")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise LineError("activity.last_event_attended must be a YYYY-MM-DD date")
+
+
+def decode_record(document, resolve_batch_snapshot):
+    """
+    Build a FeatureRecord from one parsed JSON document.
+
+    Args:
+        document (dict): A UserInput-shaped document
+        resolve_batch_snapshot: Callable returning (version, peer_snapshot,
+            aggregates) for a batch_id, or None if unknown
+
+    Returns:
+        FeatureRecord: The user's scoring inputs
+
+    Raises:
+        LineError: If a field scoring needs is missing or malformed
+    """
+    if not isinstance(document, dict):
+        raise LineError("each line must be a JSON object")
+    user_id = _field(document, "user_id", str, "")
+    profile = _field(document, "profile", dict, "")
+    activity = _field(document, "activity", dict, "")
+
+    snapshot = document.get("peer_snapshot")
+    if snapshot is not None:
+        if not isinstance(snapshot, dict):
+            raise LineError("peer_snapshot has the wrong type")
+        attendance = _field(snapshot, "batch_event_attendance", dict, "peer_snapshot.")
+        if not all(isinstance(count, _NUMBER) for count in attendance.values()):
+            raise LineError("peer_snapshot.batch_event_attendance counts must be numbers")
+        attendance = {event_name: int(count) for event_name, count in attendance.items()}
+        buddies_attending_events = _field(snapshot, "buddies_attending_events", list, "peer_snapshot.")
+        batch_resume_uploaded_pct = _int_field(snapshot, "batch_resume_uploaded_pct", "peer_snapshot.")
+        aggregates = BatchAggregates(
+            attendance_total=sum(attendance.values()),
+            batch_score=batch_attendance_score(attendance),
+            buddies_attending=len(buddies_attending_events),
+        )
+    else:
+        batch_id = document.get("batch_id")
+        if not isinstance(batch_id, str):
+            raise LineError("either peer_snapshot or batch_id is required")
+        entry = resolve_batch_snapshot(batch_id)
+        if entry is None:
+            raise LineError(f"Unknown batch_id: {batch_id}")
+        _, peer_snapshot, aggregates = entry
+        buddies_attending_events = peer_snapshot.buddies_attending_events
+        batch_resume_uploaded_pct = peer_snapshot.batch_resume_uploaded_pct
+
+    return FeatureRecord(
+        user_id,
+        _field(profile, "resume_uploaded", bool, "profile."),
+        _int_field(profile, "projects_added", "profile."),
+        _int_field(profile, "karma", "profile."),
+        _int_field(profile, "buddy_count", "profile."),
+        _last_event_attended(activity),
+        batch_resume_uploaded_pct,
+        buddies_attending_events,
+        aggregates.buddies_attending,
+        aggregates.attendance_total,
+        aggregates.batch_score,
+    )
+
+
+def decode_lines(body, resolve_batch_snapshot):
+    """
+    Decode a JSONL request body.
+
+    Returns:
+        tuple: (outputs, records, positions) where outputs has one slot per
+            line, already filled with an error dict for lines that failed,
+            and records[i] belongs at outputs[positions[i]]
+    """
+    outputs, records, positions = [], [], []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        position = len(outputs)
+        outputs.append(None)
+        try:
+            records.append(decode_record(orjson.loads(line), resolve_batch_snapshot))
+        except (orjson.JSONDecodeError, LineError) as e:
+            outputs[position] = {"line": position, "status": "error", "detail": str(e)}
+            continue
+        positions.append(position)
+    return outputs, records, positions
+
+
+def encode_lines(outputs):
+    return b"".join(orjson.dumps(output, option=orjson.OPT_APPEND_NEWLINE) for output in outputs)
@@ -0,0 +1,102 @@
+from itertools import product
+
+import numpy as np
+
+
+def feature_domain(spec):
+    """
+    Build the sorted set of values a feature can take from its config spec.
+
+    Args:
+        spec: A list of values, a {"min", "max", "divisor"} dict describing the
+            integers min..max divided by divisor, or None for an unbounded feature
+
+    Returns:
+        numpy.ndarray or None: Sorted unique values, None when not enumerable
+    """
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        values = np.arange(spec["min"], spec["max"] + 1) / spec.get("divisor", 1)
+    else:
+        values = np.asarray(spec, dtype=np.float64)
+    return np.unique(values)
+
+
+class FiniteDomainModel:
+    """
+    Answers predict() from a table enumerated once over a finite input domain.
+
+    Rows whose values all fall inside the domain are looked up in O(1); any
+    other rows are passed to the wrapped model.
+    """
+
+    def __init__(self, model, domains, feature_names):
+        self.model = model
+        self.domains = domains
+        self.feature_names = list(feature_names)
+
+        grid = np.array(list(product(*domains)), dtype=np.float64)
+        if not self.accepts_arrays:
+            import pandas as pd
+            grid = pd.DataFrame(grid, columns=self.feature_names)
+        self.table = np.asarray(model.predict(grid))
+        self.shape = tuple(len(domain) for domain in domains)
+
+    @property
+    def accepts_arrays(self):
+        return getattr(self.model, "accepts_arrays", False)
+
+    def _locate(self, X):
+        n_samples = X.shape[0]
+        in_domain = np.ones(n_samples, dtype=bool)
+        indices = []
+        for column, domain in zip(X.T, self.domains):
+            index = np.minimum(np.searchsorted(domain, column), len(domain) - 1)
+            in_domain &= domain[index] == column
+            indices.append(index)
+        flat = np.ravel_multi_index(indices, self.shape) if indices else np.zeros(n_samples, dtype=np.intp)
+        return flat, in_domain
+
+    def predict(self, X):
+        frame = X if hasattr(X, "columns") else None
+        if frame is not None:
+            X = frame[self.feature_names]
+        values = np.asarray(X, dtype=np.float64)
+
+        flat, in_domain = self._locate(values)
+        if in_domain.all():
+            return self.table[flat]
+
+        predictions = np.empty(values.shape[0], dtype=self.table.dtype)
+        predictions[in_domain] = self.table[flat[in_domain]]
+        outside = ~in_domain
+        fallback_input = frame[outside] if frame is not None else values[outside]
+        predictions[outside] = self.model.predict(fallback_input)
+        return predictions
+
+
+def enumerate_domain(model, domain_specs, max_table_size):
+    """
+    Wrap a model in a FiniteDomainModel when its inputs are enumerable.
+
+    Args:
+        model: Fitted model exposing predict(), or None
+        domain_specs (dict): Feature name -> spec understood by feature_domain,
+            in the model's feature order
+        max_table_size (int): Largest number of table entries worth precomputing
+
+    Returns:
+        The FiniteDomainModel, or model itself when any feature is unbounded or
+        the table would be larger than max_table_size
+    """
+    if model is None or not domain_specs:
+        return model
+
+    domains = [feature_domain(spec) for spec in domain_specs.values()]
+    if any(domain is None for domain in domains):
+        return model
+    if np.prod([len(domain) for domain in domains], dtype=np.float64) > max_table_size:
+        return model
+
+    return FiniteDomainModel(model, domains, domain_specs.keys())
@@ -0,0 +1,61 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Groups concurrent inference requests into one call on a worker executor.
+
+    Coroutines await submit(item). Items arriving within max_wait_ms of the
+    first pending one (or until max_batch_size is reached) are passed together
+    to predict_batch, which runs on the executor so the event loop stays free,
+    and each caller gets back its own result.
+    """
+
+    def __init__(self, predict_batch, executor, max_batch_size, max_wait_ms):
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+        task = loop.run_in_executor(self.executor, self.predict_batch, items)
+        task.add_done_callback(lambda done: self._resolve(done, futures))
+
+    @staticmethod
+    def _resolve(done, futures):
+        error = done.exception()
+        if error is None:
+            results = list(done.result())
+            if len(results) == len(futures):
+                for future, result in zip(futures, results):
+                    if not future.done():
+                        future.set_result(result)
+                return
+            # A short result list would otherwise leave some callers waiting forever
+            error = RuntimeError(f"predict_batch returned {len(results)} results for {len(futures)} items")
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
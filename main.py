@@ -1,145 +1,419 @@
+import asyncio
 import json
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-import joblib
-import pandas as pd
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from time import perf_counter
+from typing import List
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+from fastapi.routing import APIRoute
 from datetime import date, datetime
-from event_fomo_score import calculate_event_fomo_score
+from fast_path import decode_lines, encode_lines
+from inference_batcher import MicroBatcher
+from metrics import SIZE_BUCKETS, MetricsRegistry
+from nudge_engine import (
+    FeatureRecord, accepts_arrays, build_feature_frames, build_nudges, compute_event_fomo_score, evaluate_rules,
+    feature_row, score_users,
+)
+from profiling import RequestProfiler, parse_capture
+from response_cache import make_cache_backend, response_cache_key
+from pydantic import ValidationError
+from schemas import Activity, ActivityEvent, BatchUserInput, PeerSnapshot, Profile, UserInput, UserState
+from serving_registry import ServingRegistry
+from snapshot_registry import PeerSnapshotRegistry, compute_batch_aggregates
+from state_store import UserStateStore
+
+
+CONFIG_PATH = os.environ.get("ENGAGEMENT_CONFIG", "config.json")
+
+with open(CONFIG_PATH) as f:
+    config = json.load(f)
+
+metrics = MetricsRegistry(enabled=config["observability"]["metrics"])
+requests_total = metrics.counter("engagement_requests_total", "Requests handled per route and status code")
+request_seconds = metrics.histogram("engagement_request_seconds", "End-to-end request handling time per route")
+inference_batch_size = metrics.histogram(
+    "engagement_inference_batch_size", "Rows per micro-batched predict call", SIZE_BUCKETS
+)
+response_cache_lookups = metrics.counter(
+    "engagement_response_cache_total", "Response cache lookups per result (hit, miss, error)"
+)
+request_started: ContextVar = ContextVar("request_started", default=None)
+
+# Profiling hooks are only installed when enabled in config or when
+# ENGAGEMENT_PROFILE arms a capture at startup, e.g. "cprofile:requests=200"
+# or "sample:seconds=30"; otherwise request handling is untouched
+PROFILE_CAPTURE = os.environ.get("ENGAGEMENT_PROFILE")
+PROFILE_EXCLUDED_PATHS = {"/metrics", "/health", "/ready"}
+profiling_config = config["observability"]["profiling"]
+profiler = None
+if profiling_config["enabled"] or PROFILE_CAPTURE:
+    profiler = RequestProfiler(profiling_config["output_dir"], profiling_config["sample_interval_ms"])
+    if PROFILE_CAPTURE:
+        profiler.start(**parse_capture(PROFILE_CAPTURE))
+
+
+class TimedRoute(APIRoute):
+    """Records request timings; the endpoint sees its start time via request_started."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path
+        if profiler is not None and not path.startswith("/admin/") and path not in PROFILE_EXCLUDED_PATHS:
+            handler = profiler.wrap_handler(handler)
+        if not metrics.enabled:
+            return handler
+
+        async def timed_handler(request):
+            started = perf_counter()
+            request_started.set(started)
+            status_code = 500
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except RequestValidationError:
+                status_code = 422
+                raise
+            except HTTPException as e:
+                status_code = e.status_code
+                raise
+            finally:
+                request_seconds.observe(perf_counter() - started, route=path)
+                requests_total.inc(route=path, status=status_code)
+
+        return timed_handler
+
+
+def observe_request_parsing():
+    # Time from the route handler starting to the endpoint running is body
+    # reading plus pydantic validation of the request model
+    started = request_started.get()
+    if started is not None:
+        metrics.observe_stage("request_parsing", perf_counter() - started)
 
 
 app = FastAPI()
+app.router.route_class = TimedRoute
 
-try:
-    resume_model = joblib.load("model/ml_model/models/random_forest_resume.joblib")
-    event_model = joblib.load("model/ml_model/models/rf_model_event.joblib")
-except FileNotFoundError as e:
-    print(f"Warning: Model files not found: {e}")
-    resume_model = None
-    event_model = None
+snapshot_registry = PeerSnapshotRegistry(cache_size=config["peer_snapshots"]["cache_size"])
+state_store = UserStateStore(config["state_store"]["path"])
 
-with open("config.json") as f:
-    config = json.load(f)
+# Model inference is CPU bound, so it runs on a bounded pool instead of the
+# event loop; concurrent single-user requests are micro-batched into one predict
+inference_executor = ThreadPoolExecutor(
+    max_workers=config["inference"]["executor_workers"], thread_name_prefix="inference"
+)
+
+# Rules and models are read per request from registry.current, which reloads
+# swap atomically. Settings used to build the objects above (metrics,
+# executor, batcher, caches) still need a restart to change.
+registry = ServingRegistry(CONFIG_PATH, config)
+# Future for the background load when "load_mode" is "lazy"
+model_loading = None
+
+# "eager" loads before the app is importable; "lazy" lets uvicorn accept
+# connections at once and loads in the background, with /ready reporting 503
+# until the models are warm
+if config["models"]["load_mode"] == "eager":
+    registry.reload()
+
+
+@app.on_event("startup")
+async def start_serving_registry():
+    global model_loading
+    if config["models"]["load_mode"] == "lazy" and registry.current.resume_model is None:
+        model_loading = asyncio.get_running_loop().run_in_executor(inference_executor, registry.reload)
+    if config["reload"]["watch"]:
+        registry.watch(config["reload"]["poll_interval_s"])
+
+
+@app.on_event("shutdown")
+def stop_serving_registry():
+    registry.stop()
+
+
+async def wait_for_models():
+    if model_loading is not None and not model_loading.done():
+        await model_loading
+
+
+def predict_rows_with(serving, rows):
+    with metrics.stage("dataframe_construction"):
+        X_resume, X_event = build_feature_frames(rows, accepts_arrays(serving.resume_model, serving.event_model))
+    with metrics.stage("resume_predict"):
+        resume_preds = serving.resume_model.predict(X_resume)
+    with metrics.stage("event_predict"):
+        event_preds = serving.event_model.predict(X_event)
+    return list(zip(resume_preds, event_preds))
+
+
+def predict_batch(items):
+    """Predict (serving, row) items, grouped so each row uses its request's models."""
+    groups = {}
+    for index, (serving, row) in enumerate(items):
+        groups.setdefault(serving.version, (serving, []))[1].append(index)
+
+    results = [None] * len(items)
+    for serving, indices in groups.values():
+        predictions = predict_rows_with(serving, [items[index][1] for index in indices])
+        for index, prediction in zip(indices, predictions):
+            results[index] = prediction
+    if metrics.enabled:
+        inference_batch_size.observe(len(items))
+    return results
+
+
+def run_inference(function):
+    """Run function on the inference pool, inside profile captures when profiling is installed."""
+    if profiler is not None:
+        function = profiler.wrap(function)
+    return asyncio.get_running_loop().run_in_executor(inference_executor, function)
+
+
+inference_batcher = MicroBatcher(
+    predict_batch if profiler is None else profiler.wrap(predict_batch),
+    inference_executor,
+    max_batch_size=config["inference"]["max_batch_size"],
+    max_wait_ms=config["inference"]["max_wait_ms"],
+)
+
+
+def decode_request(userInput: UserInput):
+    """Resolve the user's peer snapshot and decode both into a FeatureRecord."""
+    if userInput.peer_snapshot is not None:
+        peer_snapshot = userInput.peer_snapshot
+        return FeatureRecord.from_input(userInput, peer_snapshot, compute_batch_aggregates(peer_snapshot))
+
+    entry = resolve_batch_snapshot(userInput.batch_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch_id: {userInput.batch_id}")
+    _, peer_snapshot, aggregates = entry
+    return FeatureRecord.from_input(userInput, peer_snapshot, aggregates)
+
+
+def resolve_batch_snapshot(batch_id):
+    """
+    Return (version, peer_snapshot, aggregates) for a batch, or None if unknown.
+
+    Batches with users in the state store are served from its running
+    counters. buddies_attending_events depends on who the user's buddies
+    are, so it still comes from the snapshot registered with PUT
+    /peer-snapshots, if any. Other batches use the registered snapshot as is.
+    """
+    return snapshot_registry.resolve(state_store, batch_id)
+
+
+# Identical requests on the same day, with the same rules, models and peer
+# snapshot version, get the stored response without being scored again
+response_cache = make_cache_backend(config["response_cache"])
+
+
+def cache_get(key):
+    try:
+        response = response_cache.get(key)
+    except Exception:
+        # A shared backend being down must not fail the request
+        response_cache_lookups.inc(result="error")
+        return None
+    response_cache_lookups.inc(result="miss" if response is None else "hit")
+    return response
+
+
+def cache_set(key, response):
+    try:
+        response_cache.set(key, response)
+    except Exception:
+        response_cache_lookups.inc(result="error")
 
 
-class Profile(BaseModel):
-    resume_uploaded: bool
-    goal_tags: List[str]
-    karma: int
-    projects_added: int
-    quiz_history: List[str]
-    clubs_joined: List[str]
-    buddy_count: int
-    
-class Activity(BaseModel):
-    login_streak: int
-    posts_created: int
-    buddies_interacted: int
-    last_event_attended: Optional[date]
-    
-class PeerSnapshot(BaseModel):
-    batch_avg_projects: int
-    batch_resume_uploaded_pct: int
-    batch_event_attendance: Dict[str, int]
-    buddies_attending_events: List[str]
-    
-class UserInput(BaseModel):
-    user_id: str
-    profile: Profile
-    activity: Activity
-    peer_snapshot: PeerSnapshot
-    
 @app.post('/analyze-engagement')
 async def generate_nudges(userInput: UserInput):
-    nudges: List[Dict] = []
-    
-    rules = config["profile_rules"]
-    event_rules = config["event_rules"]
-    priorities = config["priority_labels"]
-    
-    rule_resume_nudge = (
-        not userInput.profile.resume_uploaded and
-        userInput.peer_snapshot.batch_resume_uploaded_pct >= rules["resume_threshold"] * 100 and
-        userInput.profile.projects_added >= rules["projects_avg_threshold"]
-    )
+    observe_request_parsing()
+    return await score_user(userInput)
 
-    batch_event_attendance_rule = sum(userInput.peer_snapshot.batch_event_attendance.values())
-    
-    rule_event_nudge = (
-        len(userInput.peer_snapshot.buddies_attending_events) > event_rules["buddy_attendance_trigger"] and
-        batch_event_attendance_rule > event_rules["batch_attendance_trigger"]
+
+async def score_user(userInput: UserInput):
+    await wait_for_models()
+    serving = registry.current
+    with metrics.stage("decode"):
+        record = decode_request(userInput)
+
+    today = datetime.utcnow().date()
+    cache_key = None
+    if response_cache is not None:
+        with metrics.stage("response_cache"):
+            cache_key = response_cache_key(record, serving.identity, today, date.today())
+            cached = cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+    with metrics.stage("rules"):
+        rule_resume_nudge, rule_event_nudge = evaluate_rules(serving.rules, record)
+    with metrics.stage("fomo_score"):
+        fomo_score = compute_event_fomo_score(record)
+
+    started = perf_counter()
+    model_resume_pred, model_event_pred = await inference_batcher.submit(
+        (serving, feature_row(record, fomo_score))
     )
-    
-    user_data = userInput.dict()
-    if user_data['activity']['last_event_attended']:
-        user_data['activity']['last_event_attended'] = user_data['activity']['last_event_attended'].strftime('%Y-%m-%d')
-    
-    model_input = {
-        "resume_uploaded": int(userInput.profile.resume_uploaded),
-        "karma": userInput.profile.karma,
-        "batch_resume_uploaded_pct": userInput.peer_snapshot.batch_resume_uploaded_pct,
-        "event_fomo_score": calculate_event_fomo_score(user_data, userInput.peer_snapshot.dict()),
-    }
-    X_resume = pd.DataFrame([[
-        model_input["resume_uploaded"],
-        model_input["batch_resume_uploaded_pct"] / 100,
-    ]], columns=['resume_uploaded', 'batch_resume_uploaded_pct'])
-    
-    X_event = pd.DataFrame([[
-        model_input["karma"],
-        model_input["event_fomo_score"]
-    ]], columns=['karma', 'event_fomo_score'])
-    
-
-    model_resume_pred = resume_model.predict(X_resume)[0]
-    model_event_pred = event_model.predict(X_event)[0]
-    print("model_resume_pred: ", model_resume_pred)
-    print("model_event_pred: ", model_event_pred)
-    print("fomo score: ", model_input["event_fomo_score"])
-    
-    last_event_date = userInput.activity.last_event_attended
-    days_since_event = (datetime.utcnow().date() - last_event_date).days
-    
-    if rule_resume_nudge or model_resume_pred == 1:
-        nudges.append({
-            "type": "profile",
-            "title": f"{userInput.peer_snapshot.batch_resume_uploaded_pct}% of your peers have uploaded resumes. You haven't yet!",
-            "action": "Upload resume now",
-            "priority": priorities["resume"]
-        })
-
-    if rule_event_nudge or model_event_pred == 1:
-        nudges.append({
-            "type": "event",
-            "title": f"{len(userInput.peer_snapshot.buddies_attending_events)} of your buddies are joining {userInput.peer_snapshot.buddies_attending_events[0]} event",
-            "action": "Join the event",
-            "priority": priorities["event_fomo"]
-        })
-
-    quiz_nudge_trigger_days = config["profile_rules"]["quiz_idle_days"]
-
-    if userInput.activity.last_event_attended:
-
-        if days_since_event >= quiz_nudge_trigger_days:
-            nudges.append({
-                "type": "quiz",
-                "title": f"It's been {('5+' if days_since_event > 5 else days_since_event)} days since your last event. Try a 2-question quiz!",
-                "action": "Take quiz now",
-                "priority": priorities["quiz"]
-            })
-
-    return {
-        "user_id": userInput.user_id,
-        "nudges": nudges[:3],
-        "status": "generated"
-    }
+    metrics.observe_stage("inference_wait", perf_counter() - started)
+
+    if serving.config["observability"]["debug_prints"]:
+        print("model_resume_pred: ", model_resume_pred)
+        print("model_event_pred: ", model_event_pred)
+        print("fomo score: ", fomo_score)
+
+    with metrics.stage("nudge_assembly"):
+        response = build_nudges(
+            serving.rules, record, rule_resume_nudge, rule_event_nudge,
+            model_resume_pred, model_event_pred, today
+        )
+    if cache_key is not None:
+        cache_set(cache_key, response)
+    return response
+
+
+@app.post('/analyze-engagement/batch')
+async def generate_nudges_batch(batchInput: BatchUserInput):
+    observe_request_parsing()
+    await wait_for_models()
+    serving = registry.current
+    with metrics.stage("decode"):
+        records = [decode_request(userInput) for userInput in batchInput.users]
+
+    started = perf_counter()
+    results = await run_inference(partial(
+        score_users, serving.rules, serving.resume_model, serving.event_model, records,
+    ))
+    metrics.observe_stage("batch_scoring", perf_counter() - started)
+    return {"results": results, "count": len(results)}
+
+
+@app.post('/analyze-engagement/jsonl')
+async def generate_nudges_jsonl(request: Request):
+    # For trusted high-volume callers: one UserInput per line, parsed with
+    # orjson straight into FeatureRecords, checking only the fields scoring
+    # reads. Bad lines get an error line instead of failing the request.
+    body = await request.body()
+    await wait_for_models()
+    serving = registry.current
+    with metrics.stage("decode"):
+        outputs, records, positions = decode_lines(body, resolve_batch_snapshot)
+
+    started = perf_counter()
+    results = await run_inference(partial(
+        score_users, serving.rules, serving.resume_model, serving.event_model, records,
+    ))
+    metrics.observe_stage("batch_scoring", perf_counter() - started)
+    for position, result in zip(positions, results):
+        outputs[position] = result
+
+    with metrics.stage("encode"):
+        content = encode_lines(outputs)
+    return Response(content, media_type="application/x-ndjson")
+
+
+@app.put('/users/{user_id}')
+def put_user_state(user_id: str, state: UserState):
+    state_store.put_user(user_id, state.batch_id, state.profile, state.activity)
+    return {"user_id": user_id, "status": "stored"}
+
+
+@app.post('/events')
+def post_events(events: List[ActivityEvent]):
+    return {"applied": state_store.apply_events(events)}
+
+
+@app.get('/analyze-engagement/{user_id}')
+async def generate_nudges_for_user(user_id: str):
+    # Scores from the stored state, so callers only send events and the user_id
+    with metrics.stage("state_lookup"):
+        state = state_store.get_user(user_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown user_id: {user_id}")
+    if state["batch_id"] is None:
+        raise HTTPException(status_code=409, detail=f"No batch_id for {user_id}; register it with PUT /users/{user_id}")
+    if state["activity"]["last_event_attended"] is None:
+        raise HTTPException(status_code=409, detail=f"No event attendance recorded for {user_id}")
+    try:
+        userInput = UserInput(**state)
+    except ValidationError as e:
+        raise HTTPException(status_code=409, detail=f"Stored state for {user_id} is incomplete: {e}")
+    return await score_user(userInput)
+
+
+@app.put('/peer-snapshots/{batch_id}')
+def put_peer_snapshot(batch_id: str, peer_snapshot: PeerSnapshot):
+    version = snapshot_registry.put(state_store, batch_id, peer_snapshot)
+    return {"batch_id": batch_id, "version": version}
+
+
+@app.get('/peer-snapshots/{batch_id}')
+def get_peer_snapshot(batch_id: str):
+    entry = resolve_batch_snapshot(batch_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch_id: {batch_id}")
+    version, peer_snapshot, _ = entry
+    return {"batch_id": batch_id, "version": version, "peer_snapshot": peer_snapshot}
+
+
+@app.post('/admin/reload')
+def reload_serving_registry(force: bool = False):
+    try:
+        serving, reloaded = registry.reload(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version {registry.current.version}: {e}")
+    return {"version": serving.version, "reloaded": reloaded}
+
+
+@app.post('/admin/profile')
+def start_profile(mode: str = "cprofile", requests: int = None, seconds: float = None, interval_ms: float = None):
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    try:
+        return profiler.start(mode, requests=requests, seconds=seconds, interval_ms=interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get('/admin/profile')
+def profile_status():
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return profiler.status()
+
+
+@app.get('/admin/profile/last')
+def last_profile():
+    if profiler is None or profiler.last is None or profiler.last["path"] is None:
+        raise HTTPException(status_code=404, detail="No profile has been captured")
+    with open(profiler.last["path"], "rb") as f:
+        return Response(f.read(), media_type="application/octet-stream")
+
+
+@app.get('/metrics')
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get('/health')
 def health():
     return {'status': "ok"}
 
+@app.get('/ready')
+def ready():
+    # Unlike /health, only passes once both models are loaded and warmed up
+    serving = registry.current
+    if serving.resume_model is None or serving.event_model is None:
+        raise HTTPException(status_code=503, detail="Models are not loaded")
+    return {'status': "ready"}
+
 @app.get('/version')
 def version():
-    return { 'version': '1.0.0'}
\ No newline at end of file
+    return { 'version': '1.0.0'}
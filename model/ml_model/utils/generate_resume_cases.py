@@ -1,40 +1,27 @@
 import pandas as pd
 import numpy as np
 
-def generate_resume_cases(num_cases=2000):
-    # Create empty lists to store the data
-    resume_uploaded = []
-    batch_resume_uploaded_pct = []
-    should_nudge_resume = []
-    
-    # Generate cases where should_nudge_resume = 1
-    for _ in range(num_cases):
-        # For should_nudge_resume = 1 cases:
-        # Create more diverse patterns to improve precision and recall
-        if np.random.random() < 0.7:  # 70% of cases follow the main pattern
-            # Main pattern: resume_uploaded = 0, high batch percentage
-            resume_uploaded.append(0)
-            batch_resume_uploaded_pct.append(np.random.uniform(80, 95))
-        else:  # 30% of cases follow alternative patterns
-            if np.random.random() < 0.5:  # 15% of total cases
-                # Pattern 1: Very high batch percentage (95-100%)
-                resume_uploaded.append(0)
-                batch_resume_uploaded_pct.append(np.random.uniform(95, 100))
-            else:  # 15% of total cases
-                # Pattern 2: Moderately high batch percentage (75-85%)
-                resume_uploaded.append(0)
-                batch_resume_uploaded_pct.append(np.random.uniform(75, 85))
-        
-        should_nudge_resume.append(1)
-    
-    # Create DataFrame
-    df = pd.DataFrame({
-        'resume_uploaded': resume_uploaded,
-        'batch_resume_uploaded_pct': batch_resume_uploaded_pct,
-        'should_nudge_resume': should_nudge_resume
+def generate_resume_cases(num_cases=2000, seed=None):
+    rng = np.random.default_rng(seed)
+
+    # Every case is should_nudge_resume = 1 with resume_uploaded = 0; the
+    # batch percentage follows one of three patterns to improve precision and recall
+    pattern = rng.random(num_cases)
+    # Main pattern (70% of cases): high batch percentage (80-95%)
+    low = np.full(num_cases, 80.0)
+    high = np.full(num_cases, 95.0)
+    # Pattern 1 (15%): very high batch percentage (95-100%)
+    very_high = (pattern >= 0.7) & (pattern < 0.85)
+    low[very_high], high[very_high] = 95, 100
+    # Pattern 2 (15%): moderately high batch percentage (75-85%)
+    moderate = pattern >= 0.85
+    low[moderate], high[moderate] = 75, 85
+
+    return pd.DataFrame({
+        'resume_uploaded': np.zeros(num_cases, dtype=np.int64),
+        'batch_resume_uploaded_pct': rng.uniform(low, high),
+        'should_nudge_resume': np.ones(num_cases, dtype=np.int64)
     })
-    
-    return df
 
 if __name__ == "__main__":
     # Generate 2000 new cases
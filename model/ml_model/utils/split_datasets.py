@@ -1,15 +1,21 @@
-import pandas as pd
+import sys
+from pathlib import Path
+
+# dataset_store lives at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from dataset_store import read_dataset
 
 def split_dataset(input_file, resume_output, event_output):
-    # Read the dataset
-    df = pd.read_csv(input_file)
+    # Read only the columns the resume dataset needs; a converted
+    # .parquet/.arrow copy of input_file is used when one exists
+    resume_df = read_dataset(input_file, columns=['resume_uploaded', 'batch_resume_uploaded_pct', 'should_nudge_resume'])
     
     # Create resume dataset
-    resume_df = df[['resume_uploaded', 'batch_resume_uploaded_pct', 'should_nudge_resume']]
     resume_df.to_csv(resume_output, index=False)
     
     # Create event dataset
-    # event_df = df[['karma', 'event_fomo_score', 'should_nudge_event']]
+    # event_df = read_dataset(input_file, columns=['karma', 'event_fomo_score', 'should_nudge_event'])
     # event_df.to_csv(event_output, index=False)
     
     print(f"Split {input_file} successfully!")
@@ -0,0 +1,197 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+ARRAY_NAMES = ("feature", "threshold", "children_left", "children_right", "leaf_proba", "roots", "classes", "children")
+
+
+class CompiledForest:
+    """
+    A RandomForestClassifier flattened into contiguous node arrays.
+
+    All trees share one set of feature/threshold/child arrays, so prediction is
+    a vectorized walk over (samples x trees) node indices instead of sklearn's
+    per-call validation and tree-by-tree dispatch.
+    """
+
+    accepts_arrays = True
+
+    def __init__(self, feature, threshold, children_left, children_right, leaf_proba,
+                 roots, classes, max_depth, feature_names=None, children=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+        self.feature_names_in_ = feature_names
+        self.n_features_in_ = None if feature_names is None else len(feature_names)
+        # Interleaved (left, right) pairs so a step is one gather on 2 * node + go_right
+        if children is None:
+            children = np.stack([children_left, children_right], axis=1).ravel()
+        self._children = children
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted sklearn RandomForestClassifier.
+
+        Args:
+            model: Fitted RandomForestClassifier with a single output
+
+        Returns:
+            CompiledForest: Forest predicting exactly like model.predict
+        """
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.intp) + offset
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra traversal steps are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        feature_names = getattr(model, "feature_names_in_", None)
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children_left=np.concatenate(lefts),
+            children_right=np.concatenate(rights),
+            leaf_proba=np.concatenate(probas),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+            feature_names=None if feature_names is None else list(feature_names),
+        )
+
+    def save(self, path):
+        """
+        Write the forest as a directory of .npy arrays plus a small meta.json.
+
+        Plain .npy files can be memory-mapped by load(), so every worker process
+        serving the same model shares one copy of the pages.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "leaf_proba": self.leaf_proba,
+            "roots": self.roots,
+            "classes": self.classes_,
+            "children": self._children,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"max_depth": int(self.max_depth), "feature_names": self.feature_names_in_}, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Load a forest written by save().
+
+        Args:
+            path (str): Directory written by save()
+            mmap_mode (str, optional): np.load mmap_mode, None reads into memory
+
+        Returns:
+            CompiledForest: The loaded forest
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        return cls(max_depth=meta["max_depth"], feature_names=meta["feature_names"], **arrays)
+
+    def _as_array(self, X):
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            X = X[self.feature_names_in_]
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_trees, n_samples)."""
+        X = self._as_array(X)
+        n_samples, n_features = X.shape
+        values = X.ravel()
+        row_offsets = np.arange(n_samples, dtype=np.intp) * n_features
+
+        nodes = np.repeat(self.roots, n_samples)
+        rows = np.tile(row_offsets, len(self.roots))
+        leaves = np.empty_like(nodes)
+        position = np.arange(len(nodes))
+        for _ in range(self.max_depth + 1):
+            is_leaf = self.children_left[nodes] == nodes
+            if is_leaf.any():
+                # Retire finished (tree, sample) pairs so later steps shrink
+                leaves[position[is_leaf]] = nodes[is_leaf]
+                active = ~is_leaf
+                nodes, rows, position = nodes[active], rows[active], position[active]
+                if not len(nodes):
+                    break
+            go_right = values[rows + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self._children[2 * nodes + go_right]
+        return leaves.reshape(len(self.roots), n_samples)
+
+    def predict_proba(self, X):
+        # Accumulate trees in order, then average, as RandomForestClassifier does
+        proba = np.add.reduce(self.leaf_proba[self.apply(X)], axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_forest(model):
+    """
+    Compile a fitted RandomForestClassifier into a CompiledForest.
+
+    Args:
+        model: Fitted RandomForestClassifier, or an already compiled forest
+
+    Returns:
+        CompiledForest: Pure NumPy forest with identical predictions
+    """
+    if model is None or isinstance(model, CompiledForest):
+        return model
+    return CompiledForest.from_sklearn(model)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the serving forests into memory-mappable array dumps")
+    parser.add_argument("--config", default="config.json", help="Config with the model paths")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    with open(args.config) as f:
+        models = json.load(f)["models"]
+    for name in ("resume", "event"):
+        compiled = compile_forest(joblib.load(models[f"{name}_path"]))
+        compiled.save(models[f"{name}_compiled_path"])
+        print(f"✅ {models[f'{name}_path']} compiled to {models[f'{name}_compiled_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import os
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from distill_event_model import DistilledEventModel
+from event_fomo_score import days_since_events, event_fomo_score_from_parts, event_fomo_scores_from_parts
+from finite_domain import enumerate_domain
+from model_compiler import CompiledForest, compile_forest
+
+# Feature row used to warm models up before serving
+WARMUP_ROW = (0, 0.5, 100, 0.5)
+
+
+def load_model(config, name):
+    """
+    Load one model, preferring its memory-mapped compiled dump.
+
+    With the "compiled" engine and a dump written by model_compiler.py, the
+    arrays are mapped read-only so uvicorn workers share their pages, and
+    neither joblib nor sklearn gets imported. Otherwise the joblib file is
+    loaded (and compiled in memory for the "compiled" engine).
+    """
+    models = config["models"]
+    if name == "event" and config["inference"]["event_tier"] == "fast":
+        # The distilled table from distill_event_model.py, in place of the forest
+        distilled_path = models["event_distilled_path"]
+        if os.path.isdir(distilled_path):
+            return DistilledEventModel.load(distilled_path, mmap_mode="r" if models["mmap"] else None)
+        print(f"Warning: No distilled event model at {distilled_path}, serving the full forest")
+
+    compiled_path = models[f"{name}_compiled_path"]
+    if config["inference"]["engine"] == "compiled" and os.path.isdir(compiled_path):
+        return CompiledForest.load(compiled_path, mmap_mode="r" if models["mmap"] else None)
+
+    import joblib
+
+    model = joblib.load(models[f"{name}_path"])
+    # "compiled" swaps sklearn's predict for the flattened NumPy forests
+    if config["inference"]["engine"] == "compiled":
+        model = compile_forest(model)
+    return model
+
+
+def load_models(config):
+    """
+    Load both models as configured under "models" and "inference".
+
+    Returns:
+        tuple: (resume_model, event_model), both None when the files are missing
+    """
+    try:
+        resume_model = load_model(config, "resume")
+        event_model = load_model(config, "event")
+    except FileNotFoundError as e:
+        print(f"Warning: Model files not found: {e}")
+        return None, None
+
+    # Models whose feature space is small enough are answered from a lookup table
+    if config["inference"]["lookup_tables"]:
+        feature_domains = config["inference"]["feature_domains"]
+        max_table_size = config["inference"]["max_table_size"]
+        resume_model = enumerate_domain(resume_model, feature_domains["resume"], max_table_size)
+        event_model = enumerate_domain(event_model, feature_domains["event"], max_table_size)
+
+    return resume_model, event_model
+
+
+class RuleSet(NamedTuple):
+    """Rule thresholds and priority labels, precompiled once per config version."""
+    resume_pct_threshold: float
+    projects_avg_threshold: float
+    quiz_idle_days: int
+    buddy_attendance_trigger: int
+    batch_attendance_trigger: int
+    priorities: Dict[str, str]
+
+
+def compile_rules(config):
+    """
+    Resolve the rule sections of config into a RuleSet.
+
+    Raises:
+        KeyError: If a rule or priority label is missing from config
+    """
+    rules = config["profile_rules"]
+    event_rules = config["event_rules"]
+    priorities = config["priority_labels"]
+    return RuleSet(
+        resume_pct_threshold=rules["resume_threshold"] * 100,
+        projects_avg_threshold=rules["projects_avg_threshold"],
+        quiz_idle_days=rules["quiz_idle_days"],
+        buddy_attendance_trigger=event_rules["buddy_attendance_trigger"],
+        batch_attendance_trigger=event_rules["batch_attendance_trigger"],
+        priorities={label: priorities[label] for label in ("resume", "event_fomo", "quiz")},
+    )
+
+
+class FeatureRecord:
+    """
+    Everything scoring reads about one user, decoded once per request.
+
+    Rules, the FOMO score, the model rows and nudge assembly read these slots
+    directly, instead of each walking the pydantic models and peer snapshot.
+    Two records with equal key() get the same response for a given rule set,
+    model version and date.
+    """
+
+    __slots__ = (
+        "user_id", "resume_uploaded", "projects_added", "karma", "buddy_count", "last_event_attended",
+        "batch_resume_uploaded_pct", "buddies_attending_events", "buddies_attending", "attendance_total",
+        "batch_score",
+    )
+
+    def __init__(self, user_id, resume_uploaded, projects_added, karma, buddy_count, last_event_attended,
+                 batch_resume_uploaded_pct, buddies_attending_events, buddies_attending, attendance_total,
+                 batch_score):
+        self.user_id = user_id
+        self.resume_uploaded = resume_uploaded
+        self.projects_added = projects_added
+        self.karma = karma
+        self.buddy_count = buddy_count
+        self.last_event_attended = last_event_attended
+        self.batch_resume_uploaded_pct = batch_resume_uploaded_pct
+        self.buddies_attending_events = buddies_attending_events
+        self.buddies_attending = buddies_attending
+        self.attendance_total = attendance_total
+        self.batch_score = batch_score
+
+    @classmethod
+    def from_input(cls, userInput, peer_snapshot, aggregates):
+        """
+        Decode a request into a record.
+
+        Args:
+            userInput: UserInput model
+            peer_snapshot: Resolved PeerSnapshot for the user
+            aggregates (BatchAggregates): Aggregates of that snapshot
+
+        Returns:
+            FeatureRecord: The user's scoring inputs
+        """
+        profile = userInput.profile
+        return cls(
+            userInput.user_id,
+            profile.resume_uploaded,
+            profile.projects_added,
+            profile.karma,
+            profile.buddy_count,
+            userInput.activity.last_event_attended,
+            peer_snapshot.batch_resume_uploaded_pct,
+            peer_snapshot.buddies_attending_events,
+            aggregates.buddies_attending,
+            aggregates.attendance_total,
+            aggregates.batch_score,
+        )
+
+    def key(self):
+        return _record_key(self)
+
+
+_record_key = attrgetter(*FeatureRecord.__slots__)
+
+
+def evaluate_rules(rules, record):
+    rule_resume_nudge = (
+        not record.resume_uploaded and
+        record.batch_resume_uploaded_pct >= rules.resume_pct_threshold and
+        record.projects_added >= rules.projects_avg_threshold
+    )
+
+    rule_event_nudge = (
+        record.buddies_attending > rules.buddy_attendance_trigger and
+        record.attendance_total > rules.batch_attendance_trigger
+    )
+    return rule_resume_nudge, rule_event_nudge
+
+
+def compute_event_fomo_score(record):
+    days_since_event = date.today().toordinal() - record.last_event_attended.toordinal()
+    return event_fomo_score_from_parts(
+        record.buddy_count,
+        record.buddies_attending,
+        record.batch_score,
+        days_since_event,
+    )
+
+
+def compute_event_fomo_scores(records, today=None):
+    return event_fomo_scores_from_parts(
+        [record.buddy_count for record in records],
+        [record.buddies_attending for record in records],
+        [record.batch_score for record in records],
+        days_since_events([record.last_event_attended for record in records], today),
+    ).tolist()
+
+
+def feature_row(record, fomo_score):
+    """Model inputs of one user: (resume_uploaded, batch_resume_uploaded_pct, karma, event_fomo_score)."""
+    return (
+        int(record.resume_uploaded),
+        record.batch_resume_uploaded_pct / 100,
+        record.karma,
+        fomo_score,
+    )
+
+
+def accepts_arrays(*models):
+    """True when every model predicts from plain arrays in feature order."""
+    return all(getattr(model, "accepts_arrays", False) is True for model in models)
+
+
+def build_feature_frames(rows, as_arrays=False):
+    if as_arrays:
+        X = np.array(rows, dtype=np.float64).reshape(len(rows), 4)
+        return X[:, :2], X[:, 2:]
+
+    # Only sklearn models need named columns, so pandas is imported on first use
+    import pandas as pd
+
+    X_resume = pd.DataFrame([row[:2] for row in rows], columns=['resume_uploaded', 'batch_resume_uploaded_pct'])
+    X_event = pd.DataFrame([row[2:] for row in rows], columns=['karma', 'event_fomo_score'])
+    return X_resume, X_event
+
+
+def predict_rows(resume_model, event_model, rows):
+    """
+    Run both models once over stacked feature rows.
+
+    Returns:
+        list: (resume_pred, event_pred) per row
+    """
+    X_resume, X_event = build_feature_frames(rows, accepts_arrays(resume_model, event_model))
+    return list(zip(resume_model.predict(X_resume), event_model.predict(X_event)))
+
+
+def build_nudges(rules, record, rule_resume_nudge, rule_event_nudge, model_resume_pred, model_event_pred, today: date):
+    nudges: List[Dict] = []
+    priorities = rules.priorities
+
+    last_event_date = record.last_event_attended
+    days_since_event = today.toordinal() - last_event_date.toordinal()
+    
+    if rule_resume_nudge or model_resume_pred == 1:
+        nudges.append({
+            "type": "profile",
+            "title": f"{record.batch_resume_uploaded_pct}% of your peers have uploaded resumes. You haven't yet!",
+            "action": "Upload resume now",
+            "priority": priorities["resume"]
+        })
+
+    # A batch served from state store counters without a registered snapshot
+    # has no buddy events to name, so there is no event nudge to send
+    if (rule_event_nudge or model_event_pred == 1) and record.buddies_attending_events:
+        nudges.append({
+            "type": "event",
+            "title": f"{record.buddies_attending} of your buddies are joining {record.buddies_attending_events[0]} event",
+            "action": "Join the event",
+            "priority": priorities["event_fomo"]
+        })
+
+    quiz_nudge_trigger_days = rules.quiz_idle_days
+
+    if last_event_date:
+
+        if days_since_event >= quiz_nudge_trigger_days:
+            nudges.append({
+                "type": "quiz",
+                "title": f"It's been {('5+' if days_since_event > 5 else days_since_event)} days since your last event. Try a 2-question quiz!",
+                "action": "Take quiz now",
+                "priority": priorities["quiz"]
+            })
+
+    return {
+        "user_id": record.user_id,
+        "nudges": nudges[:3],
+        "status": "generated"
+    }
+
+
+def score_users(rules, resume_model, event_model, records, today=None):
+    """
+    Generate nudges for many users with one predict call per model.
+
+    Args:
+        rules (RuleSet): Thresholds compiled from config by compile_rules
+        resume_model: Model predicting resume nudges
+        event_model: Model predicting event nudges
+        records (list): FeatureRecord per user
+        today (date, optional): Reference date for the quiz rule and the FOMO
+            time term; by default the quiz rule uses today in UTC and the FOMO
+            score the local date
+
+    Returns:
+        list: Response dicts in the order of records
+    """
+    if not records:
+        return []
+
+    rule_flags = [evaluate_rules(rules, record) for record in records]
+    fomo_scores = compute_event_fomo_scores(records, today)
+    rows = [feature_row(record, fomo_score) for record, fomo_score in zip(records, fomo_scores)]
+
+    # One predict call per model for the whole batch instead of one per user
+    predictions = predict_rows(resume_model, event_model, rows)
+
+    if today is None:
+        today = datetime.utcnow().date()
+    return [
+        build_nudges(rules, record, rule_resume_nudge, rule_event_nudge, resume_pred, event_pred, today)
+        for record, (rule_resume_nudge, rule_event_nudge), (resume_pred, event_pred)
+        in zip(records, rule_flags, predictions)
+    ]
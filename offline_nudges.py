@@ -0,0 +1,109 @@
+import argparse
+import json
+
+from pydantic import ValidationError
+
+from nudge_engine import FeatureRecord, compile_rules, load_models, score_users
+from process_profiles import iter_chunks, iter_lines, map_chunks
+from schemas import UserInput
+from snapshot_registry import compute_batch_aggregates
+
+# Per-process state, filled once by init_worker
+_rules = None
+_resume_model = None
+_event_model = None
+
+
+def init_worker(config_path):
+    global _rules, _resume_model, _event_model
+    with open(config_path) as f:
+        config = json.load(f)
+    _rules = compile_rules(config)
+    _resume_model, _event_model = load_models(config)
+    if _resume_model is None or _event_model is None:
+        raise RuntimeError("Models are required for offline nudge generation")
+
+
+def score_chunk(job):
+    """
+    Generate nudges for a chunk of JSONL users.
+
+    Args:
+        job (tuple): (offset, lines), the index of the chunk's first user in
+            the input and its raw JSON lines, each a UserInput with an
+            inline peer_snapshot
+
+    Returns:
+        list: One JSON line per input line, in input order
+    """
+    offset, lines = job
+    outputs = [None] * len(lines)
+    records, positions = [], []
+    for position, line in enumerate(lines):
+        try:
+            userInput = UserInput.parse_raw(line)
+            if userInput.peer_snapshot is None:
+                raise ValueError("offline scoring needs an inline peer_snapshot")
+            if userInput.activity.last_event_attended is None:
+                raise ValueError("last_event_attended is required")
+        except (ValidationError, ValueError) as e:
+            outputs[position] = {"line": offset + position, "status": "error", "detail": str(e)}
+            continue
+        peer_snapshot = userInput.peer_snapshot
+        records.append(FeatureRecord.from_input(userInput, peer_snapshot, compute_batch_aggregates(peer_snapshot)))
+        positions.append(position)
+
+    results = score_users(_rules, _resume_model, _event_model, records)
+    for position, result in zip(positions, results):
+        outputs[position] = result
+
+    return [json.dumps(output) + "\n" for output in outputs]
+
+
+def score_records(job):
+    """
+    Generate nudges for already decoded users.
+
+    Args:
+        job (tuple): (records, today), a list of FeatureRecord and the date to score them on
+
+    Returns:
+        list: Response dicts in the order of records
+    """
+    records, today = job
+    return score_users(_rules, _resume_model, _event_model, records, today)
+
+
+def generate_offline_nudges(input_path, output_path, config_path="config.json", chunk_size=5000, workers=1):
+    """
+    Score every user in input_path and write one nudge response per line.
+
+    Returns:
+        int: Number of lines written
+    """
+    written = 0
+    with open(output_path, "w") as f:
+        # Each chunk carries the index of its first user, so error rows name the input line
+        chunks = enumerate(iter_chunks(iter_lines(input_path), chunk_size))
+        jobs = ((index * chunk_size, lines) for index, lines in chunks)
+        for lines in map_chunks(score_chunk, jobs, workers, initializer=init_worker, initargs=(config_path,)):
+            f.writelines(lines)
+            written += len(lines)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate nudges offline for a JSONL file of users")
+    parser.add_argument("--input", required=True, help="JSONL users, one UserInput per line")
+    parser.add_argument("--output", default="nudges.jsonl", help="JSONL output, one response per user")
+    parser.add_argument("--config", default="config.json", help="Config with rules and model paths")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Users scored per model call")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each loading the models once")
+    args = parser.parse_args(argv)
+
+    written = generate_offline_nudges(args.input, args.output, args.config, args.chunk_size, args.workers)
+    print(f"✅ Nudges for {written} users written to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
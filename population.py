@@ -0,0 +1,369 @@
+import argparse
+import json
+from datetime import date, timedelta
+from itertools import product
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from event_fomo_score import batch_attendance_scores, event_fomo_scores_from_parts
+from process_profiles import CsvChunkWriter, ParquetChunkWriter, labelled_frame, map_chunks
+from simulate_data import clubs_pool, event_pool, goal_tags_pool, quiz_pool
+
+# Same ranges as simulate_data.simulate_user, upper bounds inclusive
+KARMA = (50, 500)
+PROJECTS_ADDED = (0, 5)
+QUIZZES = (0, 3)
+CLUBS = (0, 2)
+BUDDY_COUNT = (0, 5)
+LOGIN_STREAK = (0, 10)
+POSTS_CREATED = (0, 3)
+BUDDIES_INTERACTED = (0, 5)
+DAYS_SINCE_EVENT = (0, 90)
+BATCH_AVG_PROJECTS = (1, 4)
+BATCH_RESUME_UPLOADED_PCT = (60, 95)
+EVENT_ATTENDANCE = (3, 12)
+BUDDY_EVENTS = (1, len(event_pool))
+
+
+class PopulationSpec(NamedTuple):
+    """Everything that determines a population; equal specs give identical output."""
+    users: int
+    seed: int = 0
+    chunk_size: int = 100_000
+    batches: int = 0
+    today: Optional[date] = None
+    first_id: int = 7023
+
+
+class PopulationChunk(NamedTuple):
+    """One chunk of users as columns; list fields are ordered samples of pool indices."""
+    user_ids: np.ndarray
+    batch_ids: Optional[np.ndarray]
+    resume_uploaded: np.ndarray
+    goal_tags: np.ndarray
+    karma: np.ndarray
+    projects_added: np.ndarray
+    quiz_history: np.ndarray
+    quiz_count: np.ndarray
+    clubs_joined: np.ndarray
+    club_count: np.ndarray
+    buddy_count: np.ndarray
+    login_streak: np.ndarray
+    posts_created: np.ndarray
+    buddies_interacted: np.ndarray
+    days_since_event: np.ndarray
+    batch_avg_projects: np.ndarray
+    batch_resume_uploaded_pct: np.ndarray
+    batch_event_attendance: np.ndarray
+    buddies_attending_events: np.ndarray
+    buddies_attending: np.ndarray
+
+
+def _between(rng, bounds, size):
+    return rng.integers(bounds[0], bounds[1] + 1, size)
+
+
+def _ordered_sample(rng, n, pool_size, k):
+    """First k entries of an independent random permutation per row, like random.sample."""
+    return np.argsort(rng.random((n, pool_size)), axis=1)[:, :k]
+
+
+def batch_table(spec):
+    """
+    Peer statistics of each batch, drawn once per population.
+
+    Returns:
+        tuple: (batch_avg_projects, batch_resume_uploaded_pct, batch_event_attendance)
+            indexed by batch number, or None when users draw their own snapshots
+    """
+    if not spec.batches:
+        return None
+    rng = np.random.default_rng([spec.seed, 0])
+    return (
+        _between(rng, BATCH_AVG_PROJECTS, spec.batches),
+        _between(rng, BATCH_RESUME_UPLOADED_PCT, spec.batches),
+        _between(rng, EVENT_ATTENDANCE, (spec.batches, len(event_pool))),
+    )
+
+
+def generate_chunk(spec, chunk_index, batches=None):
+    """
+    Draw one chunk of users.
+
+    Each chunk has its own generator seeded from (seed, chunk_index), so
+    chunks can be drawn in any order or process and still give the same
+    population for the same spec.
+
+    Args:
+        spec (PopulationSpec): Population settings
+        chunk_index (int): Which chunk to draw
+        batches (tuple, optional): batch_table(spec)
+
+    Returns:
+        PopulationChunk: The chunk's users
+    """
+    start = chunk_index * spec.chunk_size
+    n = min(spec.chunk_size, spec.users - start)
+    rng = np.random.default_rng([spec.seed, 1, chunk_index])
+
+    if batches is None:
+        batch_ids = None
+        batch_avg_projects = _between(rng, BATCH_AVG_PROJECTS, n)
+        batch_resume_uploaded_pct = _between(rng, BATCH_RESUME_UPLOADED_PCT, n)
+        batch_event_attendance = _between(rng, EVENT_ATTENDANCE, (n, len(event_pool)))
+    else:
+        batch_ids = rng.integers(0, spec.batches, n)
+        batch_avg_projects = batches[0][batch_ids]
+        batch_resume_uploaded_pct = batches[1][batch_ids]
+        batch_event_attendance = batches[2][batch_ids]
+
+    return PopulationChunk(
+        user_ids=np.arange(spec.first_id + start, spec.first_id + start + n),
+        batch_ids=batch_ids,
+        resume_uploaded=rng.random(n) < 0.5,
+        goal_tags=_ordered_sample(rng, n, len(goal_tags_pool), 2),
+        karma=_between(rng, KARMA, n),
+        projects_added=_between(rng, PROJECTS_ADDED, n),
+        quiz_history=_ordered_sample(rng, n, len(quiz_pool), QUIZZES[1]),
+        quiz_count=_between(rng, QUIZZES, n),
+        clubs_joined=_ordered_sample(rng, n, len(clubs_pool), CLUBS[1]),
+        club_count=_between(rng, CLUBS, n),
+        buddy_count=_between(rng, BUDDY_COUNT, n),
+        login_streak=_between(rng, LOGIN_STREAK, n),
+        posts_created=_between(rng, POSTS_CREATED, n),
+        buddies_interacted=_between(rng, BUDDIES_INTERACTED, n),
+        days_since_event=_between(rng, DAYS_SINCE_EVENT, n),
+        batch_avg_projects=batch_avg_projects,
+        batch_resume_uploaded_pct=batch_resume_uploaded_pct,
+        batch_event_attendance=batch_event_attendance,
+        buddies_attending_events=_ordered_sample(rng, n, len(event_pool), BUDDY_EVENTS[1]),
+        buddies_attending=_between(rng, BUDDY_EVENTS, n),
+    )
+
+
+def processed_frame(chunk):
+    """Features and labels of a chunk, as process_profiles computes them from its JSONL."""
+    fomo_scores = event_fomo_scores_from_parts(
+        chunk.buddy_count,
+        chunk.buddies_attending,
+        batch_attendance_scores(chunk.batch_event_attendance),
+        chunk.days_since_event,
+    )
+    return labelled_frame(chunk.resume_uploaded, chunk.karma, chunk.batch_resume_uploaded_pct, fomo_scores)
+
+
+class _SampleCodes:
+    """
+    JSON text of every ordered sample of up to k pool entries.
+
+    A sample's code is computed with array arithmetic, so rendering a line
+    is a list lookup instead of building and dumping a Python list.
+    """
+
+    def __init__(self, pool, k):
+        size = len(pool)
+        self.offsets = np.cumsum([0] + [size ** i for i in range(k)])
+        self.weights = size ** np.arange(k)
+        self.text = [None] * int(self.offsets[-1] + size ** k)
+        for count in range(k + 1):
+            for sample in product(range(size), repeat=count):
+                code = self.offsets[count] + sum(index * size ** j for j, index in enumerate(sample))
+                self.text[code] = json.dumps([pool[index] for index in sample])
+
+    def codes(self, samples, counts):
+        used = np.arange(samples.shape[1]) < counts[:, np.newaxis]
+        return self.offsets[counts] + (samples * self.weights * used).sum(axis=1)
+
+
+_GOAL_TAGS = _SampleCodes(goal_tags_pool, 2)
+_QUIZZES = _SampleCodes(quiz_pool, QUIZZES[1])
+_CLUBS = _SampleCodes(clubs_pool, CLUBS[1])
+_BUDDY_EVENTS = _SampleCodes(event_pool, BUDDY_EVENTS[1])
+
+# Key order matches simulate_data, so lines look like its JSONL
+_LINE = (
+    '{"user_id": "stu_%d", %s"profile": {"resume_uploaded": %s, "goal_tags": %s, "karma": %d, '
+    '"projects_added": %d, "quiz_history": %s, "clubs_joined": %s, "buddy_count": %d}, '
+    '"activity": {"login_streak": %d, "posts_created": %d, "buddies_interacted": %d, '
+    '"last_event_attended": "%s"}, "peer_snapshot": {"batch_avg_projects": %d, '
+    '"batch_resume_uploaded_pct": %d, "batch_event_attendance": {'
+    + ", ".join(f"{json.dumps(event)}: %d" for event in event_pool)
+    + '}, "buddies_attending_events": %s}}\n'
+)
+
+
+def render_jsonl(chunk, today):
+    """Render a chunk as UserInput JSON lines with inline peer snapshots."""
+    n = len(chunk.user_ids)
+    dates = [(today - timedelta(days=days)).isoformat() for days in range(DAYS_SINCE_EVENT[1] + 1)]
+    batch_fields = [""] * n if chunk.batch_ids is None else [f'"batch_id": "batch_{b}", ' for b in chunk.batch_ids.tolist()]
+    goal_tags = _GOAL_TAGS.codes(chunk.goal_tags, np.full(n, 2)).tolist()
+    quizzes = _QUIZZES.codes(chunk.quiz_history, chunk.quiz_count).tolist()
+    clubs = _CLUBS.codes(chunk.clubs_joined, chunk.club_count).tolist()
+    buddy_events = _BUDDY_EVENTS.codes(chunk.buddies_attending_events, chunk.buddies_attending).tolist()
+    rows = zip(
+        chunk.user_ids.tolist(), batch_fields, chunk.resume_uploaded.tolist(), goal_tags, chunk.karma.tolist(),
+        chunk.projects_added.tolist(), quizzes, clubs, chunk.buddy_count.tolist(), chunk.login_streak.tolist(),
+        chunk.posts_created.tolist(), chunk.buddies_interacted.tolist(), chunk.days_since_event.tolist(),
+        chunk.batch_avg_projects.tolist(), chunk.batch_resume_uploaded_pct.tolist(),
+        chunk.batch_event_attendance.tolist(), buddy_events,
+    )
+    return "".join(
+        _LINE % (
+            user_id, batch_field, "true" if resume else "false", _GOAL_TAGS.text[goal], karma, projects,
+            _QUIZZES.text[quiz], _CLUBS.text[club], buddy_count, streak, posts, interacted, dates[days],
+            avg_projects, pct, *attendance, _BUDDY_EVENTS.text[events],
+        )
+        for (user_id, batch_field, resume, goal, karma, projects, quiz, club, buddy_count, streak, posts,
+             interacted, days, avg_projects, pct, attendance, events) in rows
+    )
+
+
+def _list_array(pa, pool, samples, counts):
+    used = np.arange(samples.shape[1]) < counts[:, np.newaxis]
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    return pa.ListArray.from_arrays(offsets, pa.array(pool).take(samples[used]))
+
+
+def render_table(chunk, today):
+    """
+    Render a chunk as a flat Arrow table for Parquet output.
+
+    Profile, activity and peer snapshot fields become top-level columns;
+    batch_event_attendance is a struct with one field per event.
+    """
+    import pyarrow as pa
+
+    n = len(chunk.user_ids)
+    columns = {"user_id": pa.array([f"stu_{user_id}" for user_id in chunk.user_ids.tolist()])}
+    if chunk.batch_ids is not None:
+        columns["batch_id"] = pa.array([f"batch_{b}" for b in chunk.batch_ids.tolist()])
+    columns.update(
+        resume_uploaded=chunk.resume_uploaded,
+        goal_tags=_list_array(pa, goal_tags_pool, chunk.goal_tags, np.full(n, 2)),
+        karma=chunk.karma,
+        projects_added=chunk.projects_added,
+        quiz_history=_list_array(pa, quiz_pool, chunk.quiz_history, chunk.quiz_count),
+        clubs_joined=_list_array(pa, clubs_pool, chunk.clubs_joined, chunk.club_count),
+        buddy_count=chunk.buddy_count,
+        login_streak=chunk.login_streak,
+        posts_created=chunk.posts_created,
+        buddies_interacted=chunk.buddies_interacted,
+        last_event_attended=np.datetime64(today, "D") - chunk.days_since_event.astype("timedelta64[D]"),
+        batch_avg_projects=chunk.batch_avg_projects,
+        batch_resume_uploaded_pct=chunk.batch_resume_uploaded_pct,
+        batch_event_attendance=pa.StructArray.from_arrays(
+            [pa.array(chunk.batch_event_attendance[:, i]) for i in range(len(event_pool))], names=event_pool
+        ),
+        buddies_attending_events=_list_array(
+            pa, event_pool, chunk.buddies_attending_events, chunk.buddies_attending
+        ),
+    )
+    return pa.table(columns)
+
+
+def render_chunk(job):
+    """
+    Draw and render one chunk; runs in map_chunks workers.
+
+    Args:
+        job (tuple): (spec, chunk_index, batches, output_format, with_processed)
+
+    Returns:
+        tuple: (rendered users, processed frame or None)
+    """
+    spec, chunk_index, batches, output_format, with_processed = job
+    chunk = generate_chunk(spec, chunk_index, batches)
+    rendered = render_jsonl(chunk, spec.today) if output_format == "jsonl" else render_table(chunk, spec.today)
+    return rendered, processed_frame(chunk) if with_processed else None
+
+
+class _TableWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self.pq = pq
+        self.path = path
+        self.writer = None
+
+    def write(self, table):
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _TextWriter:
+    def __init__(self, path):
+        self.file = open(path, "w")
+
+    def write(self, text):
+        self.file.write(text)
+
+    def close(self):
+        self.file.close()
+
+
+def write_population(spec, output_path, processed_path=None, workers=1):
+    """
+    Stream a synthetic population to JSONL or Parquet, chunk by chunk.
+
+    Args:
+        spec (PopulationSpec): Population settings; today defaults to date.today()
+        output_path (str): .jsonl or .parquet file for the users
+        processed_path (str, optional): CSV or .parquet file for the
+            process_profiles feature and label table of the same users
+        workers (int): Worker processes drawing chunks
+
+    Returns:
+        int: Number of users written
+    """
+    if spec.today is None:
+        spec = spec._replace(today=date.today())
+    output_format = "parquet" if output_path.endswith(".parquet") else "jsonl"
+    batches = batch_table(spec)
+    n_chunks = -(-spec.users // spec.chunk_size)
+    jobs = ((spec, index, batches, output_format, processed_path is not None) for index in range(n_chunks))
+
+    writer = _TableWriter(output_path) if output_format == "parquet" else _TextWriter(output_path)
+    processed_writer = None
+    if processed_path is not None:
+        processed_writer = ParquetChunkWriter(processed_path) if processed_path.endswith(".parquet") else CsvChunkWriter(processed_path)
+    try:
+        for rendered, frame in map_chunks(render_chunk, jobs, workers):
+            writer.write(rendered)
+            if processed_writer is not None:
+                processed_writer.write(frame)
+    finally:
+        writer.close()
+        if processed_writer is not None:
+            processed_writer.close()
+    return spec.users
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic population in vectorized chunks")
+    parser.add_argument("--users", type=int, default=10000, help="Number of users to generate")
+    parser.add_argument("--output", default="simulated_profiles.jsonl", help=".jsonl or .parquet output file")
+    parser.add_argument("--processed", help="Also write the feature/label table here (CSV or .parquet)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same arguments give the same population")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Users drawn per chunk")
+    parser.add_argument("--batches", type=int, default=0,
+                        help="Assign users to this many batches sharing peer statistics; 0 draws a snapshot per user")
+    parser.add_argument("--today", type=date.fromisoformat, help="Reference date for last_event_attended, YYYY-MM-DD")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes drawing chunks")
+    args = parser.parse_args(argv)
+
+    spec = PopulationSpec(args.users, args.seed, args.chunk_size, args.batches, args.today)
+    users = write_population(spec, args.output, args.processed, args.workers)
+    print(f"✅ {users} users written to '{args.output}'" + (f", features to '{args.processed}'" if args.processed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,218 @@
+import argparse
 import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from event_fomo_score import calculate_event_fomo_score
+from event_fomo_score import build_event_fomo_columns, calculate_event_fomo_scores
+
+OUTPUT_COLUMNS = [
+    "resume_uploaded",
+    "karma",
+    "batch_resume_uploaded_pct",
+    "event_fomo_score",
+    "should_nudge_resume",
+    "should_nudge_event",
+]
+
 
-with open("simulated_profiles.json", "r") as f:
-    json_data = json.load(f)
+def iter_lines(path):
+    """Yield one JSON document per line; a legacy .json array is loaded whole."""
+    with open(path, "r") as f:
+        if path.endswith(".json"):
+            for entry in json.load(f):
+                yield json.dumps(entry)
+            return
+        for line in f:
+            if line.strip():
+                yield line
 
-processed_data = []
-for entry in json_data:
-    profile = entry.get("profile", {})
-    peer_snapshot = entry.get("peer_snapshot", {})
-    activity = entry.get("activity", {})
 
-    resume_uploaded = profile.get("resume_uploaded", False)
-    karma = profile.get("karma", 0)
-    batch_resume_uploaded_pct = peer_snapshot.get("batch_resume_uploaded_pct", 0)
+def iter_chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
 
+
+def _fomo_columns(entries):
     try:
-        fomo_score = calculate_event_fomo_score(entry, peer_snapshot)
-    except Exception as e:
-        print(f"Skipping entry due to error: {e}")
-        continue
+        return entries, build_event_fomo_columns(entries, [entry.get("peer_snapshot", {}) for entry in entries])
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    # Slow path: find the malformed entries and drop them one by one
+    valid = []
+    for entry in entries:
+        try:
+            build_event_fomo_columns([entry], [entry.get("peer_snapshot", {})])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping entry due to error: {e}")
+            continue
+        valid.append(entry)
+    return valid, build_event_fomo_columns(valid, [entry.get("peer_snapshot", {}) for entry in valid])
+
+
+def process_chunk(lines):
+    """
+    Compute model features and labels for a chunk of JSONL profile lines.
+
+    Args:
+        lines (list): Raw JSON lines, one simulated user per line
+
+    Returns:
+        pandas.DataFrame: One row per valid user with OUTPUT_COLUMNS
+    """
+    entries, columns = _fomo_columns([json.loads(line) for line in lines])
+    buddy_counts, buddies_attending, attendance, last_event_attended = columns
+
+    has_date = ~np.isnat(last_event_attended)
+    if not has_date.all():
+        print(f"Skipping {int((~has_date).sum())} entries without last_event_attended")
+        entries = [entry for entry, keep in zip(entries, has_date) if keep]
+        columns = [column[has_date] for column in columns]
 
-    # Label rules
-    should_nudge_resume = int(not resume_uploaded and batch_resume_uploaded_pct > 80)
-    should_nudge_event = int(fomo_score >= 0.5)
+    fomo_scores = calculate_event_fomo_scores(*columns)
 
-    processed_data.append({
-        "resume_uploaded": int(resume_uploaded),
+    resume_uploaded = np.array([entry.get("profile", {}).get("resume_uploaded", False) for entry in entries], dtype=bool)
+    karma = np.array([entry.get("profile", {}).get("karma", 0) for entry in entries], dtype=np.int64)
+    batch_resume_uploaded_pct = np.array(
+        [entry.get("peer_snapshot", {}).get("batch_resume_uploaded_pct", 0) for entry in entries], dtype=np.int64
+    )
+    return labelled_frame(resume_uploaded, karma, batch_resume_uploaded_pct, fomo_scores)
+
+
+def labelled_frame(resume_uploaded, karma, batch_resume_uploaded_pct, fomo_scores):
+    """
+    Assemble feature columns and apply the label rules.
+
+    Args:
+        resume_uploaded (numpy.ndarray): bool per user
+        karma (numpy.ndarray): int64 per user
+        batch_resume_uploaded_pct (numpy.ndarray): int64 per user
+        fomo_scores (numpy.ndarray): Event FOMO score per user
+
+    Returns:
+        pandas.DataFrame: OUTPUT_COLUMNS
+    """
+    return pd.DataFrame({
+        "resume_uploaded": resume_uploaded.astype(int),
         "karma": karma,
         "batch_resume_uploaded_pct": batch_resume_uploaded_pct,
-        "event_fomo_score": fomo_score,
-        "should_nudge_resume": should_nudge_resume,
-        "should_nudge_event": should_nudge_event
-    })
-
-df = pd.DataFrame(processed_data)
-df.to_csv("processed_fomo_dataset.csv", index=False)
-print("✅ CSV 'processed_fomo_dataset.csv' generated.")
+        "event_fomo_score": fomo_scores,
+        "should_nudge_resume": (~resume_uploaded & (batch_resume_uploaded_pct > 80)).astype(int),
+        "should_nudge_event": (fomo_scores >= 0.5).astype(int),
+    }, columns=OUTPUT_COLUMNS)
+
+
+def map_chunks(function, chunks, workers, initializer=None, initargs=()):
+    """
+    Apply function to each chunk in order, on a process pool when workers > 1.
+
+    At most 2 * workers chunks are in flight, so memory does not grow with the
+    size of the input. initializer runs once per worker process, or once inline.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for chunk in chunks:
+            yield function(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(function, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class CsvChunkWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.file, index=False, header=self.header)
+        self.header = False
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.path = path
+        self.pq = pq
+        self.writer = None
+
+    def write(self, frame):
+        table = self.pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            # Still produce a readable file for empty input
+            empty = pd.DataFrame({column: pd.Series(dtype="int64") for column in OUTPUT_COLUMNS})
+            empty["event_fomo_score"] = empty["event_fomo_score"].astype("float64")
+            self.write(empty)
+        self.writer.close()
+
+
+def process_profiles(input_path, output_path, chunk_size=10000, workers=1, output_format=None):
+    """
+    Stream profiles from input_path and write features and labels incrementally.
+
+    Args:
+        input_path (str): JSONL file with one simulated user per line
+        output_path (str): CSV or Parquet file to write
+        chunk_size (int): Users processed per chunk
+        workers (int): Worker processes, 1 processes chunks inline
+        output_format (str, optional): "csv" or "parquet", inferred from output_path
+
+    Returns:
+        int: Number of rows written
+    """
+    if output_format is None:
+        output_format = "parquet" if output_path.endswith(".parquet") else "csv"
+    writer = ParquetChunkWriter(output_path) if output_format == "parquet" else CsvChunkWriter(output_path)
+
+    rows = 0
+    try:
+        for frame in map_chunks(process_chunk, iter_chunks(iter_lines(input_path), chunk_size), workers):
+            writer.write(frame)
+            rows += len(frame)
+    finally:
+        writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute model features and labels from simulated profiles")
+    parser.add_argument("--input", default="simulated_profiles.jsonl", help="JSONL profiles, one user per line")
+    parser.add_argument("--output", default="processed_fomo_dataset.csv", help="CSV or .parquet output file")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format, inferred from --output by default")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Users held in memory per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for chunk processing")
+    args = parser.parse_args(argv)
+
+    rows = process_profiles(args.input, args.output, args.chunk_size, args.workers, args.format)
+    print(f"✅ '{args.output}' generated with {rows} rows.")
+
+
+if __name__ == "__main__":
+    main()
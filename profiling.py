@@ -0,0 +1,261 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+MODES = ("cprofile", "sample")
+
+# Leaf frames of threads that are parked rather than working; the sampler skips them
+_IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+def parse_capture(spec):
+    """
+    Parse an ENGAGEMENT_PROFILE value such as "cprofile:requests=200" or "sample:seconds=30,interval_ms=2".
+
+    Returns:
+        dict: Keyword arguments for RequestProfiler.start
+
+    Raises:
+        ValueError: If the mode or an option is unknown
+    """
+    mode, _, options = spec.partition(":")
+    capture = {"mode": mode.strip()}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        key = key.strip()
+        if key not in ("requests", "seconds", "interval_ms"):
+            raise ValueError(f"Unknown profiling option: {key}")
+        capture[key] = float(value) if key != "requests" else int(value)
+    return capture
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _Capture:
+    """One armed capture: its limits, per-thread cProfile objects or sampled stacks."""
+
+    def __init__(self, mode, requests, seconds, interval_ms, path):
+        self.mode = mode
+        self.requests = requests
+        self.seconds = seconds
+        self.interval_s = interval_ms / 1000
+        self.path = path
+        self.started = time.monotonic()
+        self.finished_requests = 0
+        self.in_flight = 0
+        self.stopping = False
+        # Thread id -> cProfile.Profile; each is only ever enabled and disabled by its own thread
+        self.profiles = {}
+        self.enabled = set()
+        self.stacks = Counter()
+        self.samples = 0
+
+
+class RequestProfiler:
+    """
+    Captures a profile of the request path over the next N requests or T seconds.
+
+    "cprofile" profiles the event loop thread while captured requests are
+    in flight, plus every call wrapped with wrap() (the inference pool), and
+    writes one merged .pstats file. "sample" reads every thread's stack each
+    interval_ms while requests are in flight and writes collapsed stacks
+    ("frame;frame;frame count" lines), the input of flamegraph.pl and
+    speedscope. The app only installs the hooks when profiling is enabled;
+    between captures they cost one attribute check per request.
+    """
+
+    def __init__(self, output_dir, interval_ms=5):
+        self.output_dir = output_dir
+        self.interval_ms = interval_ms
+        self.last = None
+        self._capture = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._capture is not None
+
+    def start(self, mode="cprofile", requests=None, seconds=None, interval_ms=None):
+        """
+        Arm a capture that ends after requests completed requests or seconds, whichever comes first.
+
+        Returns:
+            dict: Mode, limits and the file the profile will be written to
+
+        Raises:
+            ValueError: If the arguments are invalid
+            RuntimeError: If a capture is already running
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if requests is None and seconds is None:
+            raise ValueError("requests or seconds is required")
+        if (requests is not None and requests < 1) or (seconds is not None and seconds <= 0):
+            raise ValueError("requests and seconds must be positive")
+        os.makedirs(self.output_dir, exist_ok=True)
+        suffix = "pstats" if mode == "cprofile" else "collapsed"
+        name = f"profile-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{mode}.{suffix}"
+        capture = _Capture(mode, requests, seconds, interval_ms or self.interval_ms,
+                           os.path.join(self.output_dir, name))
+        with self._lock:
+            if self._capture is not None:
+                raise RuntimeError("A profile capture is already running")
+            self._capture = capture
+        if mode == "sample":
+            threading.Thread(target=self._sample, args=(capture,), name="profiler-sampler", daemon=True).start()
+        elif seconds is not None:
+            timer = threading.Timer(seconds, self._stop, args=(capture,))
+            timer.daemon = True
+            timer.start()
+        return self.status()
+
+    def status(self):
+        capture = self._capture
+        if capture is None:
+            return {"running": False, "last": self.last}
+        return {
+            "running": True,
+            "mode": capture.mode,
+            "requests": capture.requests,
+            "seconds": capture.seconds,
+            "finished_requests": capture.finished_requests,
+            "path": capture.path,
+            "last": self.last,
+        }
+
+    def wrap_handler(self, handler):
+        """Wrap an async route handler so captured requests are counted and profiled."""
+
+        async def profiled_handler(request):
+            capture = self._capture
+            if capture is None or capture.stopping:
+                return await handler(request)
+            self._request_started(capture)
+            try:
+                return await handler(request)
+            finally:
+                self._request_finished(capture)
+
+        return profiled_handler
+
+    def wrap(self, function):
+        """Wrap a function that runs on a worker thread so cProfile captures include it."""
+
+        def profiled(*args, **kwargs):
+            capture = self._capture
+            if capture is None or capture.mode != "cprofile" or capture.stopping:
+                return function(*args, **kwargs)
+            if not self._enable(capture):
+                return function(*args, **kwargs)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._disable(capture)
+
+        return profiled
+
+    def _enable(self, capture):
+        thread = threading.get_ident()
+        with self._lock:
+            if capture.stopping or thread in capture.enabled:
+                return False
+            profile = capture.profiles.setdefault(thread, cProfile.Profile())
+            capture.enabled.add(thread)
+        profile.enable()
+        return True
+
+    def _disable(self, capture):
+        thread = threading.get_ident()
+        with self._lock:
+            if thread not in capture.enabled:
+                return
+        capture.profiles[thread].disable()
+        with self._lock:
+            capture.enabled.discard(thread)
+            finish = capture.stopping and not capture.enabled
+        if finish:
+            self._finish(capture)
+
+    def _request_started(self, capture):
+        capture.in_flight += 1
+        # Requests run on the event loop thread, so its profiler stays on while any is in flight
+        if capture.mode == "cprofile" and capture.in_flight == 1:
+            self._enable(capture)
+
+    def _request_finished(self, capture):
+        capture.in_flight -= 1
+        capture.finished_requests += 1
+        if capture.requests is not None and capture.finished_requests >= capture.requests:
+            self._stop(capture)
+        if capture.mode == "cprofile" and (capture.in_flight == 0 or capture.stopping):
+            self._disable(capture)
+
+    def _stop(self, capture):
+        with self._lock:
+            if capture.stopping:
+                return
+            capture.stopping = True
+            finish = capture.mode == "cprofile" and not capture.enabled
+        if finish:
+            self._finish(capture)
+
+    def _sample(self, capture):
+        own = threading.get_ident()
+        names = {}
+        while not capture.stopping:
+            if capture.seconds is not None and time.monotonic() - capture.started >= capture.seconds:
+                self._stop(capture)
+                break
+            if capture.in_flight > 0:
+                for thread, frame in sys._current_frames().items():
+                    if thread == own:
+                        continue
+                    code = frame.f_code
+                    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    if thread not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    stack.append(names.get(thread, str(thread)))
+                    capture.stacks[";".join(reversed(stack))] += 1
+                capture.samples += 1
+            time.sleep(capture.interval_s)
+        self._finish(capture)
+
+    def _finish(self, capture):
+        with self._lock:
+            if self._capture is not capture:
+                return
+            self._capture = None
+        path = capture.path
+        if capture.mode == "cprofile":
+            profiles = list(capture.profiles.values())
+            if profiles:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(path)
+            else:
+                # pstats cannot write or read an empty profile
+                path = None
+        else:
+            with open(capture.path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in capture.stacks.most_common())
+        self.last = {
+            "mode": capture.mode,
+            "path": path,
+            "requests": capture.finished_requests,
+            "seconds": round(time.monotonic() - capture.started, 3),
+            "samples": capture.samples if capture.mode == "sample" else None,
+        }
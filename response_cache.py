@@ -0,0 +1,102 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+def response_cache_key(record, serving_identity, utc_date, local_date):
+    """
+    Hash everything a /analyze-engagement response depends on.
+
+    Args:
+        record: FeatureRecord decoded from the request and its peer snapshot;
+            fields the response does not read (goal_tags, quiz_history, ...)
+            are not part of it, so changing them still hits
+        serving_identity (str): ServingSnapshot.identity, covering rules and
+            models; unlike the version it means the same thing in every process
+        utc_date (date): Date used for days_since_event in the quiz nudge
+        local_date (date): Date used by the FOMO score's time term
+
+    Returns:
+        str: Hex digest identifying the response
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{record.key()!r}|{serving_identity}|{utc_date}|{local_date}".encode())
+    return digest.hexdigest()
+
+
+class LocalCacheBackend:
+    """In-process LRU with a per-entry TTL; each worker process has its own."""
+
+    def __init__(self, max_entries, ttl_s):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker and replica, stored as JSON in Redis."""
+
+    def __init__(self, url, ttl_s, prefix="engagement:response:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis response cache backend requires redis: pip install redis")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_s = ttl_s
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(self.ttl_s)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def make_cache_backend(settings):
+    """
+    Build the backend configured under "response_cache".
+
+    Returns:
+        The backend, or None when the cache is disabled
+    """
+    if not settings["enabled"]:
+        return None
+    if settings["backend"] == "redis":
+        return RedisCacheBackend(settings["redis_url"], settings["ttl_s"])
+    if settings["backend"] == "local":
+        return LocalCacheBackend(settings["max_entries"], settings["ttl_s"])
+    raise ValueError(f"Unknown response_cache backend: {settings['backend']}")
@@ -0,0 +1,58 @@
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, root_validator
+
+
+class Profile(BaseModel):
+    resume_uploaded: bool
+    goal_tags: List[str]
+    karma: int
+    projects_added: int
+    quiz_history: List[str]
+    clubs_joined: List[str]
+    buddy_count: int
+    
+class Activity(BaseModel):
+    login_streak: int
+    posts_created: int
+    buddies_interacted: int
+    last_event_attended: Optional[date]
+    
+class PeerSnapshot(BaseModel):
+    batch_avg_projects: int
+    batch_resume_uploaded_pct: int
+    batch_event_attendance: Dict[str, int]
+    buddies_attending_events: List[str]
+    
+class UserInput(BaseModel):
+    user_id: str
+    profile: Profile
+    activity: Activity
+    peer_snapshot: Optional[PeerSnapshot] = None
+    batch_id: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_peer_snapshot_source(cls, values):
+        if values.get("peer_snapshot") is None and values.get("batch_id") is None:
+            raise ValueError("either peer_snapshot or batch_id is required")
+        return values
+
+class BatchUserInput(BaseModel):
+    users: List[UserInput]
+
+class UserState(BaseModel):
+    batch_id: str
+    profile: Profile
+    activity: Activity
+
+class ActivityEvent(BaseModel):
+    user_id: str
+    type: Literal["login", "post", "buddy_interaction", "event_attendance", "resume_upload", "project_added"]
+    occurred_at: Optional[datetime] = None
+    # Which event was attended, counted in the batch's batch_event_attendance
+    event_name: Optional[str] = None
+
+    def day(self):
+        """Date the event counts towards, today in UTC when occurred_at is missing."""
+        return (self.occurred_at or datetime.utcnow()).date()
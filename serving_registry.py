@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from itertools import count
+from typing import NamedTuple, Optional
+
+from nudge_engine import WARMUP_ROW, RuleSet, compile_rules, load_models, predict_rows
+
+
+class ServingSnapshot(NamedTuple):
+    """Config, compiled rules and models that one request is served with."""
+    version: int
+    config: dict
+    rules: RuleSet
+    resume_model: object
+    event_model: object
+    config_fingerprint: Optional[tuple] = None
+    model_fingerprint: Optional[tuple] = None
+    model_digest: Optional[str] = None
+    # What responses depend on besides the request; see response_identity
+    identity: Optional[str] = None
+
+# Config sections a response depends on; the model files are covered by their contents
+RESPONSE_SECTIONS = ("profile_rules", "event_rules", "priority_labels", "inference")
+
+
+def model_files(config):
+    """Files whose change means the models must be reloaded."""
+    models = config["models"]
+    paths = [models["resume_path"], models["event_path"]]
+    for directory in (models["resume_compiled_path"], models["event_compiled_path"], models["event_distilled_path"]):
+        if os.path.isdir(directory):
+            paths.extend(os.path.join(directory, entry) for entry in sorted(os.listdir(directory)))
+    return paths
+
+
+def fingerprint(paths):
+    """(path, mtime_ns, size) per path, with None for files that do not exist."""
+    entries = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            entries.append((path, None, None))
+            continue
+        entries.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+def content_digest(paths):
+    """Digest of the names and contents of paths; unlike fingerprint() it is the same on every host."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode() + b"\0")
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except FileNotFoundError:
+            digest.update(b"missing")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def response_identity(config, model_digest):
+    """
+    Identify the rules and models a response is computed with.
+
+    Two processes loaded from the same config sections and model file
+    contents get the same identity, whatever their local version numbers,
+    so a cache shared between workers and replicas only serves a response
+    to processes that would compute the same one.
+    """
+    sections = {name: config.get(name) for name in RESPONSE_SECTIONS}
+    payload = json.dumps([sections, model_digest], sort_keys=True).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ServingRegistry:
+    """
+    Holds the current ServingSnapshot and swaps in new versions on reload.
+
+    Readers take registry.current once per request and use only that
+    snapshot, so they never lock. Assigning the attribute is atomic, and a
+    request that started before a reload finishes on the versions it began
+    with. Only reloads are serialised against each other.
+
+    A reload that only touches the rule sections keeps the loaded models.
+    When the model files, "models" or "inference" change, the models are
+    loaded and warmed up before the swap. If anything fails, the previous
+    snapshot stays in place.
+
+    Versions are local to the process. Snapshots published by reload()
+    also carry an identity derived from the config and the model files'
+    contents; snapshots published with objects passed in directly get one
+    unique to this registry and version.
+    """
+
+    def __init__(self, config_path, config):
+        self.config_path = config_path
+        self._instance = uuid.uuid4().hex
+        self.current = ServingSnapshot(0, config, compile_rules(config), None, None, identity=f"{self._instance}:0")
+        self._versions = count(1)
+        self._reload_lock = threading.Lock()
+        self._failed_fingerprint = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def publish(self, **fields):
+        """Swap in a copy of the current snapshot with fields replaced."""
+        with self._reload_lock:
+            return self._publish(**fields)
+
+    def _publish(self, **fields):
+        version = next(self._versions)
+        if "model_digest" not in fields and ("resume_model" in fields or "event_model" in fields):
+            # Models passed in directly are not described by any file contents
+            fields["model_digest"] = None
+        if fields.get("identity") is None:
+            fields["identity"] = f"{self._instance}:{version}"
+        snapshot = self.current._replace(version=version, **fields)
+        self.current = snapshot
+        return snapshot
+
+    def reload(self, force=False):
+        """
+        Re-read the config file and, if needed, the models.
+
+        Args:
+            force (bool): Reload the models even if no file changed
+
+        Returns:
+            tuple: (snapshot, reloaded), reloaded False when nothing changed
+
+        Raises:
+            Exception: If the new config or models cannot be loaded; the
+                current snapshot keeps serving
+        """
+        with self._reload_lock:
+            current = self.current
+            config_fingerprint = fingerprint([self.config_path])
+            with open(self.config_path) as f:
+                config = json.load(f)
+            model_fingerprint = fingerprint(model_files(config))
+            fingerprints = (config_fingerprint, model_fingerprint)
+            unchanged = fingerprints == (current.config_fingerprint, current.model_fingerprint)
+            if not force and (unchanged or fingerprints == self._failed_fingerprint):
+                return current, False
+
+            try:
+                rules = compile_rules(config)
+                resume_model, event_model = current.resume_model, current.event_model
+                models_changed = (
+                    force
+                    or resume_model is None
+                    or model_fingerprint != current.model_fingerprint
+                    or config["models"] != current.config["models"]
+                    or config["inference"] != current.config["inference"]
+                )
+                model_digest = current.model_digest
+                if models_changed:
+                    resume_model, event_model = self._load_models(config, current)
+                    model_digest = content_digest(model_files(config))
+            except Exception:
+                self._failed_fingerprint = fingerprints
+                raise
+
+            self._failed_fingerprint = None
+            snapshot = self._publish(
+                config=config,
+                rules=rules,
+                resume_model=resume_model,
+                event_model=event_model,
+                config_fingerprint=config_fingerprint,
+                model_fingerprint=model_fingerprint,
+                model_digest=model_digest,
+                identity=response_identity(config, model_digest) if model_digest else None,
+            )
+            return snapshot, True
+
+    def _load_models(self, config, current):
+        resume_model, event_model = load_models(config)
+        if resume_model is None or event_model is None:
+            if current.resume_model is not None:
+                raise RuntimeError(f"Models could not be loaded, still serving version {current.version}")
+            return resume_model, event_model
+        # The first predict pays for deferred imports and page faults; take it
+        # here rather than on the first request after the swap
+        predict_rows(resume_model, event_model, [WARMUP_ROW])
+        return resume_model, event_model
+
+    def watch(self, poll_interval):
+        """Poll the config and model files every poll_interval seconds in a daemon thread."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(poll_interval,), name="serving-registry-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self, poll_interval):
+        while not self._stop.wait(poll_interval):
+            try:
+                snapshot, reloaded = self.reload()
+            except Exception as e:
+                print(f"Warning: Reload failed, still serving version {self.current.version}: {e}")
+                continue
+            if reloaded:
+                print(f"Reloaded config and models as version {snapshot.version}")
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from event_fomo_score import batch_attendance_score
+from schemas import PeerSnapshot
+
+
+class BatchAggregates(NamedTuple):
+    """Per-snapshot quantities shared by every user of a batch."""
+    attendance_total: int
+    batch_score: float
+    buddies_attending: int
+
+
+def compute_batch_aggregates(peer_snapshot):
+    """
+    Derive the batch-level rule and FOMO inputs from a peer snapshot.
+
+    Args:
+        peer_snapshot: PeerSnapshot model
+
+    Returns:
+        BatchAggregates: Attendance sum, batch attendance factor and buddies attending
+    """
+    return BatchAggregates(
+        attendance_total=sum(peer_snapshot.batch_event_attendance.values()),
+        batch_score=batch_attendance_score(peer_snapshot.batch_event_attendance),
+        buddies_attending=len(peer_snapshot.buddies_attending_events),
+    )
+
+
+def merge_counted_snapshot(counted, registered):
+    """
+    Combine a batch's state store counters with its registered snapshot.
+
+    buddies_attending_events depends on who the user's buddies are, so it
+    comes from the registered snapshot, if any; everything else comes from
+    the counters.
+
+    Args:
+        counted (tuple): (version, fields) from UserStateStore.batch_snapshot, or None
+        registered (tuple): (version, peer_snapshot, aggregates) from get(), or None
+
+    Returns:
+        tuple: (version, peer_snapshot, aggregates), or None if both are None
+    """
+    if counted is None:
+        return registered
+
+    counter_version, fields = counted
+    registered_version, buddies_attending_events = None, []
+    if registered is not None:
+        registered_version, registered_snapshot, _ = registered
+        buddies_attending_events = registered_snapshot.buddies_attending_events
+    peer_snapshot = PeerSnapshot(**fields, buddies_attending_events=buddies_attending_events)
+    version = f"counters:{counter_version}:{registered_version}"
+    return version, peer_snapshot, compute_batch_aggregates(peer_snapshot)
+
+
+class PeerSnapshotRegistry:
+    """
+    Caches the parsed peer snapshots of a UserStateStore and their aggregates.
+
+    Registered snapshots are stored in the state store's SQLite file, so
+    every worker process sees a PUT made through any of them. Each process
+    keeps the PeerSnapshot models and aggregates in bounded LRUs keyed by
+    (store, batch_id, version), so a replaced snapshot is never served stale
+    and rarely used batches are parsed again on demand. Snapshots merged
+    with the store's batch counters are cached the same way, per counter
+    version.
+    """
+
+    def __init__(self, cache_size):
+        self.cache_size = cache_size
+        self._entries = OrderedDict()
+        self._merged = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, cache, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _store(self, cache, key, value):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+    def put(self, store, batch_id, peer_snapshot):
+        """Register a batch's snapshot in store; returns its version."""
+        return store.put_peer_snapshot(batch_id, peer_snapshot.dict())
+
+    def get(self, store, batch_id):
+        """
+        Look up a batch's registered snapshot.
+
+        Args:
+            store (UserStateStore): Store the snapshots are registered in
+            batch_id (str): Batch identifier used in PUT /peer-snapshots/{batch_id}
+
+        Returns:
+            tuple: (version, peer_snapshot, aggregates), or None if the batch is unknown
+        """
+        stored = store.peer_snapshot(batch_id)
+        if stored is None:
+            return None
+        version, snapshot_json = stored
+        key = (store, batch_id, version)
+
+        entry = self._cached(self._entries, key)
+        if entry is None:
+            peer_snapshot = PeerSnapshot.parse_raw(snapshot_json)
+            entry = (version, peer_snapshot, compute_batch_aggregates(peer_snapshot))
+            self._store(self._entries, key, entry)
+        return entry
+
+    def resolve(self, store, batch_id):
+        """
+        merge_counted_snapshot() of a batch's counters and its registered snapshot, cached.
+
+        The merged snapshot only changes when the counters or the registered
+        snapshot do, so it is cached per (batch_id, counter version, registered
+        version) and requests for an unchanged batch skip validation and
+        aggregation.
+
+        Args:
+            store (UserStateStore): Store holding the counters and registered snapshots
+            batch_id (str): Batch identifier
+
+        Returns:
+            tuple: (version, peer_snapshot, aggregates), or None if the batch is unknown
+        """
+        registered = self.get(store, batch_id)
+        counted = store.batch_snapshot(batch_id)
+        if counted is None:
+            return registered
+
+        key = (store, batch_id, counted[0], None if registered is None else registered[0])
+        entry = self._cached(self._merged, key)
+        if entry is None:
+            entry = merge_counted_snapshot(counted, registered)
+            self._store(self._merged, key, entry)
+        return entry
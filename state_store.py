@@ -0,0 +1,424 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    resume_uploaded INTEGER NOT NULL DEFAULT 0,
+    goal_tags TEXT NOT NULL DEFAULT '[]',
+    karma INTEGER NOT NULL DEFAULT 0,
+    projects_added INTEGER NOT NULL DEFAULT 0,
+    quiz_history TEXT NOT NULL DEFAULT '[]',
+    clubs_joined TEXT NOT NULL DEFAULT '[]',
+    buddy_count INTEGER NOT NULL DEFAULT 0,
+    login_streak INTEGER NOT NULL DEFAULT 0,
+    posts_created INTEGER NOT NULL DEFAULT 0,
+    buddies_interacted INTEGER NOT NULL DEFAULT 0,
+    last_event_attended TEXT,
+    last_login TEXT
+);
+
+-- Daily campaign runs read users by last event date (UserStateStore.users_by_last_event)
+CREATE INDEX IF NOT EXISTS users_last_event ON users (last_event_attended, user_id)
+WHERE batch_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS user_events (
+    user_id TEXT NOT NULL,
+    event_name TEXT NOT NULL,
+    PRIMARY KEY (user_id, event_name)
+);
+
+CREATE TABLE IF NOT EXISTS batch_counters (
+    batch_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    user_count INTEGER NOT NULL DEFAULT 0,
+    resume_count INTEGER NOT NULL DEFAULT 0,
+    project_total INTEGER NOT NULL DEFAULT 0
+);
+
+-- Snapshots registered with PUT /peer-snapshots. They live here rather than
+-- in the API process so every uvicorn worker serves the same ones; version
+-- grows across the table, so a (batch_id, version) pair is never reused.
+CREATE TABLE IF NOT EXISTS peer_snapshots (
+    batch_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    snapshot TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS batch_event_attendance (
+    batch_id TEXT NOT NULL,
+    event_name TEXT NOT NULL,
+    attendees INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (batch_id, event_name)
+);
+
+-- Batch counters follow every write to users and user_events, touching only
+-- the rows of the batches involved, so they never need a population scan.
+-- Rows are created with NOT EXISTS rather than INSERT OR IGNORE because the
+-- outer statement's conflict policy overrides the one inside a trigger.
+CREATE TRIGGER IF NOT EXISTS users_insert_counters AFTER INSERT ON users
+WHEN NEW.batch_id IS NOT NULL
+BEGIN
+    INSERT INTO batch_counters (batch_id)
+    SELECT NEW.batch_id WHERE NOT EXISTS (SELECT 1 FROM batch_counters WHERE batch_id = NEW.batch_id);
+    UPDATE batch_counters SET
+        version = version + 1,
+        user_count = user_count + 1,
+        resume_count = resume_count + NEW.resume_uploaded,
+        project_total = project_total + NEW.projects_added
+    WHERE batch_id = NEW.batch_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_update_counters AFTER UPDATE OF batch_id, resume_uploaded, projects_added ON users
+BEGIN
+    UPDATE batch_counters SET
+        version = version + 1,
+        user_count = user_count - 1,
+        resume_count = resume_count - OLD.resume_uploaded,
+        project_total = project_total - OLD.projects_added
+    WHERE batch_id = OLD.batch_id;
+    INSERT INTO batch_counters (batch_id)
+    SELECT NEW.batch_id WHERE NEW.batch_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM batch_counters WHERE batch_id = NEW.batch_id);
+    UPDATE batch_counters SET
+        version = version + 1,
+        user_count = user_count + 1,
+        resume_count = resume_count + NEW.resume_uploaded,
+        project_total = project_total + NEW.projects_added
+    WHERE batch_id = NEW.batch_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_move_event_attendance AFTER UPDATE OF batch_id ON users
+WHEN OLD.batch_id IS NOT NEW.batch_id
+BEGIN
+    UPDATE batch_event_attendance SET attendees = attendees - 1
+    WHERE batch_id = OLD.batch_id
+      AND event_name IN (SELECT event_name FROM user_events WHERE user_id = NEW.user_id);
+    INSERT INTO batch_event_attendance (batch_id, event_name)
+    SELECT NEW.batch_id, event_name FROM user_events
+    WHERE user_id = NEW.user_id AND NEW.batch_id IS NOT NULL
+      AND event_name NOT IN (SELECT event_name FROM batch_event_attendance WHERE batch_id = NEW.batch_id);
+    UPDATE batch_event_attendance SET attendees = attendees + 1
+    WHERE batch_id = NEW.batch_id
+      AND event_name IN (SELECT event_name FROM user_events WHERE user_id = NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_events_insert_attendance AFTER INSERT ON user_events
+BEGIN
+    INSERT INTO batch_event_attendance (batch_id, event_name)
+    SELECT batch_id, NEW.event_name FROM users
+    WHERE user_id = NEW.user_id AND batch_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM batch_event_attendance
+          WHERE batch_event_attendance.batch_id = users.batch_id AND event_name = NEW.event_name
+      );
+    UPDATE batch_event_attendance SET attendees = attendees + 1
+    WHERE batch_id = (SELECT batch_id FROM users WHERE user_id = NEW.user_id) AND event_name = NEW.event_name;
+    UPDATE batch_counters SET version = version + 1
+    WHERE batch_id = (SELECT batch_id FROM users WHERE user_id = NEW.user_id);
+END;
+"""
+
+# One UPDATE per event type; each is O(1) on the user's row. Dates are ISO
+# strings, so max() and comparisons order them correctly, and events that
+# arrive late never move last_login or last_event_attended backwards.
+EVENT_UPDATES = {
+    "login": """
+        UPDATE users SET
+            login_streak = CASE
+                WHEN last_login >= :day THEN login_streak
+                WHEN last_login = date(:day, '-1 day') THEN login_streak + 1
+                ELSE 1
+            END,
+            last_login = max(coalesce(last_login, :day), :day)
+        WHERE user_id = :user_id
+    """,
+    "project_added": "UPDATE users SET projects_added = projects_added + 1 WHERE user_id = :user_id",
+    "post": "UPDATE users SET posts_created = posts_created + 1 WHERE user_id = :user_id",
+    "buddy_interaction": "UPDATE users SET buddies_interacted = buddies_interacted + 1 WHERE user_id = :user_id",
+    "event_attendance": """
+        UPDATE users SET last_event_attended = max(coalesce(last_event_attended, :day), :day)
+        WHERE user_id = :user_id
+    """,
+    "resume_upload": "UPDATE users SET resume_uploaded = 1 WHERE user_id = :user_id",
+}
+
+
+def _user_document(row):
+    return {
+        "user_id": row["user_id"],
+        "batch_id": row["batch_id"],
+        "profile": {
+            "resume_uploaded": bool(row["resume_uploaded"]),
+            "goal_tags": json.loads(row["goal_tags"]),
+            "karma": row["karma"],
+            "projects_added": row["projects_added"],
+            "quiz_history": json.loads(row["quiz_history"]),
+            "clubs_joined": json.loads(row["clubs_joined"]),
+            "buddy_count": row["buddy_count"],
+        },
+        "activity": {
+            "login_streak": row["login_streak"],
+            "posts_created": row["posts_created"],
+            "buddies_interacted": row["buddies_interacted"],
+            "last_event_attended": row["last_event_attended"],
+        },
+    }
+
+
+class UserStateStore:
+    """
+    Per-user profile and activity state in SQLite, updated one event at a time.
+
+    The connection is opened on first use, so importing the app creates no
+    database file. Writes are serialised by a lock; SQLite runs in WAL mode
+    so the file can also be read by offline jobs while the API writes.
+    Lookups on the request path read through a connection of their own per
+    thread and do not take the lock, so they are not held up by a large
+    apply_events.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+
+    def _connection(self, create=True):
+        if self._conn is None:
+            if not create and self.path != ":memory:" and not os.path.exists(self.path):
+                # Reads before any write: there is nothing to find yet
+                return None
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _reading(self):
+        """
+        Yield a connection for lookups, or None if there is no database yet.
+
+        Each thread gets its own connection and reads in its own transaction,
+        which in WAL mode sees the last commit even while a write is in
+        progress. An in-memory database only exists on the locked connection.
+        """
+        if self.path == ":memory:":
+            with self._lock:
+                yield self._connection(create=False)
+            return
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if not os.path.exists(self.path):
+                yield None
+                return
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # The file may have been created by a writer that has not created the tables yet
+            conn.executescript(SCHEMA)
+            with self._readers_lock:
+                self._readers.append(conn)
+            self._local.conn = conn
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def put_user(self, user_id, batch_id, profile, activity):
+        """Create or replace a user's full state from Profile and Activity models."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    # An upsert rather than INSERT OR REPLACE, so the update
+                    # triggers move the user's batch counter contributions
+                    """
+                    INSERT INTO users (
+                        user_id, batch_id, resume_uploaded, goal_tags, karma, projects_added, quiz_history,
+                        clubs_joined, buddy_count, login_streak, posts_created, buddies_interacted,
+                        last_event_attended, last_login
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        batch_id = excluded.batch_id,
+                        resume_uploaded = excluded.resume_uploaded,
+                        goal_tags = excluded.goal_tags,
+                        karma = excluded.karma,
+                        projects_added = excluded.projects_added,
+                        quiz_history = excluded.quiz_history,
+                        clubs_joined = excluded.clubs_joined,
+                        buddy_count = excluded.buddy_count,
+                        login_streak = excluded.login_streak,
+                        posts_created = excluded.posts_created,
+                        buddies_interacted = excluded.buddies_interacted,
+                        last_event_attended = excluded.last_event_attended,
+                        last_login = NULL
+                    """,
+                    (
+                        user_id, batch_id, int(profile.resume_uploaded), json.dumps(profile.goal_tags),
+                        profile.karma, profile.projects_added, json.dumps(profile.quiz_history),
+                        json.dumps(profile.clubs_joined), profile.buddy_count, activity.login_streak,
+                        activity.posts_created, activity.buddies_interacted,
+                        None if activity.last_event_attended is None else activity.last_event_attended.isoformat(),
+                    ),
+                )
+
+    def apply_events(self, events):
+        """
+        Apply activity events in order, in one transaction.
+
+        Users seen for the first time get a default row, with no batch_id
+        until they are registered through put_user. An event_attendance
+        with an event_name counts the user once towards that event in
+        their batch's attendance.
+
+        Args:
+            events (list): ActivityEvent models
+
+        Returns:
+            int: Number of events applied
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for event in events:
+                    conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (event.user_id,))
+                    conn.execute(EVENT_UPDATES[event.type], {"user_id": event.user_id, "day": event.day().isoformat()})
+                    if event.type == "event_attendance" and event.event_name is not None:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO user_events (user_id, event_name) VALUES (?, ?)",
+                            (event.user_id, event.event_name),
+                        )
+        return len(events)
+
+    def get_user(self, user_id):
+        """
+        Read a user's state shaped like a UserInput payload.
+
+        Returns:
+            dict: user_id, batch_id, profile and activity, or None if unknown
+        """
+        with self._reading() as conn:
+            row = None if conn is None else conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return None if row is None else _user_document(row)
+
+    def users_by_last_event(self, first_day, last_day, chunk_size=5000):
+        """
+        Yield users with a batch whose last event falls in [first_day, last_day].
+
+        Users are read in (last_event_attended, user_id) order from the
+        users_last_event index, one chunk per query, so a query costs the
+        size of its chunk rather than of the table, and the lock is only
+        held while a chunk is fetched so API writes can interleave.
+
+        Args:
+            first_day (date): Earliest last_event_attended, inclusive
+            last_day (date): Latest last_event_attended, inclusive
+            chunk_size (int): Users read per query
+
+        Yields:
+            list: get_user()-shaped dicts
+        """
+        after = (first_day.isoformat(), "")
+        while True:
+            with self._lock:
+                conn = self._connection(create=False)
+                if conn is None:
+                    return
+                rows = conn.execute(
+                    """
+                    SELECT * FROM users
+                    WHERE batch_id IS NOT NULL AND (last_event_attended, user_id) > (?, ?)
+                      AND last_event_attended <= ?
+                    ORDER BY last_event_attended, user_id LIMIT ?
+                    """,
+                    (*after, last_day.isoformat(), chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield [_user_document(row) for row in rows]
+            after = (rows[-1]["last_event_attended"], rows[-1]["user_id"])
+
+    def put_peer_snapshot(self, batch_id, fields):
+        """
+        Register or replace a batch's peer snapshot.
+
+        Args:
+            batch_id (str): Batch identifier
+            fields (dict): PeerSnapshot fields
+
+        Returns:
+            int: The snapshot's new version
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                # One statement, so concurrent writers from other processes never share a version
+                conn.execute(
+                    """
+                    INSERT INTO peer_snapshots (batch_id, version, snapshot)
+                    VALUES (?, (SELECT coalesce(max(version), 0) + 1 FROM peer_snapshots), ?)
+                    ON CONFLICT (batch_id) DO UPDATE SET version = excluded.version, snapshot = excluded.snapshot
+                    """,
+                    (batch_id, json.dumps(fields)),
+                )
+                return conn.execute("SELECT version FROM peer_snapshots WHERE batch_id = ?", (batch_id,)).fetchone()[0]
+
+    def peer_snapshot(self, batch_id):
+        """
+        Read a batch's registered peer snapshot.
+
+        Returns:
+            tuple: (version, snapshot JSON), or None if none is registered
+        """
+        with self._reading() as conn:
+            row = None if conn is None else conn.execute(
+                "SELECT version, snapshot FROM peer_snapshots WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return None if row is None else (row["version"], row["snapshot"])
+
+    def batch_snapshot(self, batch_id):
+        """
+        Read a batch's peer statistics from its running counters.
+
+        Returns:
+            tuple: (version, fields) where fields holds batch_avg_projects,
+                batch_resume_uploaded_pct and batch_event_attendance, or None
+                when the batch has no registered users
+        """
+        with self._reading() as conn:
+            if conn is None:
+                return None
+            counters = conn.execute("SELECT * FROM batch_counters WHERE batch_id = ?", (batch_id,)).fetchone()
+            if counters is None or counters["user_count"] == 0:
+                return None
+            attendance = conn.execute(
+                "SELECT event_name, attendees FROM batch_event_attendance WHERE batch_id = ? AND attendees > 0",
+                (batch_id,),
+            ).fetchall()
+        user_count = counters["user_count"]
+        return counters["version"], {
+            "batch_avg_projects": round(counters["project_total"] / user_count),
+            "batch_resume_uploaded_pct": round(100 * counters["resume_count"] / user_count),
+            "batch_event_attendance": {row["event_name"]: row["attendees"] for row in attendance},
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+            self._local = threading.local()
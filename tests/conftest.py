@@ -5,6 +5,10 @@ import json
 from unittest.mock import patch, mock_open
 import pytest
 
+# The app imports pandas on first use, and its first import reads timezone
+# files, so import it here before any test patches builtins.open
+import pandas  # noqa: F401
+
 # Add the project root directory to Python path
 project_root = str(Path(__file__).parent.parent)
 sys.path.insert(0, project_root)
@@ -25,16 +29,138 @@ mock_config = {
         "project": "medium",
         "quiz": "low",
         "event_fomo": "medium"
+    },
+    "observability": {
+        "metrics": True,
+        "debug_prints": False,
+        "profiling": {
+            "enabled": False,
+            "output_dir": "profiles",
+            "sample_interval_ms": 5
+        }
+    },
+    "reload": {
+        "watch": True,
+        "poll_interval_s": 2
+    },
+    "response_cache": {
+        "enabled": True,
+        "backend": "local",
+        "max_entries": 10000,
+        "ttl_s": 3600,
+        "redis_url": None
+    },
+    "state_store": {
+        "path": "engagement_state.db"
+    },
+    "peer_snapshots": {
+        "cache_size": 1024
+    },
+    "campaigns": {
+        "outbox_dir": "campaigns/outbox",
+        "state_path": "campaigns/state.json",
+        "send_window": {"start_hour": 9, "end_hour": 21},
+        "bucket_minutes": 15,
+        "max_per_bucket": 20000,
+        "chunk_size": 5000,
+        "workers": 1
+    },
+    "models": {
+        "resume_path": "model/ml_model/models/random_forest_resume.joblib",
+        "event_path": "model/ml_model/models/rf_model_event.joblib",
+        "resume_compiled_path": "model/ml_model/models/random_forest_resume.compiled",
+        "event_compiled_path": "model/ml_model/models/rf_model_event.compiled",
+        "event_distilled_path": "model/ml_model/models/rf_model_event.distilled",
+        "load_mode": "eager",
+        "mmap": True
+    },
+    "training": {
+        "cache_dir": "model/ml_model/.cache",
+        "versions_dir": "model/ml_model/models/versions",
+        "n_jobs": -1,
+        "cv_folds": 3,
+        "random_state": 42,
+        "param_grid": {
+            "n_estimators": [100],
+            "max_depth": [None, 8, 16],
+            "min_samples_leaf": [1, 5]
+        },
+        "models": {
+            "resume": {
+                "train": "model/ml_model/new_datasets/balanced_resume_dataset_realistic_noisy.csv",
+                "test": "model/ml_model/new_datasets/balanced_test_resume_dataset_realistic_noisy.csv",
+                "features": ["resume_uploaded", "batch_resume_uploaded_pct"],
+                "target": "should_nudge_resume"
+            },
+            "event": {
+                "train": "model/ml_model/train_dataset/event_dataset.csv",
+                "test": "model/ml_model/test_dataset/test_event_dataset.csv",
+                "features": ["karma", "event_fomo_score"],
+                "target": "should_nudge_event"
+            }
+        }
+    },
+    "inference": {
+        "engine": "sklearn",
+        "event_tier": "full",
+        "executor_workers": 2,
+        "max_batch_size": 64,
+        "max_wait_ms": 2,
+        "lookup_tables": True,
+        "max_table_size": 100000,
+        "feature_domains": {
+            "resume": {
+                "resume_uploaded": [0, 1],
+                "batch_resume_uploaded_pct": {"min": 0, "max": 100, "divisor": 100}
+            },
+            "event": {
+                "karma": None,
+                "event_fomo_score": {"min": 0, "max": 100, "divisor": 100}
+            }
+        }
     }
 }
 
 # Mock model data
 mock_model_data = b"mock model data"
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "real_files: read and write real files instead of the mocked open() and joblib.load"
+    )
+
+
 @pytest.fixture(autouse=True)
-def setup_test_environment():
+def setup_test_environment(request):
     """Setup test environment variables and configurations"""
+    if request.node.get_closest_marker("real_files"):
+        yield
+        return
     # Mock file operations
     with patch('builtins.open', mock_open(read_data=json.dumps(mock_config))) as mock_file:
         with patch('joblib.load', return_value=None) as mock_load:
-            yield 
\ No newline at end of file
+            yield 
+
+
+@pytest.fixture(autouse=True)
+def isolated_state_store(monkeypatch):
+    """Registered peer snapshots live in the state store, so give each test an empty in-memory one."""
+    main = sys.modules.get("main")
+    if main is not None:
+        from state_store import UserStateStore
+
+        store = UserStateStore(":memory:")
+        monkeypatch.setattr(main, "state_store", store)
+        yield
+        store.close()
+    else:
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Tests change model predictions between identical requests, so start each one uncached."""
+    main = sys.modules.get("main")
+    if main is not None and main.response_cache is not None:
+        main.response_cache.clear()
+    yield
@@ -0,0 +1,159 @@
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import campaign_scheduler
+import main
+import simulate_data
+from campaign_scheduler import DeliveryWindow, drain, due_files, run_campaign
+from schemas import Activity, Profile
+from state_store import UserStateStore
+
+ml_root = Path(project_root) / "model" / "ml_model"
+now = datetime(2025, 3, 10, 20, 40)
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture(scope="module")
+def models(tmp_path_factory):
+    model_dir = tmp_path_factory.mktemp("models")
+    resume = pd.read_csv(ml_root / "train_dataset" / "resume_dataset.csv")
+    event = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    joblib.dump(RandomForestClassifier(n_estimators=10, random_state=42).fit(
+        resume[['resume_uploaded', 'batch_resume_uploaded_pct']], resume['should_nudge_resume']),
+        model_dir / "resume.joblib")
+    joblib.dump(RandomForestClassifier(n_estimators=10, random_state=42).fit(
+        event[['karma', 'event_fomo_score']], event['should_nudge_event']), model_dir / "event.joblib")
+    return model_dir
+
+@pytest.fixture
+def config_path(tmp_path, models):
+    config = dict(main.config)
+    config["models"] = dict(
+        config["models"], resume_path=str(models / "resume.joblib"), event_path=str(models / "event.joblib")
+    )
+    config["state_store"] = {"path": str(tmp_path / "state.db")}
+    config["campaigns"] = dict(
+        config["campaigns"], outbox_dir=str(tmp_path / "outbox"), state_path=str(tmp_path / "campaign.json"),
+        send_window={"start_hour": 9, "end_hour": 21}, bucket_minutes=30, max_per_bucket=7, chunk_size=16,
+    )
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    return path
+
+def queued(config_path):
+    outbox_dir = json.loads(config_path.read_text())["campaigns"]["outbox_dir"]
+    messages = []
+    for path in due_files(outbox_dir, datetime.max):
+        messages.extend(json.loads(line) for line in Path(path).read_text().splitlines())
+    return messages
+
+def register_users(config_path, last_events):
+    store = UserStateStore(json.loads(config_path.read_text())["state_store"]["path"])
+    random.seed(4)
+    for user_id, last_event in last_events.items():
+        user = simulate_data.simulate_user(user_id)
+        user["activity"]["last_event_attended"] = last_event.isoformat()
+        store.put_user(user_id, "cse", Profile(**user["profile"]), Activity(**user["activity"]))
+    store.close()
+
+def test_buckets_stay_inside_the_send_window():
+    window = DeliveryWindow(start_hour=9, end_hour=21, bucket_minutes=30, max_per_bucket=10)
+    buckets = window.buckets(now)
+    assert [next(buckets) for _ in range(3)] == [
+        datetime(2025, 3, 10, 20, 30), datetime(2025, 3, 11, 9, 0), datetime(2025, 3, 11, 9, 30)]
+    assert next(window.buckets(datetime(2025, 3, 10, 6, 0))) == datetime(2025, 3, 10, 9, 0)
+
+@pytest.mark.parametrize("change", [
+    {"send_window": {"start_hour": 21, "end_hour": 9}},
+    {"send_window": {"start_hour": 9, "end_hour": 9}},
+    {"send_window": {"start_hour": -1, "end_hour": 9}},
+    {"send_window": {"start_hour": 9, "end_hour": 25}},
+    {"bucket_minutes": 0},
+    {"max_per_bucket": 0},
+])
+def test_invalid_send_windows_are_rejected(change):
+    campaigns = {"send_window": {"start_hour": 9, "end_hour": 21}, "bucket_minutes": 30, "max_per_bucket": 10}
+    assert DeliveryWindow.from_config(campaigns) == (9, 21, 30, 10)
+    with pytest.raises(ValueError):
+        DeliveryWindow.from_config({**campaigns, **change})
+
+def test_queues_only_users_crossing_the_idle_threshold(config_path):
+    day = now.date()
+    last_events = {f"stu_{i}": day - timedelta(days=7) for i in range(20)}
+    last_events.update({
+        "stu_recent": day - timedelta(days=6), "stu_old": day - timedelta(days=30),
+        "stu_capped": day - timedelta(days=120),
+    })
+    register_users(config_path, last_events)
+
+    # Users past the FOMO time cap are not read at all
+    report = run_campaign(str(config_path), now=now)
+    assert report["candidates"] == 22 and report["queued"] == 20 and report["buckets"] == 3
+    messages = queued(config_path)
+    assert sorted(message["user_id"] for message in messages) == sorted(f"stu_{i}" for i in range(20))
+    assert all(any(nudge["type"] == "quiz" for nudge in message["nudges"]) for message in messages)
+    assert [message["deliver_after"] for message in messages][::7] == [
+        "2025-03-10T20:30:00", "2025-03-11T09:00:00", "2025-03-11T09:30:00"]
+
+    # The same day is not queued twice; forcing it replaces the earlier messages
+    assert run_campaign(str(config_path), now=now)["candidates"] == 0
+    assert run_campaign(str(config_path), now=now, force=True)["queued"] == 20
+    assert len(queued(config_path)) == 20
+
+    # Two days later the skipped day is caught up: stu_recent crossed yesterday
+    later = run_campaign(str(config_path), now=now + timedelta(days=2))
+    assert later["previous_day"] == day.isoformat() and later["queued"] == 1
+    assert "stu_recent" in [message["user_id"] for message in queued(config_path)]
+
+def test_input_file_candidates_and_drain(tmp_path, config_path):
+    random.seed(9)
+    users = list(simulate_data.iter_users(60))
+    for i, user in enumerate(users):
+        user["activity"]["last_event_attended"] = (now.date() - timedelta(days=7 if i % 3 == 0 else 200)).isoformat()
+    lines = [json.dumps(user) + "\n" for user in users] + ["not json\n"]
+    input_path = tmp_path / "users.jsonl"
+    input_path.write_text("".join(lines))
+
+    report = run_campaign(str(config_path), input_path=str(input_path), now=now, workers=2)
+    assert report["candidates"] == report["queued"] == 20 and report["errors"] == 1
+    assert (tmp_path / "users.jsonl.dayindex").is_dir()
+
+    delivered = []
+    outbox_dir = json.loads(config_path.read_text())["campaigns"]["outbox_dir"]
+    assert drain(outbox_dir, now, delivered.extend) == 7
+    assert drain(outbox_dir, datetime(2025, 3, 11, 9, 45), delivered.extend) == 13
+    assert [message["user_id"] for message in delivered] == [user["user_id"] for user in users[::3]]
+    assert queued(config_path) == []
+
+def test_forced_rerun_skips_delivered_messages_and_closes_the_store(config_path, monkeypatch):
+    day = now.date()
+    register_users(config_path, {f"stu_{i}": day - timedelta(days=7) for i in range(20)})
+    assert run_campaign(str(config_path), now=now)["queued"] == 20
+    outbox_dir = json.loads(config_path.read_text())["campaigns"]["outbox_dir"]
+    delivered = []
+    assert drain(outbox_dir, now, delivered.extend) == 7
+
+    report = run_campaign(str(config_path), now=now, force=True)
+    assert report["queued"] == 13 and report["already_delivered"] == 7
+    assert not {message["user_id"] for message in queued(config_path)} & {message["user_id"] for message in delivered}
+
+    # A failing run still closes its state store connection
+    closed = []
+    close = campaign_scheduler.UserStateStore.close
+    monkeypatch.setattr(campaign_scheduler.UserStateStore, "close", lambda store: closed.append(close(store)))
+    monkeypatch.setattr(campaign_scheduler.Outbox, "write", lambda outbox, bucket, lines: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        run_campaign(str(config_path), now=now, force=True)
+    assert len(closed) == 1
@@ -0,0 +1,56 @@
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from dataset_store import convert_csv, read_dataset, resolve_dataset
+
+# Every test here writes a Parquet or Arrow copy, which needs the optional pyarrow
+pytest.importorskip("pyarrow")
+
+processed_csv = Path(project_root) / "model" / "ml_model" / "processed_fomo_dataset_event_karma_noisy_10.csv"
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "processed.csv"
+    pd.read_csv(processed_csv).head(2500).to_csv(path, index=False)
+    return str(path)
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_converted_file_reads_back_as_read_csv_frame(csv_path, fmt):
+    # A chunk size that does not divide the row count exercises the schema cast
+    output_path, rows = convert_csv(csv_path, fmt, chunk_size=1000)
+
+    assert rows == 2500 and output_path.endswith(f".{fmt}")
+    pd.testing.assert_frame_equal(read_dataset(output_path), pd.read_csv(csv_path))
+
+    columns = ["should_nudge_resume", "resume_uploaded", "batch_resume_uploaded_pct"]
+    pd.testing.assert_frame_equal(read_dataset(output_path, columns), pd.read_csv(csv_path)[columns])
+
+def test_csv_path_prefers_an_up_to_date_converted_copy(csv_path):
+    assert resolve_dataset(csv_path) == csv_path
+    arrow_path, _ = convert_csv(csv_path, "arrow")
+    assert resolve_dataset(csv_path) == arrow_path
+
+    # Rewriting the CSV makes the copy stale until it is converted again
+    pd.read_csv(csv_path).head(10).to_csv(csv_path, index=False)
+    stat = os.stat(arrow_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert resolve_dataset(csv_path) == csv_path
+    assert len(read_dataset(csv_path)) == 10
+
+def test_header_only_csv_converts(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("karma,event_fomo_score,should_nudge_event\n")
+
+    output_path, rows = convert_csv(str(path), "parquet")
+    assert rows == 0
+    assert list(read_dataset(output_path).columns) == ["karma", "event_fomo_score", "should_nudge_event"]
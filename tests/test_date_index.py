@@ -0,0 +1,89 @@
+import json
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from date_index import DayIndex, read_lines, refresh_range
+from event_fomo_score import MAX_DAYS_SINCE_EVENT
+from schemas import Activity, Profile
+from state_store import UserStateStore
+from test_main import make_user
+
+run_day = date(2025, 3, 10)
+
+pytestmark = pytest.mark.real_files
+
+@pytest.mark.parametrize("quiz_idle_days", [7, 120])
+@pytest.mark.parametrize("gap", [1, 3, 40])
+def test_refresh_range_holds_every_user_whose_date_inputs_changed(quiz_idle_days, gap):
+    previous_day = run_day - timedelta(days=gap)
+    first_day, last_day = refresh_range(previous_day, run_day, quiz_idle_days)
+
+    def date_inputs(day, last_event):
+        days = day.toordinal() - last_event.toordinal()
+        return days >= quiz_idle_days, min(days / MAX_DAYS_SINCE_EVENT, 1.0)
+
+    for days_ago in range(0, 400):
+        last_event = run_day - timedelta(days=days_ago)
+        changed = date_inputs(previous_day, last_event) != date_inputs(run_day, last_event)
+        in_range = first_day <= last_event <= last_day
+        # A quiz threshold past the cap leaves a gap the single range also covers
+        assert changed == in_range if quiz_idle_days <= MAX_DAYS_SINCE_EVENT else changed <= in_range, days_ago
+
+    assert refresh_range(run_day, run_day, quiz_idle_days) is None
+
+def test_day_index_reads_only_lines_in_range(tmp_path):
+    path = tmp_path / "users.jsonl"
+    users = [make_user(f"stu_{i}") for i in range(50)]
+    for i, user in enumerate(users):
+        user["activity"]["last_event_attended"] = (run_day - timedelta(days=i * 7 % 100)).isoformat()
+    lines = [json.dumps(user) + "\n" for user in users]
+    lines.insert(10, '{"user_id": "stu_x", "activity": {"last_event_attended": null}}\n')
+    path.write_text("".join(lines))
+
+    index = DayIndex.open(str(path))
+    assert len(index) == 50 and index.unreadable == 1
+    first_day, last_day = run_day - timedelta(days=30), run_day - timedelta(days=7)
+    chunks = list(read_lines(str(path), index.offsets_between(first_day, last_day), chunk_size=3))
+    found = [json.loads(line)["user_id"] for chunk in chunks for line in chunk]
+    assert found == [
+        user["user_id"] for user in users
+        if first_day.isoformat() <= user["activity"]["last_event_attended"] <= last_day.isoformat()
+    ]
+
+    # The saved index is reused until the file changes
+    assert DayIndex.open(str(path)).offsets.filename is not None
+    user = make_user("stu_new")
+    user["activity"]["last_event_attended"] = (run_day - timedelta(days=8)).isoformat()
+    with open(path, "a") as f:
+        f.write(json.dumps(user) + "\n")
+    index = DayIndex.open(str(path))
+    assert len(index) == 51 and len(index.offsets_between(first_day, last_day)) == len(found) + 1
+
+def test_store_pages_through_the_last_event_index(tmp_path):
+    store = UserStateStore(str(tmp_path / "state.db"))
+    for i in range(30):
+        user = make_user(f"stu_{i:02d}")
+        user["activity"]["last_event_attended"] = (run_day - timedelta(days=i % 4)).isoformat()
+        store.put_user(user["user_id"], "cse" if i != 5 else None, Profile(**user["profile"]),
+                       Activity(**user["activity"]))
+
+    chunks = list(store.users_by_last_event(run_day - timedelta(days=2), run_day - timedelta(days=1), chunk_size=4))
+    assert max(len(chunk) for chunk in chunks) == 4
+    user_ids = [user["user_id"] for chunk in chunks for user in chunk]
+    # Ordered by date, then user_id; users without a batch are skipped
+    assert user_ids == [f"stu_{i:02d}" for i in range(30) if i % 4 == 2] + \
+        [f"stu_{i:02d}" for i in range(30) if i % 4 == 1 and i != 5]
+
+    plan = store._connection().execute(
+        "EXPLAIN QUERY PLAN SELECT user_id FROM users WHERE batch_id IS NOT NULL "
+        "AND (last_event_attended, user_id) > (?, ?) AND last_event_attended <= ? "
+        "ORDER BY last_event_attended, user_id LIMIT 4", ("2025-03-08", "", "2025-03-09")).fetchall()
+    assert "users_last_event" in plan[0]["detail"]
+    store.close()
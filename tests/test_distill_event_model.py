@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from distill_event_model import FEATURES, DistilledEventModel
+from finite_domain import feature_domain
+from model_compiler import CompiledForest
+from nudge_engine import load_model
+
+ml_root = Path(project_root) / "model" / "ml_model"
+fomo_values = feature_domain({"min": 0, "max": 100, "divisor": 100})
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture(scope="module")
+def forest():
+    train = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    return RandomForestClassifier(n_estimators=20, random_state=42).fit(train[FEATURES], train["should_nudge_event"])
+
+@pytest.fixture(scope="module")
+def distilled(forest):
+    return DistilledEventModel.distill(forest, fomo_values)
+
+def test_matches_forest_on_every_served_input(forest, distilled):
+    karma, fomo = np.meshgrid(np.arange(0, 801), fomo_values, indexing="ij")
+    X = pd.DataFrame({"karma": karma.ravel(), "event_fomo_score": fomo.ravel()})
+
+    np.testing.assert_array_equal(distilled.predict(X), forest.predict(X))
+    assert distilled.table.shape[0] < 801
+
+def test_matches_forest_around_karma_thresholds(forest, distilled):
+    thresholds = np.concatenate([
+        tree.tree_.threshold[tree.tree_.feature == 0] for tree in forest.estimators_
+    ])
+    karma = np.concatenate([thresholds, np.nextafter(thresholds, np.inf), np.nextafter(thresholds, -np.inf),
+                            thresholds.astype(np.float32).astype(np.float64)])
+    X = pd.DataFrame({"karma": np.repeat(karma, 3), "event_fomo_score": np.tile([0.1, 0.5, 0.9], len(karma))})
+
+    np.testing.assert_array_equal(distilled.predict(X), forest.predict(X))
+
+def test_off_grid_fomo_snaps_to_nearest_served_value(distilled):
+    X = np.array([[300, 0.514], [300, 0.516], [300, -0.2], [300, 1.7]])
+    snapped = np.array([[300, 0.51], [300, 0.52], [300, 0.0], [300, 1.0]])
+    np.testing.assert_array_equal(distilled.predict(X), distilled.predict(snapped))
+
+def test_fast_tier_loads_the_memory_mapped_table(tmp_path, forest, distilled):
+    joblib.dump(forest, tmp_path / "event.joblib")
+    config = {
+        "models": {
+            "event_path": str(tmp_path / "event.joblib"),
+            "event_compiled_path": str(tmp_path / "event.compiled"),
+            "event_distilled_path": str(tmp_path / "event.distilled"),
+            "mmap": True,
+        },
+        "inference": {"engine": "compiled", "event_tier": "fast"},
+    }
+
+    # Without a distilled table the fast tier serves the full forest
+    assert isinstance(load_model(config, "event"), CompiledForest)
+
+    distilled.save(str(tmp_path / "event.distilled"))
+    model = load_model(config, "event")
+    assert isinstance(model, DistilledEventModel)
+    assert isinstance(model.table, np.memmap)
+    X = np.array([[120, 0.35], [480, 0.91]])
+    np.testing.assert_array_equal(model.predict(X), forest.predict(pd.DataFrame(X, columns=FEATURES)))
+
+    config["inference"]["event_tier"] = "full"
+    assert isinstance(load_model(config, "event"), CompiledForest)
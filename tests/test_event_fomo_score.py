@@ -0,0 +1,50 @@
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from event_fomo_score import (
+    build_event_fomo_columns,
+    calculate_event_fomo_score,
+    calculate_event_fomo_scores,
+)
+
+event_pool = ["startup-meetup", "coding-contest", "tech-talk", "hackathon"]
+
+def simulate_entry(rng):
+    events = rng.sample(event_pool, k=rng.randint(0, len(event_pool)))
+    last_event = date.today() - timedelta(days=rng.randint(-3, 200))
+    return {
+        "profile": {"buddy_count": rng.randint(0, 6)},
+        "activity": {"last_event_attended": last_event.strftime("%Y-%m-%d")},
+        "peer_snapshot": {
+            "batch_event_attendance": {event: rng.randint(0, 15) for event in events},
+            "buddies_attending_events": rng.sample(event_pool, k=rng.randint(0, len(event_pool))),
+        },
+    }
+
+def test_vectorized_matches_scalar():
+    rng = random.Random(42)
+    entries = [simulate_entry(rng) for _ in range(20000)]
+    peer_snapshots = [entry["peer_snapshot"] for entry in entries]
+
+    expected = [calculate_event_fomo_score(entry, entry["peer_snapshot"]) for entry in entries]
+    scores = calculate_event_fomo_scores(*build_event_fomo_columns(entries, peer_snapshots))
+
+    assert scores.tolist() == expected
+
+def test_vectorized_respects_reference_date():
+    scores = calculate_event_fomo_scores(
+        buddy_counts=[0, 4],
+        buddies_attending=[3, 2],
+        batch_event_attendance=[[5, 11, 4], [10, np.nan, np.nan]],
+        last_event_attended=["2024-01-01", "2024-03-01"],
+        today=date(2024, 3, 31),
+    )
+    assert scores.tolist() == [0.49, 0.62]
@@ -0,0 +1,95 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+import simulate_data
+from fast_path import LineError, decode_record
+from nudge_engine import FeatureRecord
+from schemas import UserInput
+from snapshot_registry import compute_batch_aggregates
+from test_main import make_user, mock_event_model, mock_resume_model
+
+client = TestClient(main.app)
+
+def post_jsonl(documents):
+    body = "".join(json.dumps(document) + "\n" for document in documents)
+    response = client.post(
+        "/analyze-engagement/jsonl", data=body, headers={"content-type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+def test_decode_record_matches_pydantic_decoding():
+    random.seed(5)
+    for user in simulate_data.iter_users(50):
+        userInput = UserInput(**user)
+        expected = FeatureRecord.from_input(userInput, userInput.peer_snapshot, compute_batch_aggregates(userInput.peer_snapshot))
+        assert decode_record(orjson.loads(json.dumps(user)), main.resolve_batch_snapshot).key() == expected.key()
+
+def test_decode_record_truncates_floats_in_int_fields_like_pydantic():
+    user = make_user("stu_1")
+    user["profile"].update(karma=386.7, projects_added=3.0, buddy_count=2.5)
+    user["peer_snapshot"].update(batch_resume_uploaded_pct=80.9)
+    user["peer_snapshot"]["batch_event_attendance"]["tech-talk"] = 4.6
+    userInput = UserInput(**user)
+    expected = FeatureRecord.from_input(userInput, userInput.peer_snapshot, compute_batch_aggregates(userInput.peer_snapshot))
+    record = decode_record(user, main.resolve_batch_snapshot)
+    assert record.key() == expected.key()
+    assert (record.karma, record.projects_added, record.buddy_count) == (386, 3, 2)
+    assert type(record.karma) is int and record.batch_resume_uploaded_pct == 80
+
+@pytest.mark.parametrize("change, message", [
+    (lambda user: user["profile"].pop("karma"), "profile.karma is required"),
+    (lambda user: user["profile"].update(karma="386"), "profile.karma has the wrong type"),
+    (lambda user: user["profile"].update(resume_uploaded=1), "profile.resume_uploaded has the wrong type"),
+    (lambda user: user["activity"].update(last_event_attended="01/02/2024"), "YYYY-MM-DD"),
+    (lambda user: user.pop("peer_snapshot"), "either peer_snapshot or batch_id is required"),
+])
+def test_decode_record_rejects_what_scoring_cannot_use(change, message):
+    user = make_user("stu_1")
+    change(user)
+    with pytest.raises(LineError, match=message):
+        decode_record(user, main.resolve_batch_snapshot)
+
+def test_jsonl_matches_batch_endpoint():
+    mock_resume_model.predict.side_effect = lambda X: [index % 2 for index in range(len(X))]
+    mock_event_model.predict.side_effect = lambda X: [1] * len(X)
+    try:
+        random.seed(6)
+        users = list(simulate_data.iter_users(40))
+        expected = client.post("/analyze-engagement/batch", json={"users": users}).json()["results"]
+        assert post_jsonl(users) == expected
+    finally:
+        mock_resume_model.predict.side_effect = None
+        mock_event_model.predict.side_effect = None
+
+def test_jsonl_reports_bad_lines_in_place():
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [0]
+    unknown_batch = make_user("stu_2")
+    del unknown_batch["peer_snapshot"]
+    unknown_batch["batch_id"] = "missing-batch"
+
+    body = (
+        json.dumps(make_user("stu_1")) + "\n"
+        + "{not json\n"
+        + "\n"
+        + json.dumps(unknown_batch) + "\n"
+    )
+    response = client.post("/analyze-engagement/jsonl", data=body)
+    lines = [orjson.loads(line) for line in response.content.splitlines()]
+
+    assert [line.get("user_id") for line in lines] == ["stu_1", None, None]
+    assert lines[1]["status"] == "error" and lines[1]["line"] == 1
+    assert lines[2] == {"line": 2, "status": "error", "detail": "Unknown batch_id: missing-batch"}
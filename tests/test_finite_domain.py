@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from finite_domain import FiniteDomainModel, enumerate_domain, feature_domain
+
+resume_domains = {
+    "resume_uploaded": [0, 1],
+    "batch_resume_uploaded_pct": {"min": 0, "max": 100, "divisor": 100},
+}
+
+# Module scoped so the CSV is read before conftest patches builtins.open
+@pytest.fixture(scope="module")
+def resume_model():
+    train = pd.read_csv(Path(project_root) / "model" / "ml_model" / "train_dataset" / "resume_dataset.csv")
+    X = pd.DataFrame({
+        "resume_uploaded": train["resume_uploaded"],
+        "batch_resume_uploaded_pct": train["batch_resume_uploaded_pct"] / 100,
+    })
+    return RandomForestClassifier(n_estimators=20, random_state=42).fit(X, train["should_nudge_resume"])
+
+def serving_rows(pcts, resume_uploaded=0):
+    return pd.DataFrame(
+        [[resume_uploaded, pct / 100] for pct in pcts],
+        columns=["resume_uploaded", "batch_resume_uploaded_pct"],
+    )
+
+def test_feature_domain_specs():
+    assert feature_domain(None) is None
+    assert feature_domain([1, 0, 1]).tolist() == [0.0, 1.0]
+    assert len(feature_domain({"min": 0, "max": 100, "divisor": 100})) == 101
+
+def test_lookup_matches_model_over_whole_domain(resume_model):
+    table_model = enumerate_domain(resume_model, resume_domains, max_table_size=1000)
+    assert isinstance(table_model, FiniteDomainModel)
+    assert table_model.table.shape == (202,)
+
+    for resume_uploaded in (0, 1):
+        X = serving_rows(range(101), resume_uploaded)
+        np.testing.assert_array_equal(table_model.predict(X), resume_model.predict(X))
+
+def test_lookup_falls_back_outside_domain(resume_model):
+    table_model = enumerate_domain(resume_model, resume_domains, max_table_size=1000)
+    X = serving_rows([50, 80.5, 120, 95])
+    np.testing.assert_array_equal(table_model.predict(X), resume_model.predict(X))
+
+def test_unbounded_or_large_domains_keep_model(resume_model):
+    unbounded = {"resume_uploaded": [0, 1], "batch_resume_uploaded_pct": None}
+    assert enumerate_domain(resume_model, unbounded, max_table_size=1000) is resume_model
+    assert enumerate_domain(resume_model, resume_domains, max_table_size=100) is resume_model
+    assert enumerate_domain(None, resume_domains, max_table_size=1000) is None
@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+from inference_batcher import MicroBatcher
+from test_main import make_user
+
+executor = ThreadPoolExecutor(max_workers=2)
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    def predict_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(predict_batch, executor, max_batch_size=100, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert results == [i * 10 for i in range(10)]
+    assert calls == [list(range(10))]
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_batch_size():
+    calls = []
+
+    def predict_batch(items):
+        calls.append(len(items))
+        return items
+
+    batcher = MicroBatcher(predict_batch, executor, max_batch_size=4, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    assert results == list(range(10))
+    assert calls == [4, 4, 2]
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    def predict_batch(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(predict_batch, executor, max_batch_size=8, max_wait_ms=1)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_missing_results_fail_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], executor, max_batch_size=8, max_wait_ms=1)
+    submits = asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+    results = await asyncio.wait_for(submits, timeout=5)
+    assert all(isinstance(result, RuntimeError) and "2 results for 3 items" in str(result) for result in results)
+
+class SlowModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.batch_sizes = []
+        self.threads = set()
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return [0] * len(X)
+
+@pytest.mark.asyncio
+async def test_inference_does_not_block_event_loop(monkeypatch):
+    resume_model, event_model = SlowModel(0.3), SlowModel(0)
+    serving = main.registry.current._replace(resume_model=resume_model, event_model=event_model)
+    monkeypatch.setattr(main.registry, "current", serving)
+
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        analyze = [
+            asyncio.ensure_future(client.post("/analyze-engagement", json=make_user(f"stu_{i}")))
+            for i in range(8)
+        ]
+        await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        health = await client.get("/health")
+        assert health.status_code == 200
+        assert time.perf_counter() - started < 0.2
+
+        responses = await asyncio.gather(*analyze)
+
+    assert [r.json()["user_id"] for r in responses] == [f"stu_{i}" for i in range(8)]
+    assert sum(resume_model.batch_sizes) == 8
+    assert len(resume_model.batch_sizes) < 8
+    assert threading.get_ident() not in resume_model.threads
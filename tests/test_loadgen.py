@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root and benchmarks directories to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+sys.path.insert(0, str(Path(project_root) / "benchmarks"))
+
+from loadgen import cache_hit_rate, parse_ramp, saturation, summarize_stage
+
+def stage(qps, achieved_qps, p99_ms, error_rate=0.0, sent=100):
+    return {"target_qps": qps, "achieved_qps": achieved_qps, "p99_ms": p99_ms, "error_rate": error_rate, "sent": sent}
+
+def test_parse_ramp():
+    assert parse_ramp("50:10,100:5.5") == [(50.0, 10.0), (100.0, 5.5)]
+    with pytest.raises(ValueError):
+        parse_ramp("50")
+
+def test_summarize_stage():
+    samples = [(0.001 * (i + 1), 0.0, 200) for i in range(98)] + [(2.0, 0.001, 503), (3.0, 0.002, "timeout")]
+    summary = summarize_stage(50, 2, samples, elapsed=2.5, max_in_flight=7)
+
+    assert summary["sent"] == 100 and summary["achieved_qps"] == 40.0
+    assert summary["error_rate"] == 0.02
+    assert summary["statuses"] == {"200": 98, "503": 1, "timeout": 1}
+    assert summary["p50_ms"] == pytest.approx(50.5) and summary["max_ms"] == 3000.0
+    assert summary["send_lag_p99_ms"] == pytest.approx(1.01)
+    assert summary["histogram_ms"]["<=1"] == 1 and summary["histogram_ms"]["<=5000"] == 1
+    assert sum(summary["histogram_ms"].values()) == 100
+
+def test_summarize_stage_without_samples():
+    # qps * seconds < 1 sends nothing
+    summary = summarize_stage(0.5, 1, [], elapsed=0.0, max_in_flight=0)
+    assert summary["sent"] == 0 and summary["achieved_qps"] == 0.0 and summary["error_rate"] == 0.0
+    assert summary["p50_ms"] is None and summary["p99_ms"] is None and summary["max_ms"] is None
+
+def test_saturation_is_the_first_unhealthy_stage():
+    stages = [stage(50, 50, 20), stage(100, 99, 40), stage(200, 150, 80), stage(400, 160, 900, error_rate=0.2)]
+    assert saturation(stages, slo_ms=100, max_error_rate=0.01) == {
+        "saturated_at_qps": 200, "reasons": ["throughput"], "last_healthy_qps": 100}
+    assert saturation(stages[:2], slo_ms=100, max_error_rate=0.01)["saturated_at_qps"] is None
+    assert saturation(stages, slo_ms=30, max_error_rate=0.01) == {
+        "saturated_at_qps": 100, "reasons": ["p99"], "last_healthy_qps": 50}
+    assert saturation(stages[3:], slo_ms=1000, max_error_rate=0.01)["reasons"] == ["throughput", "errors"]
+    # A stage that sent nothing is skipped
+    assert saturation([stage(0.5, 0.0, None, sent=0), stage(50, 50, 20)], 100, 0.01)["last_healthy_qps"] == 50
+
+def test_cache_hit_rate():
+    assert cache_hit_rate({"hit": 10, "miss": 5}, {"hit": 40, "miss": 15}) == 0.75
+    assert cache_hit_rate({}, {}) is None
+    assert cache_hit_rate(None, {"hit": 1}) is None
@@ -15,8 +15,11 @@ mock_event_model = MagicMock()
 mock_event_model.predict.return_value = [1]  # Always predict 1 for testing
 
 # Import app after setting up mocks
+import main
 from main import app
 
+main.registry.publish(resume_model=mock_resume_model, event_model=mock_event_model)
+
 client = TestClient(app)
 
 def test_health_endpoint():
@@ -24,6 +27,11 @@ def test_health_endpoint():
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
+def test_ready_endpoint(monkeypatch):
+    assert client.get("/ready").json() == {"status": "ready"}
+    monkeypatch.setattr(main.registry, "current", main.registry.current._replace(event_model=None))
+    assert client.get("/ready").status_code == 503
+
 def test_version_endpoint():
     response = client.get("/version")
     assert response.status_code == 200
@@ -245,3 +253,171 @@ def test_no_nudges():
     data = response.json()
     assert data["user_id"] == "stu_7023"
     assert len(data["nudges"]) == 0  # No nudges for highly engaged user
+
+def make_user(user_id, resume_uploaded=False, last_event_attended="2024-01-01"):
+    return {
+        "user_id": user_id,
+        "profile": {
+            "resume_uploaded": resume_uploaded,
+            "goal_tags": ["UI/UX", "AI"],
+            "karma": 386,
+            "projects_added": 0,
+            "quiz_history": ["sql"],
+            "clubs_joined": [],
+            "buddy_count": 0
+        },
+        "activity": {
+            "login_streak": 1,
+            "posts_created": 0,
+            "buddies_interacted": 3,
+            "last_event_attended": last_event_attended
+        },
+        "peer_snapshot": {
+            "batch_avg_projects": 3,
+            "batch_resume_uploaded_pct": 81,
+            "batch_event_attendance": {
+                "startup-meetup": 5,
+                "coding-contest": 11,
+                "tech-talk": 4
+            },
+            "buddies_attending_events": ["tech-talk"]
+        }
+    }
+
+def test_batch_nudges_preserve_input_order():
+    users = [
+        make_user("stu_1"),
+        make_user("stu_2", resume_uploaded=True, last_event_attended=date.today().strftime("%Y-%m-%d")),
+        make_user("stu_3"),
+    ]
+
+    mock_resume_model.predict.reset_mock()
+    mock_event_model.predict.reset_mock()
+    mock_resume_model.predict.return_value = [1, 0, 0]
+    mock_event_model.predict.return_value = [0, 0, 1]
+
+    response = client.post("/analyze-engagement/batch", json={"users": users})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert [r["user_id"] for r in data["results"]] == ["stu_1", "stu_2", "stu_3"]
+
+    # Each model is called once with the whole stacked feature matrix
+    assert mock_resume_model.predict.call_count == 1
+    assert mock_event_model.predict.call_count == 1
+    assert len(mock_resume_model.predict.call_args[0][0]) == 3
+    assert len(mock_event_model.predict.call_args[0][0]) == 3
+
+    types = [{n["type"] for n in r["nudges"]} for r in data["results"]]
+    assert types[0] == {"profile", "quiz"}
+    assert types[1] == set()
+    assert types[2] == {"event", "quiz"}
+
+def test_batch_matches_single_user_path():
+    user = make_user("stu_9")
+    mock_resume_model.predict.return_value = [1]
+    mock_event_model.predict.return_value = [1]
+
+    single = client.post("/analyze-engagement", json=user).json()
+    batch = client.post("/analyze-engagement/batch", json={"users": [user]}).json()
+    assert batch["results"] == [single]
+
+def test_batch_empty():
+    response = client.post("/analyze-engagement/batch", json={"users": []})
+    assert response.status_code == 200
+    assert response.json() == {"results": [], "count": 0}
+
+def test_peer_snapshot_registry_by_batch_id():
+    inline = make_user("stu_10")
+    snapshot = inline["peer_snapshot"]
+
+    response = client.put("/peer-snapshots/cse-2025", json=snapshot)
+    assert response.status_code == 200
+    first_version = response.json()["version"]
+
+    by_reference = {k: v for k, v in inline.items() if k != "peer_snapshot"}
+    by_reference["batch_id"] = "cse-2025"
+
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [0]
+    expected = client.post("/analyze-engagement", json=inline).json()
+    assert client.post("/analyze-engagement", json=by_reference).json() == expected
+
+    batch = client.post("/analyze-engagement/batch", json={"users": [by_reference]}).json()
+    assert batch["results"] == [expected]
+
+    # A new snapshot version replaces the cached aggregates
+    snapshot["batch_resume_uploaded_pct"] = 95
+    response = client.put("/peer-snapshots/cse-2025", json=snapshot)
+    assert response.json()["version"] > first_version
+    stored = client.get("/peer-snapshots/cse-2025").json()
+    assert stored["peer_snapshot"]["batch_resume_uploaded_pct"] == 95
+
+    mock_resume_model.predict.return_value = [1]
+    data = client.post("/analyze-engagement", json=by_reference).json()
+    resume_nudge = next(n for n in data["nudges"] if n["type"] == "profile")
+    assert resume_nudge["title"].startswith("95%")
+
+def test_unknown_batch_id():
+    user = make_user("stu_11")
+    del user["peer_snapshot"]
+    user["batch_id"] = "missing-batch"
+    response = client.post("/analyze-engagement", json=user)
+    assert response.status_code == 404
+    assert client.get("/peer-snapshots/missing-batch").status_code == 404
+
+def test_peer_snapshot_or_batch_id_required():
+    user = make_user("stu_12")
+    del user["peer_snapshot"]
+    response = client.post("/analyze-engagement", json=user)
+    assert response.status_code == 422
+
+def test_metrics_endpoint():
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [0]
+    client.post("/analyze-engagement", json=make_user("stu_13"))
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE engagement_stage_seconds histogram" in body
+    for stage in ("request_parsing", "fomo_score", "dataframe_construction", "resume_predict", "event_predict", "nudge_assembly"):
+        assert f'engagement_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'engagement_requests_total{route="/analyze-engagement",status="200"}' in body
+
+def test_response_cache_skips_scoring_for_repeat_requests():
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [0]
+    user = make_user("stu_14")
+    hits = main.response_cache_lookups.value(result="hit")
+
+    first = client.post("/analyze-engagement", json=user).json()
+    calls = mock_resume_model.predict.call_count
+    assert client.post("/analyze-engagement", json=user).json() == first
+    assert mock_resume_model.predict.call_count == calls
+    assert main.response_cache_lookups.value(result="hit") == hits + 1
+
+    # Any input change is a different key
+    user["profile"]["karma"] += 1
+    client.post("/analyze-engagement", json=user)
+    assert mock_resume_model.predict.call_count == calls + 1
+
+def test_response_cache_invalidated_by_new_snapshot_and_registry_version():
+    user = make_user("stu_15")
+    snapshot = user.pop("peer_snapshot")
+    user["batch_id"] = "cse-2026"
+    client.put("/peer-snapshots/cse-2026", json=snapshot)
+    mock_resume_model.predict.return_value = [1]
+    mock_event_model.predict.return_value = [0]
+    client.post("/analyze-engagement", json=user)
+
+    snapshot["batch_resume_uploaded_pct"] = 60
+    client.put("/peer-snapshots/cse-2026", json=snapshot)
+    data = client.post("/analyze-engagement", json=user).json()
+    assert data["nudges"][0]["title"].startswith("60%")
+
+    main.registry.publish()
+    calls = mock_resume_model.predict.call_count
+    client.post("/analyze-engagement", json=user)
+    assert mock_resume_model.predict.call_count == calls + 1
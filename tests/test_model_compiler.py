@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from model_compiler import CompiledForest, compile_forest
+
+ml_root = Path(project_root) / "model" / "ml_model"
+
+pytestmark = pytest.mark.real_files
+
+# Module scoped so each forest is fitted once
+@pytest.fixture(scope="module")
+def resume_data():
+    train = pd.read_csv(ml_root / "new_datasets" / "balanced_resume_dataset_realistic_noisy.csv")
+    test = pd.read_csv(ml_root / "test_dataset" / "test_resume_dataset.csv")
+    features = ['resume_uploaded', 'batch_resume_uploaded_pct']
+    model = RandomForestClassifier(n_estimators=50, random_state=42)
+    model.fit(train[features], train['should_nudge_resume'])
+    return model, test[features]
+
+@pytest.fixture(scope="module")
+def event_data():
+    train = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    test = pd.read_csv(ml_root / "test_dataset" / "test_event_dataset.csv")
+    features = ['karma', 'event_fomo_score']
+    model = RandomForestClassifier(n_estimators=50, random_state=42)
+    model.fit(train[features], train['should_nudge_event'])
+    return model, test[features]
+
+def assert_parity(model, X_test):
+    compiled = compile_forest(model)
+
+    assert isinstance(compiled, CompiledForest)
+    np.testing.assert_array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+    np.testing.assert_array_equal(compiled.predict(X_test.to_numpy()), model.predict(X_test))
+
+def test_compiled_resume_forest_matches_sklearn(resume_data):
+    assert_parity(*resume_data)
+
+def test_compiled_event_forest_matches_sklearn(event_data):
+    assert_parity(*event_data)
+
+def test_compiled_forest_single_row(event_data):
+    model, X_test = event_data
+    compiled = compile_forest(model)
+    row = X_test.iloc[[0]]
+    assert compiled.predict(row)[0] == model.predict(row)[0]
+
+def test_compile_forest_is_idempotent(event_data):
+    compiled = compile_forest(event_data[0])
+    assert compile_forest(compiled) is compiled
+    assert compile_forest(None) is None
+
+def test_compiled_forest_save_and_mmap_load(event_data, tmp_path):
+    model, X_test = event_data
+    compile_forest(model).save(tmp_path / "event.compiled")
+    loaded = CompiledForest.load(tmp_path / "event.compiled", mmap_mode="r")
+
+    assert isinstance(loaded.leaf_proba, np.memmap)
+    np.testing.assert_array_equal(loaded.predict_proba(X_test), model.predict_proba(X_test))
+    np.testing.assert_array_equal(loaded.predict(X_test.to_numpy()), model.predict(X_test))
@@ -0,0 +1,71 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import joblib
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+import simulate_data
+from offline_nudges import generate_offline_nudges
+
+ml_root = Path(project_root) / "model" / "ml_model"
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture(scope="module")
+def models():
+    resume = pd.read_csv(ml_root / "train_dataset" / "resume_dataset.csv")
+    event = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    resume_model = RandomForestClassifier(n_estimators=10, random_state=42).fit(
+        resume[['resume_uploaded', 'batch_resume_uploaded_pct']], resume['should_nudge_resume'])
+    event_model = RandomForestClassifier(n_estimators=10, random_state=42).fit(
+        event[['karma', 'event_fomo_score']], event['should_nudge_event'])
+    return resume_model, event_model
+
+@pytest.fixture
+def config_path(tmp_path, models):
+    resume_model, event_model = models
+    joblib.dump(resume_model, tmp_path / "resume.joblib")
+    joblib.dump(event_model, tmp_path / "event.joblib")
+    config = dict(main.config)
+    config["models"] = dict(
+        config["models"], resume_path=str(tmp_path / "resume.joblib"), event_path=str(tmp_path / "event.joblib")
+    )
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    return path
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_offline_nudges_match_api(tmp_path, config_path, models, monkeypatch, workers):
+    random.seed(3)
+    users = list(simulate_data.iter_users(300))
+    users[5]["profile"]["karma"] = "not a number"
+    # Past the first chunk, so the reported line has to count the earlier chunks
+    users[200]["activity"]["last_event_attended"] = None
+    input_path = tmp_path / "users.jsonl"
+    input_path.write_text("".join(json.dumps(user) + "\n" for user in users))
+    output_path = tmp_path / "nudges.jsonl"
+
+    written = generate_offline_nudges(str(input_path), str(output_path), str(config_path), chunk_size=64, workers=workers)
+    assert written == 300
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert results[5]["status"] == "error" and results[5]["line"] == 5
+    assert results[200]["status"] == "error" and results[200]["line"] == 200
+
+    serving = main.registry.current._replace(resume_model=models[0], event_model=models[1])
+    monkeypatch.setattr(main.registry, "current", serving)
+    client = TestClient(main.app)
+    for user, result in zip(users[:40], results[:40]):
+        if result["status"] == "error":
+            continue
+        assert client.post("/analyze-engagement", json=user).json() == result
@@ -0,0 +1,79 @@
+import json
+import sys
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from population import PopulationSpec, write_population
+from process_profiles import process_profiles
+from schemas import UserInput
+from simulate_data import clubs_pool, event_pool, goal_tags_pool, quiz_pool
+
+pytestmark = pytest.mark.real_files
+
+def read_users(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_users_are_valid_and_processed_table_matches_process_profiles(tmp_path):
+    # process_profiles measures days from date.today(), so generate against it
+    spec = PopulationSpec(users=1000, seed=3, chunk_size=256, today=date.today())
+    write_population(spec, str(tmp_path / "users.jsonl"), str(tmp_path / "processed.csv"))
+
+    users = read_users(tmp_path / "users.jsonl")
+    assert [user["user_id"] for user in users[:2]] == ["stu_7023", "stu_7024"] and len(users) == 1000
+    for user in users:
+        UserInput.parse_obj(user)
+        profile, snapshot = user["profile"], user["peer_snapshot"]
+        assert len(set(profile["goal_tags"])) == 2 and set(profile["goal_tags"]) <= set(goal_tags_pool)
+        assert len(set(profile["quiz_history"])) == len(profile["quiz_history"]) <= 3
+        assert set(profile["quiz_history"]) <= set(quiz_pool) and set(profile["clubs_joined"]) <= set(clubs_pool)
+        assert 50 <= profile["karma"] <= 500 and 60 <= snapshot["batch_resume_uploaded_pct"] <= 95
+        assert list(snapshot["batch_event_attendance"]) == event_pool
+        assert 1 <= len(set(snapshot["buddies_attending_events"])) == len(snapshot["buddies_attending_events"])
+
+    process_profiles(str(tmp_path / "users.jsonl"), str(tmp_path / "reprocessed.csv"))
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "processed.csv"), pd.read_csv(tmp_path / "reprocessed.csv"))
+
+def test_same_spec_gives_same_population(tmp_path):
+    spec = PopulationSpec(users=500, seed=11, chunk_size=128, today=date(2025, 1, 31))
+    write_population(spec, str(tmp_path / "a.jsonl"))
+    write_population(spec, str(tmp_path / "b.jsonl"), workers=2)
+    write_population(spec._replace(seed=12), str(tmp_path / "c.jsonl"))
+
+    assert (tmp_path / "a.jsonl").read_bytes() == (tmp_path / "b.jsonl").read_bytes()
+    assert (tmp_path / "a.jsonl").read_bytes() != (tmp_path / "c.jsonl").read_bytes()
+
+def test_users_of_a_batch_share_peer_statistics(tmp_path):
+    spec = PopulationSpec(users=600, seed=5, chunk_size=200, batches=4, today=date(2025, 1, 31))
+    write_population(spec, str(tmp_path / "users.jsonl"))
+
+    snapshots = defaultdict(set)
+    for user in read_users(tmp_path / "users.jsonl"):
+        snapshot = user["peer_snapshot"]
+        snapshots[user["batch_id"]].add(
+            (snapshot["batch_avg_projects"], snapshot["batch_resume_uploaded_pct"],
+             tuple(snapshot["batch_event_attendance"].values())))
+    assert len(snapshots) == 4
+    assert all(len(stats) == 1 for stats in snapshots.values())
+
+def test_parquet_output_has_the_same_users(tmp_path):
+    pytest.importorskip("pyarrow")
+    spec = PopulationSpec(users=300, seed=1, chunk_size=128, today=date(2025, 1, 31))
+    write_population(spec, str(tmp_path / "users.jsonl"))
+    write_population(spec, str(tmp_path / "users.parquet"))
+
+    users = read_users(tmp_path / "users.jsonl")
+    table = pd.read_parquet(tmp_path / "users.parquet")
+    assert len(table) == 300
+    row = table.iloc[42]
+    assert row["user_id"] == users[42]["user_id"]
+    assert list(row["quiz_history"]) == users[42]["profile"]["quiz_history"]
+    assert str(row["last_event_attended"]) == users[42]["activity"]["last_event_attended"]
+    assert row["batch_event_attendance"] == users[42]["peer_snapshot"]["batch_event_attendance"]
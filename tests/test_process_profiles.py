@@ -0,0 +1,66 @@
+import json
+import random
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import simulate_data
+from event_fomo_score import calculate_event_fomo_score
+from process_profiles import OUTPUT_COLUMNS, process_profiles
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture
+def profiles_path(tmp_path):
+    random.seed(7)
+    users = list(simulate_data.iter_users(1000))
+    users[10]["activity"]["last_event_attended"] = None
+    del users[20]["peer_snapshot"]
+    path = tmp_path / "profiles.jsonl"
+    path.write_text("".join(json.dumps(user) + "\n" for user in users))
+    return path, users
+
+def expected_rows(users):
+    rows = []
+    for entry in users:
+        peer_snapshot = entry.get("peer_snapshot", {})
+        try:
+            fomo_score = calculate_event_fomo_score(entry, peer_snapshot)
+        except Exception:
+            continue
+        resume_uploaded = entry["profile"]["resume_uploaded"]
+        rows.append({
+            "resume_uploaded": int(resume_uploaded),
+            "karma": entry["profile"]["karma"],
+            "batch_resume_uploaded_pct": peer_snapshot["batch_resume_uploaded_pct"],
+            "event_fomo_score": fomo_score,
+            "should_nudge_resume": int(not resume_uploaded and peer_snapshot["batch_resume_uploaded_pct"] > 80),
+            "should_nudge_event": int(fomo_score >= 0.5),
+        })
+    return pd.DataFrame(rows, columns=OUTPUT_COLUMNS)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streaming_csv_matches_row_by_row(profiles_path, tmp_path, workers):
+    path, users = profiles_path
+    output = tmp_path / "processed.csv"
+
+    rows = process_profiles(str(path), str(output), chunk_size=64, workers=workers)
+
+    expected = expected_rows(users)
+    assert rows == len(expected) == 998
+    pd.testing.assert_frame_equal(pd.read_csv(output), expected)
+
+def test_streaming_parquet(profiles_path, tmp_path):
+    pytest.importorskip("pyarrow")
+    path, users = profiles_path
+    output = tmp_path / "processed.parquet"
+
+    process_profiles(str(path), str(output), chunk_size=100)
+
+    pd.testing.assert_frame_equal(pd.read_parquet(output), expected_rows(users))
@@ -0,0 +1,98 @@
+import asyncio
+import pstats
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+from profiling import RequestProfiler, parse_capture
+
+executor = ThreadPoolExecutor(max_workers=2)
+
+pytestmark = pytest.mark.real_files
+
+def decode_payload(n):
+    return sum(i * i for i in range(n))
+
+def predict_rows(n):
+    return sum(range(n))
+
+def busy_predict(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+async def serve(profiler, predict, count):
+    wrapped = profiler.wrap(predict)
+
+    async def endpoint(request):
+        decode_payload(2000)
+        return await asyncio.get_running_loop().run_in_executor(executor, wrapped, request)
+
+    handler = profiler.wrap_handler(endpoint)
+    return await asyncio.gather(*(handler(arg) for arg in count))
+
+def profiled_functions(path):
+    return {name for _, _, name in pstats.Stats(str(path)).stats}
+
+@pytest.mark.asyncio
+async def test_cprofile_capture_covers_loop_and_pool_threads_for_n_requests(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    status = profiler.start("cprofile", requests=3)
+    assert status["running"] and status["path"].endswith(".pstats")
+
+    await serve(profiler, predict_rows, [1000] * 3)
+    assert not profiler.active
+    assert profiler.last["requests"] == 3
+    assert {"decode_payload", "predict_rows"} <= profiled_functions(profiler.last["path"])
+
+    # Later requests run unprofiled and do not change the stored profile
+    await serve(profiler, predict_rows, [1000] * 2)
+    assert profiler.last["requests"] == 3
+
+@pytest.mark.asyncio
+async def test_sampling_capture_writes_collapsed_stacks_after_seconds(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), interval_ms=1)
+    profiler.start("sample", seconds=0.3)
+
+    await serve(profiler, busy_predict, [0.4])
+    for _ in range(100):
+        if not profiler.active:
+            break
+        await asyncio.sleep(0.01)
+    assert profiler.last["samples"] > 10
+
+    lines = Path(profiler.last["path"]).read_text().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert stack.startswith("inference") or "busy_predict" in stack
+    assert any("test_profiling.py:busy_predict" in line for line in lines) and int(count) > 0
+
+def test_invalid_and_overlapping_captures_are_rejected(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    with pytest.raises(ValueError):
+        profiler.start("perf", requests=10)
+    with pytest.raises(ValueError):
+        profiler.start("cprofile")
+    profiler.start("cprofile", seconds=0.05)
+    with pytest.raises(RuntimeError):
+        profiler.start("sample", requests=5)
+    time.sleep(0.2)
+    # A timed capture with no traffic still ends, with nothing to write
+    assert not profiler.active and profiler.last["requests"] == 0 and profiler.last["path"] is None
+
+    assert parse_capture("sample:seconds=30,interval_ms=2") == {"mode": "sample", "seconds": 30.0, "interval_ms": 2.0}
+    assert parse_capture("cprofile:requests=200") == {"mode": "cprofile", "requests": 200}
+
+def test_profiling_is_not_installed_by_default():
+    assert main.profiler is None
+    client = TestClient(main.app)
+    assert client.post("/admin/profile", params={"requests": 10}).status_code == 404
+    assert client.get("/admin/profile").status_code == 404
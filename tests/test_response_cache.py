@@ -0,0 +1,69 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import response_cache
+from response_cache import LocalCacheBackend, make_cache_backend, response_cache_key
+from nudge_engine import FeatureRecord
+from schemas import UserInput
+from snapshot_registry import compute_batch_aggregates
+from test_main import make_user
+
+def test_local_backend_evicts_least_recently_used():
+    cache = LocalCacheBackend(max_entries=2, ttl_s=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(cache) == 2
+
+def test_local_backend_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache, "monotonic", lambda: now[0])
+    cache = LocalCacheBackend(max_entries=10, ttl_s=5)
+    cache.set("a", 1)
+
+    now[0] = 104.9
+    assert cache.get("a") == 1
+    now[0] = 105.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def record_for(user):
+    userInput = UserInput(**user)
+    return FeatureRecord.from_input(userInput, userInput.peer_snapshot, compute_batch_aggregates(userInput.peer_snapshot))
+
+def test_key_covers_inputs_dates_and_versions():
+    day = date(2025, 1, 1)
+    record = record_for(make_user("stu_1"))
+    key = response_cache_key(record, 1, day, day)
+
+    assert key == response_cache_key(record_for(make_user("stu_1")), 1, day, day)
+    assert key != response_cache_key(record_for(make_user("stu_2")), 1, day, day)
+    assert key != response_cache_key(record, 2, day, day)
+    assert key != response_cache_key(record, 1, date(2025, 1, 2), day)
+    assert key != response_cache_key(record, 1, day, date(2025, 1, 2))
+
+    changed = make_user("stu_1")
+    changed["peer_snapshot"]["batch_event_attendance"]["tech-talk"] += 1
+    assert key != response_cache_key(record_for(changed), 1, day, day)
+    # Fields no nudge depends on do not split the cache
+    unused = make_user("stu_1")
+    unused["profile"]["goal_tags"] = ["Backend"]
+    assert key == response_cache_key(record_for(unused), 1, day, day)
+
+def test_make_cache_backend():
+    settings = {"enabled": True, "backend": "local", "max_entries": 5, "ttl_s": 1, "redis_url": None}
+    assert isinstance(make_cache_backend(settings), LocalCacheBackend)
+    assert make_cache_backend(dict(settings, enabled=False)) is None
+    with pytest.raises(ValueError):
+        make_cache_backend(dict(settings, backend="memcached"))
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import joblib
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+from response_cache import LocalCacheBackend, response_cache_key
+from serving_registry import ServingRegistry
+from test_main import make_user
+
+ml_root = Path(project_root) / "model" / "ml_model"
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture(scope="module")
+def models():
+    resume = pd.read_csv(ml_root / "train_dataset" / "resume_dataset.csv")
+    event = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    resume_model = RandomForestClassifier(n_estimators=5, random_state=42).fit(
+        resume[['resume_uploaded', 'batch_resume_uploaded_pct']], resume['should_nudge_resume'])
+    event_model = RandomForestClassifier(n_estimators=5, random_state=42).fit(
+        event[['karma', 'event_fomo_score']], event['should_nudge_event'])
+    return resume_model, event_model
+
+@pytest.fixture
+def config(tmp_path, models):
+    joblib.dump(models[0], tmp_path / "resume.joblib")
+    joblib.dump(models[1], tmp_path / "event.joblib")
+    config = json.loads(json.dumps(main.config))
+    config["models"].update(
+        resume_path=str(tmp_path / "resume.joblib"),
+        event_path=str(tmp_path / "event.joblib"),
+        resume_compiled_path=str(tmp_path / "resume.compiled"),
+        event_compiled_path=str(tmp_path / "event.compiled"),
+    )
+    write_config(tmp_path, config)
+    return config
+
+def write_config(tmp_path, config):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    # Make the change visible even on filesystems with coarse mtimes
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+@pytest.fixture
+def registry(tmp_path, config):
+    registry = ServingRegistry(str(tmp_path / "config.json"), config)
+    registry.reload()
+    yield registry
+    registry.stop()
+
+def test_rule_change_keeps_loaded_models(tmp_path, config, registry):
+    before = registry.current
+    assert registry.reload() == (before, False)
+
+    config["profile_rules"]["resume_threshold"] = 0.9
+    write_config(tmp_path, config)
+    after, reloaded = registry.reload()
+
+    assert reloaded and after.version == before.version + 1
+    assert after.rules.resume_pct_threshold == 90
+    assert after.resume_model is before.resume_model
+    # Requests holding the old snapshot still see the old thresholds
+    assert before.rules.resume_pct_threshold == 70
+
+def test_model_file_change_reloads_models(tmp_path, models, registry):
+    before = registry.current
+    joblib.dump(models[0], tmp_path / "resume.joblib")
+    stat = (tmp_path / "resume.joblib").stat()
+    os.utime(tmp_path / "resume.joblib", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    after, reloaded = registry.reload()
+    assert reloaded
+    assert after.resume_model is not before.resume_model
+    assert after.rules == before.rules
+
+def test_failed_reload_keeps_serving(tmp_path, config, registry):
+    before = registry.current
+    (tmp_path / "config.json").write_text("{not json")
+    with pytest.raises(ValueError):
+        registry.reload()
+    assert registry.current is before
+
+    write_config(tmp_path, config)
+    (tmp_path / "resume.joblib").unlink()
+    with pytest.raises(RuntimeError):
+        registry.reload(force=True)
+    assert registry.current is before
+
+def test_watcher_picks_up_changes(tmp_path, config, registry):
+    version = registry.current.version
+    registry.watch(poll_interval=0.01)
+    config["event_rules"]["buddy_attendance_trigger"] = 5
+    write_config(tmp_path, config)
+
+    deadline = time.time() + 5
+    while registry.current.version == version and time.time() < deadline:
+        time.sleep(0.01)
+    assert registry.current.rules.buddy_attendance_trigger == 5
+
+def test_admin_reload_endpoint(tmp_path, config, registry, monkeypatch):
+    monkeypatch.setattr(main, "registry", registry)
+    client = TestClient(main.app)
+    version = registry.current.version
+
+    response = client.post("/admin/reload")
+    assert response.json() == {"version": version, "reloaded": False}
+
+    response = client.post("/admin/reload", params={"force": True})
+    assert response.json() == {"version": version + 1, "reloaded": True}
+
+    (tmp_path / "config.json").write_text("{not json")
+    response = client.post("/admin/reload")
+    assert response.status_code == 500
+    assert registry.current.version == version + 1
+
+class ConstantModel:
+    def __init__(self, value):
+        self.value = value
+
+    def predict(self, X):
+        return [self.value] * len(X)
+
+def test_mixed_batch_uses_each_requests_models(registry):
+    old = registry.publish(resume_model=ConstantModel(0), event_model=ConstantModel(0))
+    new = registry.publish(resume_model=ConstantModel(1), event_model=ConstantModel(1))
+    row = (0, 0.9, 100, 0.5)
+
+    assert main.predict_batch([(old, row), (new, row), (old, row)]) == [(0, 0), (1, 1), (0, 0)]
+
+def test_shared_cache_keys_follow_model_contents_not_versions(tmp_path, config, registry):
+    # A second process: the same model contents, copied elsewhere, and its own version counter
+    replica_dir = tmp_path / "replica"
+    replica_dir.mkdir()
+    replica_config = json.loads(json.dumps(config))
+    for name in ("resume", "event"):
+        (replica_dir / f"{name}.joblib").write_bytes((tmp_path / f"{name}.joblib").read_bytes())
+        replica_config["models"][f"{name}_path"] = str(replica_dir / f"{name}.joblib")
+    write_config(replica_dir, replica_config)
+    replica = ServingRegistry(str(replica_dir / "config.json"), replica_config)
+    replica.reload(force=True)
+    replica.reload(force=True)
+    assert replica.current.version != registry.current.version
+    assert replica.current.identity == registry.current.identity
+
+    # Different models under the same version number must not share entries
+    event = pd.read_csv(ml_root / "train_dataset" / "event_dataset.csv")
+    joblib.dump(RandomForestClassifier(n_estimators=3, random_state=1).fit(
+        event[['karma', 'event_fomo_score']], event['should_nudge_event']), replica_dir / "event.joblib")
+    other = ServingRegistry(str(replica_dir / "config.json"), replica_config)
+    other.reload()
+    assert other.current.version == registry.current.version
+    assert other.current.identity != registry.current.identity
+
+    shared = LocalCacheBackend(max_entries=10, ttl_s=60)
+    record = main.decode_request(main.UserInput(**make_user("stu_1")))
+    day = date(2025, 1, 1)
+    keys = [response_cache_key(record, serving.current.identity, day, day) for serving in (registry, other)]
+    assert [shared.get(key) for key in keys] == [None, None]
+    shared.set(keys[0], {"from": "registry"})
+    assert shared.get(keys[1]) is None
+
+    # Models swapped in without files to hash get an identity of their own
+    published = other.publish(resume_model=ConstantModel(0))
+    assert published.identity not in (registry.current.identity, replica.current.identity)
+    # ...and keep it through reloads that only touch the rules
+    write_config(replica_dir, replica_config)
+    snapshot, reloaded = other.reload()
+    assert reloaded and snapshot.resume_model is published.resume_model
+    assert snapshot.identity == f"{other._instance}:{snapshot.version}"
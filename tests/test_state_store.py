@@ -0,0 +1,269 @@
+import json
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import main
+from schemas import Activity, ActivityEvent, PeerSnapshot, Profile
+from snapshot_registry import PeerSnapshotRegistry
+from state_store import UserStateStore
+from test_main import make_user, mock_event_model, mock_resume_model
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+def event(user_id, type, day, event_name=None):
+    return ActivityEvent(
+        user_id=user_id, type=type, occurred_at=datetime.combine(day, datetime.min.time()), event_name=event_name
+    )
+
+def test_events_update_counters_and_dates(store):
+    user = make_user("stu_1")
+    store.put_user("stu_1", "cse", Profile(**user["profile"]), Activity(**user["activity"]))
+    store.apply_events([
+        event("stu_1", "post", date(2024, 2, 1)),
+        event("stu_1", "post", date(2024, 2, 1)),
+        event("stu_1", "buddy_interaction", date(2024, 2, 1)),
+        event("stu_1", "resume_upload", date(2024, 2, 1)),
+        event("stu_1", "event_attendance", date(2024, 2, 3)),
+        # Late delivery must not move the date backwards
+        event("stu_1", "event_attendance", date(2024, 1, 20)),
+    ])
+
+    state = store.get_user("stu_1")
+    assert state["batch_id"] == "cse"
+    assert state["profile"]["resume_uploaded"] is True
+    assert state["profile"]["goal_tags"] == ["UI/UX", "AI"]
+    assert state["activity"] == {
+        "login_streak": 1,
+        "posts_created": 2,
+        "buddies_interacted": 4,
+        "last_event_attended": "2024-02-03",
+    }
+
+def test_login_streak(store):
+    days = [date(2024, 3, 1), date(2024, 3, 2), date(2024, 3, 2), date(2024, 3, 3), date(2024, 3, 1)]
+    store.apply_events([event("stu_2", "login", day) for day in days])
+    assert store.get_user("stu_2")["activity"]["login_streak"] == 3
+
+    store.apply_events([event("stu_2", "login", date(2024, 3, 5))])
+    assert store.get_user("stu_2")["activity"]["login_streak"] == 1
+
+def test_unknown_user(store):
+    assert store.get_user("nobody") is None
+    store.apply_events([event("stu_3", "post", date(2024, 1, 1))])
+    assert store.get_user("stu_3")["batch_id"] is None
+
+def test_analyze_from_stored_state(store, monkeypatch):
+    monkeypatch.setattr(main, "state_store", store)
+    client = TestClient(main.app)
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [1]
+
+    user = make_user("stu_4")
+    snapshot = user.pop("peer_snapshot")
+    assert client.put("/peer-snapshots/cse-state", json=snapshot).status_code == 200
+    assert client.get("/analyze-engagement/stu_4").status_code == 404
+
+    response = client.put("/users/stu_4", json={"batch_id": "cse-state", **user})
+    assert response.json() == {"user_id": "stu_4", "status": "stored"}
+    events = [
+        {"user_id": "stu_4", "type": "post"},
+        {"user_id": "stu_4", "type": "event_attendance", "occurred_at": "2024-03-01T10:00:00"},
+    ]
+    assert client.post("/events", json=events).json() == {"applied": 2}
+
+    user["batch_id"] = "cse-state"
+    user["activity"]["posts_created"] += 1
+    user["activity"]["last_event_attended"] = "2024-03-01"
+    expected = client.post("/analyze-engagement", json=user).json()
+    assert client.get("/analyze-engagement/stu_4").json() == expected
+
+    client.post("/events", json=[{"user_id": "stu_5", "type": "login"}])
+    assert client.get("/analyze-engagement/stu_5").status_code == 409
+    assert client.post("/events", json=[{"user_id": "stu_5", "type": "logout"}]).status_code == 422
+
+def brute_force_snapshots(population):
+    batches = {}
+    for user in population.values():
+        if user["batch_id"] is not None:
+            batches.setdefault(user["batch_id"], []).append(user)
+    snapshots = {}
+    for batch_id, members in batches.items():
+        attendance = {}
+        for user in members:
+            for event_name in user["events"]:
+                attendance[event_name] = attendance.get(event_name, 0) + 1
+        snapshots[batch_id] = {
+            "batch_avg_projects": round(sum(user["projects_added"] for user in members) / len(members)),
+            "batch_resume_uploaded_pct": round(100 * sum(user["resume_uploaded"] for user in members) / len(members)),
+            "batch_event_attendance": attendance,
+        }
+    return snapshots
+
+def test_batch_counters_match_brute_force(store):
+    rng = random.Random(7)
+    batch_ids = ["cse", "ece", "mech", "civil"]
+    event_names = ["tech-talk", "coding-contest", "startup-meetup"]
+    population = {}
+    day = date(2024, 5, 1)
+
+    for step in range(3000):
+        user_id = f"stu_{rng.randrange(300)}"
+        user = population.setdefault(
+            user_id, {"batch_id": None, "resume_uploaded": False, "projects_added": 0, "events": set()}
+        )
+        action = rng.random()
+        if action < 0.15:
+            # Register or move the user, replacing their profile
+            template = make_user(user_id, resume_uploaded=rng.random() < 0.5)
+            template["profile"]["projects_added"] = rng.randrange(5)
+            user["batch_id"] = rng.choice(batch_ids)
+            user["resume_uploaded"] = template["profile"]["resume_uploaded"]
+            user["projects_added"] = template["profile"]["projects_added"]
+            store.put_user(user_id, user["batch_id"], Profile(**template["profile"]), Activity(**template["activity"]))
+        elif action < 0.35:
+            user["resume_uploaded"] = True
+            store.apply_events([event(user_id, "resume_upload", day)])
+        elif action < 0.6:
+            user["projects_added"] += 1
+            store.apply_events([event(user_id, "project_added", day)])
+        elif action < 0.9:
+            event_name = rng.choice(event_names)
+            user["events"].add(event_name)
+            store.apply_events([event(user_id, "event_attendance", day, event_name)])
+        else:
+            store.apply_events([event(user_id, rng.choice(["login", "post", "buddy_interaction"]), day)])
+
+        if step % 500 == 499:
+            expected = brute_force_snapshots(population)
+            for batch_id in batch_ids:
+                counted = store.batch_snapshot(batch_id)
+                assert (counted and counted[1]) == expected.get(batch_id)
+
+def test_batch_snapshot_version_changes_with_counters(store):
+    user = make_user("stu_1")
+    assert store.batch_snapshot("cse") is None
+    store.put_user("stu_1", "cse", Profile(**user["profile"]), Activity(**user["activity"]))
+    version, fields = store.batch_snapshot("cse")
+    assert fields == {"batch_avg_projects": 0, "batch_resume_uploaded_pct": 0, "batch_event_attendance": {}}
+
+    store.apply_events([event("stu_1", "event_attendance", date(2024, 1, 1), "tech-talk")])
+    new_version, fields = store.batch_snapshot("cse")
+    assert new_version > version
+    assert fields["batch_event_attendance"] == {"tech-talk": 1}
+    # Attending the same event twice counts the user once
+    store.apply_events([event("stu_1", "event_attendance", date(2024, 1, 2), "tech-talk")])
+    assert store.batch_snapshot("cse")[1]["batch_event_attendance"] == {"tech-talk": 1}
+
+def test_lookups_do_not_wait_for_writes(store):
+    user = make_user("stu_1")
+    store.put_user("stu_1", "cse", Profile(**user["profile"]), Activity(**user["activity"]))
+    before = store.batch_snapshot("cse"), store.get_user("stu_1")
+
+    # A large apply_events in progress: the lock held and a write transaction open
+    with store._lock:
+        conn = store._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE users SET projects_added = projects_added + 5")
+        with ThreadPoolExecutor(1) as pool:
+            assert pool.submit(store.batch_snapshot, "cse").result(timeout=1) == before[0]
+            assert pool.submit(store.get_user, "stu_1").result(timeout=1) == before[1]
+        conn.rollback()
+
+def test_peer_snapshot_served_from_counters(store, monkeypatch):
+    monkeypatch.setattr(main, "state_store", store)
+    client = TestClient(main.app)
+    user = make_user("stu_6")
+    registered = user.pop("peer_snapshot")
+    client.put("/peer-snapshots/cse-counted", json=registered)
+    client.put("/users/stu_6", json={"batch_id": "cse-counted", **user})
+    client.post("/events", json=[
+        {"user_id": "stu_6", "type": "resume_upload"},
+        {"user_id": "stu_6", "type": "project_added"},
+        {"user_id": "stu_6", "type": "event_attendance", "event_name": "tech-talk"},
+    ])
+
+    snapshot = client.get("/peer-snapshots/cse-counted").json()["peer_snapshot"]
+    assert snapshot == {
+        "batch_avg_projects": 1,
+        "batch_resume_uploaded_pct": 100,
+        "batch_event_attendance": {"tech-talk": 1},
+        "buddies_attending_events": registered["buddies_attending_events"],
+    }
+
+def test_counter_served_batch_without_registered_snapshot(store, monkeypatch):
+    monkeypatch.setattr(main, "state_store", store)
+    client = TestClient(main.app)
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [1]
+    user = make_user("stu_7")
+    user.pop("peer_snapshot")
+    client.put("/users/stu_7", json={"batch_id": "cse-unregistered", **user})
+
+    # No buddy events to name, so the event nudge is skipped instead of failing
+    response = client.get("/analyze-engagement/stu_7")
+    assert response.status_code == 200
+    assert "event" not in [nudge["type"] for nudge in response.json()["nudges"]]
+
+def test_counter_served_batch_without_registered_snapshot_in_bulk(store, monkeypatch):
+    # The batch and JSONL endpoints build nudges through score_users instead
+    monkeypatch.setattr(main, "state_store", store)
+    client = TestClient(main.app)
+    mock_resume_model.predict.return_value = [0]
+    mock_event_model.predict.return_value = [1]
+    user = make_user("stu_7")
+    user.pop("peer_snapshot")
+    client.put("/users/stu_7", json={"batch_id": "cse-unregistered", **user})
+    user["batch_id"] = "cse-unregistered"
+
+    batch = client.post("/analyze-engagement/batch", json={"users": [user]})
+    lines = client.post("/analyze-engagement/jsonl", data=json.dumps(user))
+    assert batch.status_code == lines.status_code == 200
+    result, = batch.json()["results"]
+    assert "event" not in [nudge["type"] for nudge in result["nudges"]]
+    assert json.loads(lines.text) == result
+
+def test_counted_snapshot_is_cached_per_version(store, monkeypatch):
+    monkeypatch.setattr(main, "state_store", store)
+    user = make_user("stu_8")
+    user.pop("peer_snapshot")
+    store.put_user("stu_8", "cse-cached", Profile(**user["profile"]), Activity(**user["activity"]))
+
+    first = main.resolve_batch_snapshot("cse-cached")
+    assert main.resolve_batch_snapshot("cse-cached") is first
+    store.apply_events([event("stu_8", "event_attendance", date(2024, 1, 1), "tech-talk")])
+    changed = main.resolve_batch_snapshot("cse-cached")
+    assert changed is not first and changed[1].batch_event_attendance == {"tech-talk": 1}
+
+def test_registered_snapshots_are_shared_through_the_store_file(tmp_path):
+    # Two worker processes: their own connection and registry over one database file
+    path = str(tmp_path / "state.db")
+    stores = [UserStateStore(path), UserStateStore(path)]
+    registries = [PeerSnapshotRegistry(cache_size=4), PeerSnapshotRegistry(cache_size=4)]
+    snapshot = PeerSnapshot(**make_user("stu_9")["peer_snapshot"])
+
+    version = registries[0].put(stores[0], "cse", snapshot)
+    assert registries[1].get(stores[1], "cse")[:2] == (version, snapshot)
+    assert registries[1].get(stores[1], "ece") is None
+
+    replaced = registries[1].put(stores[1], "cse", snapshot.copy(update={"batch_resume_uploaded_pct": 95}))
+    assert replaced > version
+    entry = registries[0].get(stores[0], "cse")
+    assert entry[0] == replaced and entry[1].batch_resume_uploaded_pct == 95
+    # Versions grow across batches, so a (batch_id, version) pair is never reused
+    assert registries[0].put(stores[0], "ece", snapshot) > replaced
+    for store in stores:
+        store.close()
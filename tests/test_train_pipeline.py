@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import joblib
+import pandas as pd
+import pytest
+
+# Add the project root directory to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import train_pipeline
+from distill_event_model import DistilledEventModel
+from model_compiler import CompiledForest
+from train_pipeline import run_pipeline
+
+ml_root = Path(project_root) / "model" / "ml_model"
+
+pytestmark = pytest.mark.real_files
+
+@pytest.fixture
+def config(tmp_path):
+    sources = {
+        "resume": (ml_root / "new_datasets" / "balanced_resume_dataset_realistic_noisy.csv",
+                   ml_root / "new_datasets" / "balanced_test_resume_dataset_realistic_noisy.csv"),
+        "event": (ml_root / "train_dataset" / "event_dataset.csv",
+                  ml_root / "test_dataset" / "test_event_dataset.csv"),
+    }
+    models = {}
+    for name, (train, test) in sources.items():
+        pd.read_csv(train).head(400).to_csv(tmp_path / f"{name}_train.csv", index=False)
+        pd.read_csv(test).head(100).to_csv(tmp_path / f"{name}_test.csv", index=False)
+        models[name] = {"train": str(tmp_path / f"{name}_train.csv"), "test": str(tmp_path / f"{name}_test.csv")}
+    models["resume"].update(features=["resume_uploaded", "batch_resume_uploaded_pct"], target="should_nudge_resume")
+    models["event"].update(features=["karma", "event_fomo_score"], target="should_nudge_event")
+    return {
+        "models": {
+            "resume_path": str(tmp_path / "serving" / "random_forest_resume.joblib"),
+            "event_path": str(tmp_path / "serving" / "rf_model_event.joblib"),
+            "resume_compiled_path": str(tmp_path / "serving" / "random_forest_resume.compiled"),
+            "event_compiled_path": str(tmp_path / "serving" / "rf_model_event.compiled"),
+            "event_distilled_path": str(tmp_path / "serving" / "rf_model_event.distilled"),
+        },
+        "inference": {
+            "feature_domains": {"event": {"event_fomo_score": {"min": 0, "max": 100, "divisor": 100}}},
+        },
+        "training": {
+            "cache_dir": str(tmp_path / "cache"),
+            "versions_dir": str(tmp_path / "versions"),
+            "n_jobs": 1,
+            "cv_folds": 2,
+            "random_state": 42,
+            "param_grid": {"n_estimators": [5], "max_depth": [None, 4]},
+            "models": models,
+        },
+    }
+
+def test_trains_publishes_and_records_versions(config):
+    results = run_pipeline(config)
+
+    for name in ("resume", "event"):
+        result = results[name]
+        assert result["trained"] and result["published"]
+        assert result["candidates"] == 2 and result["peak_rss_mb"] > 0
+        version_dir = Path(config["training"]["versions_dir"]) / name / result["version"]
+        assert json.loads((version_dir / "manifest.json").read_text())["sha"] == result["sha"]
+        model = joblib.load(config["models"][f"{name}_path"])
+        assert list(model.feature_names_in_) == config["training"]["models"][name]["features"]
+        assert model.n_jobs is None
+
+def test_unchanged_inputs_are_a_no_op(config, monkeypatch):
+    run_pipeline(config)
+    mtimes = {path: os.stat(path).st_mtime_ns for path in (config["models"]["resume_path"], config["models"]["event_path"])}
+
+    def fail(*args):
+        raise AssertionError("nothing should be refitted")
+    monkeypatch.setattr(train_pipeline, "fit_model", fail)
+    results = run_pipeline(config)
+
+    assert not any(result["trained"] or result["published"] for result in results.values())
+    assert {path: os.stat(path).st_mtime_ns for path in mtimes} == mtimes
+
+def test_changed_dataset_retrains_only_that_model(config):
+    first = run_pipeline(config)
+    event_train = config["training"]["models"]["event"]["train"]
+    pd.read_csv(event_train).head(300).to_csv(event_train, index=False)
+
+    second = run_pipeline(config)
+    assert not second["resume"]["trained"]
+    assert second["event"]["trained"] and second["event"]["version"] != first["event"]["version"]
+    assert second["event"]["train_rows"] == 300
+
+def test_interrupted_version_is_trained_again(config):
+    version = run_pipeline(config)["event"]["version"]
+    (Path(config["training"]["versions_dir"]) / "event" / version / "manifest.json").unlink()
+
+    results = run_pipeline(config)
+    assert results["event"]["trained"] and results["event"]["version"] == version
+    # The rebuilt artifact matches what is already served, so nothing is copied
+    assert not results["event"]["published"]
+
+def test_publish_refreshes_existing_compiled_and_distilled_dumps(config):
+    os.makedirs(config["models"]["event_compiled_path"])
+    os.makedirs(config["models"]["event_distilled_path"])
+
+    results = run_pipeline(config)
+    assert results["event"]["published"]
+    X = pd.read_csv(config["training"]["models"]["event"]["test"])[["karma", "event_fomo_score"]].round(2)
+    model = joblib.load(config["models"]["event_path"])
+    compiled = CompiledForest.load(config["models"]["event_compiled_path"])
+    distilled = DistilledEventModel.load(config["models"]["event_distilled_path"])
+    assert (compiled.predict(X) == model.predict(X)).all()
+    assert (distilled.predict(X) == model.predict(X)).all()
+    assert not os.path.exists(config["models"]["resume_compiled_path"])
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import os
+import resource
+import shutil
+import time
+from importlib.metadata import version
+
+import numpy as np
+
+from dataset_store import read_dataset
+from distill_event_model import DistilledEventModel
+from finite_domain import feature_domain
+from model_compiler import compile_forest
+
+# Part of every cache key; bump it when prepare or fit changes behaviour so
+# results cached by an older pipeline are not reused
+PIPELINE_VERSION = 1
+
+
+def file_digest(path):
+    """blake2b of a file's contents, read in 1 MiB blocks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(*parts):
+    """Hash the JSON-serialisable inputs of a stage into a cache key."""
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def write_atomic(path, write):
+    """
+    Write a file through a temporary sibling and rename it into place.
+
+    An interrupted run never leaves a partial file under path, so anything
+    found in the cache or the versions directory is complete.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def prepare_dataset(spec, cache_dir):
+    """
+    Project a model's train and test CSVs onto its features and target.
+
+    The result is cached as .npz under cache_dir, keyed by the CSV contents
+    and the column selection, so the CSVs are only parsed when they change.
+
+    Args:
+        spec (dict): One entry of training.models: train, test, features, target
+        cache_dir (str): Directory for cached intermediates
+
+    Returns:
+        tuple: (key, arrays, cached) with arrays holding X_train, y_train,
+            X_test and y_test
+    """
+    key = stage_key(
+        "prepare", PIPELINE_VERSION, file_digest(spec["train"]), file_digest(spec["test"]),
+        spec["features"], spec["target"],
+    )
+    path = os.path.join(cache_dir, f"prepared-{key}.npz")
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return key, dict(cached), True
+
+    columns = spec["features"] + [spec["target"]]
+    arrays = {}
+    for split in ("train", "test"):
+        frame = read_dataset(spec[split], columns).dropna()
+        arrays[f"X_{split}"] = frame[spec["features"]].to_numpy(dtype=np.float64)
+        arrays[f"y_{split}"] = frame[spec["target"]].to_numpy()
+    os.makedirs(cache_dir, exist_ok=True)
+    write_atomic(path, lambda f: np.savez(f, **arrays))
+    return key, arrays, False
+
+
+def fit_model(spec, training, arrays):
+    """
+    Grid-search a RandomForestClassifier and refit the best parameters.
+
+    The search runs its candidate x fold fits across training.n_jobs
+    processes; each of those forests is single-threaded so the pool is not
+    oversubscribed. The final refit then builds its trees on n_jobs threads.
+
+    Returns:
+        tuple: (model, report) where report holds the chosen parameters,
+            scores, timings and peak memory
+    """
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import GridSearchCV
+
+    # Fit on frames so the model records feature_names_in_, as the serving path expects
+    X_train = pd.DataFrame(arrays["X_train"], columns=spec["features"])
+    X_test = pd.DataFrame(arrays["X_test"], columns=spec["features"])
+    random_state = training["random_state"]
+    n_jobs = training["n_jobs"]
+
+    started = time.perf_counter()
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=random_state, n_jobs=1),
+        training["param_grid"],
+        cv=training["cv_folds"],
+        n_jobs=n_jobs,
+        refit=False,
+    )
+    search.fit(X_train, arrays["y_train"])
+    search_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs, **search.best_params_)
+    model.fit(X_train, arrays["y_train"])
+    fit_s = time.perf_counter() - started
+    # Serving predicts small batches; fanning each call out to threads only adds overhead
+    model.n_jobs = None
+
+    return model, {
+        "best_params": search.best_params_,
+        "cv_accuracy": round(float(search.best_score_), 4),
+        "test_accuracy": round(float(model.score(X_test, arrays["y_test"])), 4),
+        "candidates": len(search.cv_results_["params"]),
+        "search_s": round(search_s, 2),
+        "fit_s": round(fit_s, 2),
+        "peak_rss_mb": peak_rss_mb(),
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+    }
+
+
+def train_version(name, spec, training, artifact_name):
+    """
+    Produce the versioned artifact for one model, reusing it if it exists.
+
+    A version lives in versions_dir/<name>/<key>/ with the joblib artifact
+    and a manifest.json. The manifest is written last, so a directory
+    without one is an interrupted run and is trained again.
+
+    Returns:
+        tuple: (version_dir, manifest, trained)
+    """
+    # Read from the package metadata, so an up-to-date run never imports sklearn
+    sklearn_version = version("scikit-learn")
+    prepared_key, arrays, cached = prepare_dataset(spec, training["cache_dir"])
+    key = stage_key(
+        "fit", PIPELINE_VERSION, prepared_key, training["param_grid"], training["cv_folds"],
+        training["random_state"], sklearn_version,
+    )
+    version_dir = os.path.join(training["versions_dir"], name, key)
+    manifest_path = os.path.join(version_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return version_dir, json.load(f), False
+
+    import joblib
+
+    model, report = fit_model(spec, training, arrays)
+    os.makedirs(version_dir, exist_ok=True)
+    artifact_path = os.path.join(version_dir, artifact_name)
+    write_atomic(artifact_path, lambda f: joblib.dump(model, f))
+    manifest = {
+        "name": name,
+        "version": key,
+        "artifact": artifact_name,
+        "sha": file_digest(artifact_path),
+        "dataset": prepared_key,
+        "dataset_cached": cached,
+        "sklearn": sklearn_version,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        **report,
+    }
+    write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return version_dir, manifest, True
+
+
+def replace_dump(path, build):
+    """
+    Rebuild an existing array dump directory with build(tmp_path).
+
+    load_model prefers compiled and distilled dumps over the joblib file, so
+    leaving an old one in place would keep serving the old model. The new
+    dump is written beside it and swapped in by rename; workers that still
+    map the old arrays keep them until they reload.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    old_path = f"{path}.{os.getpid()}.old"
+    build(tmp_path)
+    os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path)
+
+
+def publish(version_dir, manifest, serving_path, dumps):
+    """
+    Copy a version to the serving path unless it is already there.
+
+    Args:
+        dumps (dict): Dump directory -> function(model, path) writing it;
+            only directories that already exist are rebuilt
+
+    Returns:
+        bool: True if the serving files changed
+    """
+    if os.path.exists(serving_path) and file_digest(serving_path) == manifest["sha"]:
+        return False
+    os.makedirs(os.path.dirname(serving_path) or ".", exist_ok=True)
+    with open(os.path.join(version_dir, manifest["artifact"]), "rb") as src:
+        write_atomic(serving_path, lambda f: shutil.copyfileobj(src, f))
+    existing = [path for path in dumps if os.path.isdir(path)]
+    if existing:
+        import joblib
+
+        model = joblib.load(serving_path)
+        for path in existing:
+            replace_dump(path, lambda tmp_path: dumps[path](model, tmp_path))
+    return True
+
+
+def serving_dumps(config, name):
+    """Array dumps derived from a model's joblib file, by directory."""
+    models = config["models"]
+    dumps = {models[f"{name}_compiled_path"]: lambda model, path: compile_forest(model).save(path)}
+    if name == "event":
+        fomo_values = feature_domain(config["inference"]["feature_domains"]["event"]["event_fomo_score"])
+        dumps[models["event_distilled_path"]] = lambda model, path: (
+            DistilledEventModel.distill(model, fomo_values).save(path))
+    return dumps
+
+
+def run_pipeline(config):
+    """
+    Train and publish every model under training.models.
+
+    Unchanged datasets and settings reuse the cached intermediates and the
+    existing version, and a version that is already being served is not
+    copied again, so a repeated run writes nothing.
+
+    Returns:
+        dict: Per model, the manifest plus "trained" and "published" flags
+    """
+    training = config["training"]
+    models = config["models"]
+    results = {}
+    for name, spec in training["models"].items():
+        serving_path = models[f"{name}_path"]
+        version_dir, manifest, trained = train_version(name, spec, training, os.path.basename(serving_path))
+        published = publish(version_dir, manifest, serving_path, serving_dumps(config, name))
+        results[name] = {**manifest, "trained": trained, "published": published}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the serving RandomForest models from the configured datasets")
+    parser.add_argument("--config", default="config.json", help="Config with the training and model paths")
+    parser.add_argument("--n-jobs", type=int, default=None, help="Override training.n_jobs (-1 uses every core)")
+    args = parser.parse_args(argv)
+
+    with open(args.config) as f:
+        config = json.load(f)
+    if args.n_jobs is not None:
+        config["training"]["n_jobs"] = args.n_jobs
+
+    for name, result in run_pipeline(config).items():
+        if not result["trained"] and not result["published"]:
+            print(f"✅ {name}: version {result['version']} is up to date")
+            continue
+        action = "trained" if result["trained"] else "reused"
+        print(
+            f"✅ {name}: {action} version {result['version']} "
+            f"(test accuracy {result['test_accuracy']}, fit {result['fit_s']}s, "
+            f"search {result['search_s']}s, peak RSS {result['peak_rss_mb']} MB)"
+        )
+        if result["published"]:
+            print(f"   published to {config['models'][f'{name}_path']}")
+
+
+if __name__ == "__main__":
+    main()